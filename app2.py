@@ -8,7 +8,7 @@ from ui.session_state import SessionStateManager
 from ui.components.ema_controls import EMAControls
 from ui.components.toolbar import Toolbar, TechnicalPanels
 from ui.chart_renderer import PlotlyChartRenderer
-from services.scanner_service import ScannerService, ScannerUI
+from services.scanner_service import get_scanner_service, ScannerUI
 
 # Set page configuration
 st.set_page_config(layout="wide")
@@ -18,8 +18,8 @@ def main():
     # Initialize session state
     SessionStateManager.init_all()
 
-    # Initialize scanner service
-    scanner_service = ScannerService()
+    # Scanner service (one per process; scans from all sessions share its job scheduler)
+    scanner_service = get_scanner_service()
 
     # Main title
     st.markdown("## Stock Chart Viewer")
@@ -41,7 +41,7 @@ def main():
         on_change_callback=SessionStateManager.trigger_chart_refresh
     )
 
-    TechnicalPanels.render_custom_strategy_panel()
+    TechnicalPanels.render_custom_strategy_panel(interval)
 
     # Render main chart
     render_chart_section(symbol, interval, start_date, end_date,
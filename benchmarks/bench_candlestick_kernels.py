@@ -0,0 +1,56 @@
+"""
+Benchmark: vectorized candlestick kernels, per-symbol calls vs one panel call.
+
+Scores all 14 scanner patterns for a synthetic universe the way
+scanner.find_candlestick_hits does (tail windows stacked into one panel), once
+symbol by symbol and once for the whole universe, and times the kernels over a
+full aligned symbols x bars panel. Histories are already in memory, so this is
+the compute side of a warm-cache scan.
+
+Run from the repository root:
+    python -m benchmarks.bench_candlestick_kernels [n_symbols] [rows]
+"""
+import sys
+import time
+import numpy as np
+
+from candlestick_kernels import evaluate_kernels
+from scanner import PATTERN_MAP, find_candlestick_hits
+
+def make_candles(rows, seed=0):
+    """Synthetic (4, rows) open/high/low/close array with realistic bodies and shadows"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    open_ = close * (1 + rng.normal(0, 0.01, rows))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.007, rows)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.007, rows)))
+    return np.vstack([open_, high, low, close])
+
+def main():
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    arrays = [make_candles(rows, seed=i) for i in range(n_symbols)]
+    patterns = list(PATTERN_MAP)
+    print(f"universe: {n_symbols} symbols x {rows} rows, {len(patterns)} patterns")
+
+    start = time.perf_counter()
+    per_symbol = [find_candlestick_hits(patterns, [ohlc])[0] for ohlc in arrays]
+    per_symbol_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    panel_hits = find_candlestick_hits(patterns, arrays)
+    panel_time = time.perf_counter() - start
+    assert panel_hits == per_symbol, "panel results differ from per-symbol results"
+
+    full_panel = np.stack(arrays, axis=1)
+    start = time.perf_counter()
+    evaluate_kernels(set(PATTERN_MAP.values()), *full_panel)
+    full_time = time.perf_counter() - start
+
+    hits = sum(hit is not None for row in panel_hits for hit in row)
+    print(f"per-symbol calls, recent hits : {per_symbol_time * 1e3:8.1f} ms")
+    print(f"one panel call, recent hits   : {panel_time * 1e3:8.1f} ms  (x{per_symbol_time / panel_time:.0f}, {hits} hits)")
+    print(f"all bars, full aligned panel  : {full_time * 1e3:8.1f} ms  ({n_symbols * rows / full_time / 1e6:.1f} M candles/s)")
+
+if __name__ == "__main__":
+    main()
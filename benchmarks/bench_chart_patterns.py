@@ -0,0 +1,82 @@
+"""
+Benchmark: vectorized chart pattern detectors vs their loop versions.
+
+Times each detector on long synthetic random walks (8000 bars by default, about
+30 years of daily bars), where the loop versions' forward rescans from every
+candidate pivot dominate. Results are compared as they are timed. Then times
+all six detectors, each building its own pivots, against one pass over a shared
+PivotIndex as the chart pattern scanner runs them, and batch detectors over a
+universe of shorter series against per-series calls.
+
+Run from the repository root:
+    python -m benchmarks.bench_chart_patterns [bars] [series] [universe]
+"""
+import sys
+import time
+
+from pivot_index import PivotIndex
+from chart_patterns import CHART_PATTERN_DETECTORS
+from benchmarks.check_chart_pattern_parity import CHECKS, BATCH_CHECKS, synthetic_frame
+
+# Bars of a default recency scan window
+CHART_PATTERN_LOOKBACK_BARS = 150
+
+def main():
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    n_series = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    universe = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    frames = [synthetic_frame(bars, seed) for seed in range(n_series)]
+    print(f"{n_series} series x {bars} bars")
+
+    for pattern, (reference, detector, _) in CHECKS.items():
+        start = time.perf_counter()
+        expected = [reference(df) for df in frames]
+        reference_time = (time.perf_counter() - start) / n_series
+
+        start = time.perf_counter()
+        actual = [detector(df) for df in frames]
+        detector_time = (time.perf_counter() - start) / n_series
+        assert actual == expected, f"{pattern}: detector results differ from the loop version"
+
+        print(f"{pattern:<28} loop {reference_time * 1e3:8.1f} ms  vectorized {detector_time * 1e3:7.2f} ms  "
+              f"(x{reference_time / detector_time:.0f}, {sum(len(m) for m in actual)} matches)")
+
+    for name, detector in CHART_PATTERN_DETECTORS.items():
+        start = time.perf_counter()
+        matches = [detector(df) for df in frames]
+        print(f"{name:<28} {(time.perf_counter() - start) / n_series * 1e3:7.2f} ms  "
+              f"({sum(len(m) for m in matches)} matches)")
+
+    start = time.perf_counter()
+    separate = [{name: detector(df) for name, detector in CHART_PATTERN_DETECTORS.items()} for df in frames]
+    separate_time = (time.perf_counter() - start) / n_series
+    start = time.perf_counter()
+    shared = []
+    for df in frames:
+        pivots = PivotIndex.from_frame(df)
+        shared.append({name: detector(df, pivots=pivots) for name, detector in CHART_PATTERN_DETECTORS.items()})
+    shared_time = (time.perf_counter() - start) / n_series
+    assert shared == separate, "detectors differ with a shared pivot index"
+    print(f"all six, own pivots {separate_time * 1e3:7.2f} ms  shared pivot index {shared_time * 1e3:7.2f} ms")
+
+    # A recency scan's window per symbol, for a whole universe
+    universe_frames = [synthetic_frame(CHART_PATTERN_LOOKBACK_BARS, seed) for seed in range(universe)]
+    close_arrays = [df["Close"].values for df in universe_frames]
+    print(f"universe: {universe} series x {CHART_PATTERN_LOOKBACK_BARS} bars")
+    for pattern, batch_detector in BATCH_CHECKS.items():
+        reference, detector, _ = CHECKS[pattern]
+        start = time.perf_counter()
+        expected = [reference(df) for df in universe_frames]
+        reference_time = time.perf_counter() - start
+        start = time.perf_counter()
+        per_series = [detector(df) for df in universe_frames]
+        per_series_time = time.perf_counter() - start
+        start = time.perf_counter()
+        batch = batch_detector(close_arrays)
+        batch_time = time.perf_counter() - start
+        assert batch == expected and per_series == expected, f"{pattern}: batch results differ from the loop version"
+        print(f"{pattern:<28} loop {reference_time * 1e3:8.1f} ms  per series {per_series_time * 1e3:7.1f} ms  "
+              f"batch {batch_time * 1e3:7.1f} ms  (x{reference_time / batch_time:.0f})")
+
+if __name__ == "__main__":
+    main()
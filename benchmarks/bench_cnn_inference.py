@@ -0,0 +1,64 @@
+"""
+Benchmark: batched CNN window scoring vs one forward pass per window.
+
+Scores the last N strided close windows of a synthetic universe with
+ChartPatternCNN (randomly initialized; only speed is measured), once window by
+window the way a naive loop would (copy, normalize, forward each window) and
+once with chart_pattern_cnn.inference.ChartPatternScorer, which normalizes
+strided views into large batches run under inference mode. The per-window loop
+is timed on a sample of symbols and extrapolated; probabilities must match.
+
+Run from the repository root (needs torch):
+    python -m benchmarks.bench_cnn_inference [n_symbols] [last_windows] [threads]
+"""
+import sys
+import time
+import numpy as np
+import torch
+
+from chart_pattern_cnn.model import ChartPatternCNN
+from chart_pattern_cnn.inference import ChartPatternScorer, window_view, DEFAULT_WINDOW, DEFAULT_STRIDE
+from benchmarks.bench_candlestick_kernels import make_candles
+
+def per_window_scores(model, closes, last_windows):
+    """Class probabilities window by window"""
+    windows, _ = window_view(closes, DEFAULT_WINDOW, DEFAULT_STRIDE, last_windows)
+    scores = []
+    with torch.no_grad():
+        for window in windows:
+            window = window.copy()
+            window = (window - window.min()) / ((window.max() - window.min()) or 1)
+            logits = model(torch.tensor(window, dtype=torch.float32).view(1, 1, -1))
+            scores.append(torch.softmax(logits, dim=1)[0].numpy())
+    return np.array(scores)
+
+def main():
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    last_windows = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    bars = DEFAULT_WINDOW + (last_windows - 1) * DEFAULT_STRIDE + 100
+    closes = {f"S{i:04d}": make_candles(bars, seed=i)[3] for i in range(n_symbols)}
+    torch.manual_seed(0)
+    model = ChartPatternCNN().eval()
+    print(f"universe: {n_symbols} symbols x {bars} bars, last {last_windows} windows of {DEFAULT_WINDOW} bars, "
+          f"torch threads: {threads or torch.get_num_threads()}")
+
+    sample = list(closes)[:min(100, n_symbols)]
+    start = time.perf_counter()
+    expected = {symbol: per_window_scores(model, closes[symbol], last_windows) for symbol in sample}
+    per_window_time = (time.perf_counter() - start) * n_symbols / len(sample)
+
+    scorer = ChartPatternScorer(model=model, num_threads=threads)
+    start = time.perf_counter()
+    scores = scorer.score(closes, last_windows=last_windows)
+    batched_time = time.perf_counter() - start
+    for symbol in sample:
+        assert np.allclose(scores[symbol]["probabilities"], expected[symbol], atol=1e-5), f"{symbol}: scores differ"
+
+    windows = sum(len(score["window_end"]) for score in scores.values())
+    print(f"per-window forward passes : {per_window_time:8.2f} s  (extrapolated from {len(sample)} symbols)")
+    print(f"batched scorer            : {batched_time:8.2f} s  (x{per_window_time / batched_time:.0f}, "
+          f"{windows} windows, {windows / batched_time:,.0f} windows/s)")
+
+if __name__ == "__main__":
+    main()
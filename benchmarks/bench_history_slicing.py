@@ -0,0 +1,65 @@
+"""
+Micro-benchmark: date-range lookups on cached 1d histories.
+
+Compares the old boolean-mask + copy filter against stock_data.slice_history
+(binary search, view) for 5k-8k row histories, reporting per-call latency and
+peak allocation.
+
+Run from the repository root:
+    python -m benchmarks.bench_history_slicing
+"""
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from stock_data import slice_history
+
+def make_history(rows, seed=0):
+    """Synthetic 1d OHLCV history with a business-day index"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("1995-01-02", periods=rows)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.01, rows)),
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Volume": rng.integers(1_000, 100_000, rows),
+    }, index=index)
+
+def mask_filter(df, start_date, end_date):
+    """The previous fetch_stock_chart_data filter"""
+    return df.loc[(df.index >= pd.to_datetime(start_date)) & (df.index <= pd.to_datetime(end_date))].copy()
+
+def measure(func, repeat=2000):
+    """Mean latency (microseconds) and peak traced allocation (bytes) of func()"""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    latency_us = (time.perf_counter() - start) / repeat * 1e6
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latency_us, peak
+
+def main():
+    print(f"{'rows':>6} {'method':<22} {'latency (us)':>13} {'peak alloc (KiB)':>17}")
+    for rows in (5000, 6500, 8000):
+        df = make_history(rows)
+        # Typical chart request: the last year of data
+        start_date = df.index[-252].strftime("%Y-%m-%d")
+        end_date = df.index[-1].strftime("%Y-%m-%d")
+        methods = {
+            "mask + copy": lambda: mask_filter(df, start_date, end_date),
+            "slice_history view": lambda: slice_history(df, start_date, end_date),
+            "slice_history copy": lambda: slice_history(df, start_date, end_date, copy=True),
+        }
+        for name, func in methods.items():
+            latency_us, peak = measure(func)
+            print(f"{rows:>6} {name:<22} {latency_us:>13.1f} {peak / 1024:>17.1f}")
+
+if __name__ == "__main__":
+    main()
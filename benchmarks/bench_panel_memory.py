@@ -0,0 +1,46 @@
+"""
+Memory comparison: dict of DataFrames vs the memory-mapped OHLCVPanel.
+
+Builds a synthetic universe, then reports the bytes held by a dict of float64
+DataFrames (what _stock_data_cache holds after a full scan) against the panel's
+mapped size, plus the time of a simple cross-symbol reduction on each layout.
+
+Run from the repository root:
+    python -m benchmarks.bench_panel_memory [n_symbols] [rows]
+"""
+import sys
+import time
+import tempfile
+import numpy as np
+
+from ohlcv_panel import build_panel
+from benchmarks.bench_history_slicing import make_history
+
+def main():
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 6500
+    histories = {f"SYM{i}": make_history(rows, seed=i) for i in range(n_symbols)}
+
+    frame_bytes = sum(int(df.memory_usage(index=True).sum()) for df in histories.values())
+
+    with tempfile.TemporaryDirectory() as root:
+        panel = build_panel(list(histories), "1d", root, lambda symbol, interval: histories[symbol])
+        panel_bytes = panel.nbytes()
+
+        start = time.perf_counter()
+        frame_max = max(float(df["Close"].max()) for df in histories.values())
+        frame_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        closes = np.asarray(panel.fields["Close"])
+        panel_max = float(np.maximum.reduceat(closes, panel.offsets[:-1]).max())
+        panel_time = time.perf_counter() - start
+
+    print(f"universe: {n_symbols} symbols x {rows} rows")
+    print(f"dict of DataFrames : {frame_bytes / 2**20:8.1f} MiB private per process")
+    print(f"OHLCVPanel (mmap)  : {panel_bytes / 2**20:8.1f} MiB shared page cache")
+    print(f"per-symbol max close, all symbols: frames {frame_time * 1e3:.1f} ms, panel {panel_time * 1e3:.1f} ms "
+          f"(results match: {abs(frame_max - panel_max) / frame_max < 1e-6})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: vectorized rule screener vs a per-symbol pandas pass per condition.
+
+Screens a synthetic universe with compound rules, once the way a per-symbol
+screen would (TechnicalIndicators on each symbol's DataFrame, one pass per
+condition, scanner pattern detection per symbol) and once with
+screener.Screener over the whole panel. Histories are already in memory, so this
+is the compute side of a warm-cache screen; the results must match.
+
+Run from the repository root:
+    python -m benchmarks.bench_screener [n_symbols] [bars]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from screener import Screener
+from scanner import find_candlestick_hits
+from services.technical_indicators import TechnicalIndicators
+from benchmarks.bench_candlestick_kernels import make_candles
+
+RULES = [
+    "RSI(14) < 40 AND close > EMA(50) AND Hammer in last 3 bars",
+    "RSI(14) < 40 AND close > EMA(50)",
+    "close > BB_UPPER(20, 2) OR Doji in last 3 bars",
+]
+
+def per_symbol_screen(frames):
+    """Matches of RULES computed symbol by symbol with pandas"""
+    matches = [[] for _ in RULES]
+    for symbol, df in frames.items():
+        close = df["Close"]
+        ohlc = df[["Open", "High", "Low", "Close"]].to_numpy().T
+        # One indicator pass per condition, as separate scalar checks would do
+        rsi_ok = TechnicalIndicators.compute_rsi(close).iloc[-1] < 40
+        ema_ok = close.iloc[-1] > TechnicalIndicators.compute_ema(close, 50).iloc[-1]
+        hammer = find_candlestick_hits(["Hammer"], [ohlc], 3)[0][0] is not None
+        if rsi_ok and ema_ok and hammer:
+            matches[0].append(symbol)
+        rsi_ok = TechnicalIndicators.compute_rsi(close).iloc[-1] < 40
+        ema_ok = close.iloc[-1] > TechnicalIndicators.compute_ema(close, 50).iloc[-1]
+        if rsi_ok and ema_ok:
+            matches[1].append(symbol)
+        upper = TechnicalIndicators.compute_bollinger_bands(close)[1].iloc[-1]
+        doji = find_candlestick_hits(["Doji"], [ohlc], 3)[0][0] is not None
+        if close.iloc[-1] > upper or doji:
+            matches[2].append(symbol)
+    return matches
+
+def main():
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    bars = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    symbols = [f"S{i:04d}" for i in range(n_symbols)]
+    index = pd.date_range("2020-01-01", periods=bars, freq="B")
+    frames = {}
+    for i, symbol in enumerate(symbols):
+        ohlc = make_candles(bars, seed=i)
+        frames[symbol] = pd.DataFrame({"Open": ohlc[0], "High": ohlc[1], "Low": ohlc[2], "Close": ohlc[3],
+                                       "Volume": np.full(bars, 1e6)}, index=index)
+    print(f"universe: {n_symbols} symbols x {bars} bars, {len(RULES)} rules")
+
+    start = time.perf_counter()
+    expected = per_symbol_screen(frames)
+    per_symbol_time = time.perf_counter() - start
+
+    fields = {field: np.vstack([df[column].to_numpy() for df in frames.values()])
+              for field, column in (("open", "Open"), ("high", "High"), ("low", "Low"),
+                                    ("close", "Close"), ("volume", "Volume"))}
+    screener = Screener(symbols, fields)
+    start = time.perf_counter()
+    results = [screener.screen(rule).index.tolist() for rule in RULES]
+    panel_time = time.perf_counter() - start
+    assert results == expected, "screener results differ from per-symbol results"
+
+    stats = screener.stats()
+    print(f"per-symbol pandas passes : {per_symbol_time * 1e3:8.1f} ms")
+    print(f"vectorized screener      : {panel_time * 1e3:8.1f} ms  (x{per_symbol_time / panel_time:.0f}, "
+          f"{stats['computed']} nodes computed, {stats['reused']} reused)")
+    print("matches per rule         :", [len(r) for r in results])
+
+if __name__ == "__main__":
+    main()
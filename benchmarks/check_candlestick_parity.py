@@ -0,0 +1,182 @@
+"""
+Parity check: candlestick_kernels against pandas_ta / TA-Lib.
+
+Scores synthetic OHLC series (and any fixture files given) with each kernel and
+with its reference - pandas_ta's cdl_doji for cdl_doji, TA-Lib's candle functions
+for the rest (through pandas_ta's cdl_pattern when it is installed) - and
+reports the candles where they disagree. Random walks rarely produce some
+patterns, so drawn series with known instances of them (DRAWN_PATTERNS) are
+scored too, and each of those kernels must get reference hits.
+
+Without pandas_ta, cdl_doji is compared against TA-Lib's CDLDOJI instead. The
+two doji definitions differ (TA-Lib averages the ten candles before the scored
+one and accepts a body equal to the threshold; pandas_ta includes the scored
+candle and does not), so candles whose body lies between the two thresholds
+are allowed to disagree and are counted separately.
+
+Kernels whose reference library is not installed are skipped. Exits non-zero
+on any mismatch.
+
+Run from the repository root:
+    python -m benchmarks.check_candlestick_parity [fixture_dir]
+
+Fixture files are OHLCV .csv/.parquet files as served by data_providers.LocalProvider.
+"""
+import os
+import sys
+import importlib.util
+import numpy as np
+import pandas as pd
+
+from candlestick_kernels import CANDLESTICK_KERNELS
+from benchmarks.bench_candlestick_kernels import make_candles
+
+# Kernel name -> pandas_ta cdl_pattern name
+TALIB_NAMES = {
+    "cdl_hammer": "hammer",
+    "cdl_hangingman": "hangingman",
+    "cdl_inverted_hammer": "invertedhammer",
+    "cdl_shootingstar": "shootingstar",
+    "cdl_engulfing": "engulfing",
+    "cdl_morningstar": "morningstar",
+    "cdl_eveningstar": "eveningstar",
+    "cdl_piercing": "piercing",
+    "cdl_darkcloudcover": "darkcloudcover",
+    "cdl_3whitesoldiers": "3whitesoldiers",
+    "cdl_3blackcrows": "3blackcrows",
+    "cdl_sandwich": "sticksandwich",
+}
+
+# Filler candle before, between and after drawn patterns: (open, high, low, close)
+_FILLER = [(100.0, 100.5, 99.7, 100.2), (100.2, 100.5, 99.6, 99.9)]
+
+# Kernel name -> candles of a textbook instance of its pattern, drawn after filler candles
+DRAWN_PATTERNS = {
+    "cdl_3whitesoldiers": [(100.0, 102.05, 99.9, 102.0), (101.0, 103.55, 100.9, 103.5),
+                           (102.5, 105.05, 102.4, 105.0)],
+    "cdl_3blackcrows": [(104.0, 106.1, 103.9, 106.0), (105.9, 106.0, 103.95, 104.0),
+                        (105.0, 105.05, 102.45, 102.5), (103.5, 103.55, 100.95, 101.0)],
+}
+
+def drawn_fixtures(repeats=3, filler=12):
+    """Frames with each DRAWN_PATTERNS instance repeated between runs of filler candles, keyed by name"""
+    frames = {}
+    for kernel_name, pattern in DRAWN_PATTERNS.items():
+        candles = []
+        for _ in range(repeats):
+            candles += [_FILLER[i % 2] for i in range(filler)] + pattern
+        candles += [_FILLER[i % 2] for i in range(filler)]
+        frames[f"drawn-{kernel_name}"] = pd.DataFrame(candles, columns=["Open", "High", "Low", "Close"],
+                                                      index=pd.bdate_range("2000-01-03", periods=len(candles)))
+    return frames
+
+def doji_definition_gap(df, length=10, factor=10):
+    """Candles whose body lies between TA-Lib's and pandas_ta's doji thresholds"""
+    import talib
+    body = (df["Close"] - df["Open"]).abs().to_numpy(dtype=np.float64)
+    high_low = (df["High"] - df["Low"]).to_numpy(dtype=np.float64)
+    average = talib.SMA(high_low, length)
+    pandas_ta_threshold = 0.01 * factor * average
+    talib_threshold = 0.01 * factor * np.concatenate([[np.nan], average[:-1]])
+    low, high = np.fmin(pandas_ta_threshold, talib_threshold), np.fmax(pandas_ta_threshold, talib_threshold)
+    # The first scored candle has no TA-Lib average yet
+    return ((body >= low) & (body <= high)) | np.isnan(talib_threshold)
+
+def reference_scorers():
+    """
+    Reference scorer per kernel for the libraries that are installed
+
+    Returns:
+        dict: Kernel name -> callable (open, high, low, close Series) -> scores
+    """
+    try:
+        import pandas_ta as ta
+    except ImportError:
+        ta = None
+    try:
+        import talib
+    except ImportError:
+        talib = None
+    scorers = {}
+    if ta is not None:
+        scorers["cdl_doji"] = ta.cdl_doji
+    elif talib is not None:
+        scorers["cdl_doji"] = talib.CDLDOJI
+    if talib is not None:
+        for kernel_name, talib_name in TALIB_NAMES.items():
+            if ta is not None:
+                scorers[kernel_name] = (lambda *args, name=talib_name:
+                                        ta.cdl_pattern(*args, name=name).iloc[:, 0])
+            else:
+                scorers[kernel_name] = getattr(talib, f"CDL{talib_name.upper()}")
+    return scorers
+
+def reference_scores(scorer, df):
+    """Reference scores for one frame, as an int array"""
+    reference = scorer(df["Open"], df["High"], df["Low"], df["Close"])
+    return np.nan_to_num(np.asarray(reference, dtype=np.float64)).astype(int)
+
+def synthetic_fixtures(count=20, rows=2000):
+    """Random-walk OHLC frames with realistic bodies and shadows, keyed by name"""
+    index = pd.bdate_range("2000-01-03", periods=rows)
+    return {f"synthetic-{seed}": pd.DataFrame(make_candles(rows, seed).T, index=index,
+                                              columns=["Open", "High", "Low", "Close"])
+            for seed in range(count)}
+
+def load_fixtures(directory):
+    frames = {}
+    for file_name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, file_name)
+        if file_name.endswith(".csv"):
+            frames[file_name] = pd.read_csv(path, index_col=0, parse_dates=True)
+        elif file_name.endswith(".parquet"):
+            frames[file_name] = pd.read_parquet(path)
+    return frames
+
+def main():
+    scorers = reference_scorers()
+    if not scorers:
+        print("Neither pandas_ta nor TA-Lib is installed; nothing to compare against")
+        return
+    # Without pandas_ta, doji is scored by TA-Lib's CDLDOJI (see reference_scorers)
+    talib_doji = "cdl_doji" in scorers and importlib.util.find_spec("pandas_ta") is None
+    frames = synthetic_fixtures()
+    frames.update(drawn_fixtures())
+    if len(sys.argv) > 1:
+        frames.update(load_fixtures(sys.argv[1]))
+    failures = 0
+    for kernel_name, kernel in CANDLESTICK_KERNELS.items():
+        if kernel_name not in scorers:
+            print(f"{kernel_name:<22} skipped (reference library not installed)")
+            continue
+        mismatches = hits = drawn_hits = definition_gaps = 0
+        for file_name, df in frames.items():
+            expected = reference_scores(scorers[kernel_name], df)
+            actual = kernel(*(df[column].to_numpy(dtype=np.float64) for column in ("Open", "High", "Low", "Close")))[0]
+            differ = actual != expected
+            if kernel_name == "cdl_doji" and talib_doji:
+                gap = differ & doji_definition_gap(df)
+                definition_gaps += int(np.count_nonzero(gap))
+                differ &= ~gap
+            differ = np.flatnonzero(differ)
+            mismatches += len(differ)
+            hits += int(np.count_nonzero(expected))
+            if file_name == f"drawn-{kernel_name}":
+                drawn_hits = int(np.count_nonzero(expected))
+            if len(differ):
+                print(f"  {file_name} {kernel_name}: first mismatches at {df.index[differ[:3]].tolist()}")
+        failures += mismatches
+        notes = []
+        if kernel_name in DRAWN_PATTERNS:
+            notes.append(f"{drawn_hits} on its drawn series")
+            if not drawn_hits:
+                failures += 1
+                notes.append("FAILED: the reference finds no drawn pattern")
+        if kernel_name == "cdl_doji" and talib_doji:
+            notes.append(f"vs TA-Lib CDLDOJI, {definition_gaps} candles between the two definitions' thresholds")
+        print(f"{kernel_name:<22} {hits:6d} reference hits, {mismatches} mismatches"
+              + (f" ({'; '.join(notes)})" if notes else ""))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
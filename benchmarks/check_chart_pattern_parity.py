@@ -0,0 +1,166 @@
+"""
+Parity check: vectorized chart pattern detectors against their loop versions.
+
+The loop implementations the pivot-index and sliding-window detectors replaced
+are kept here as references. Both run on synthetic random walks (rounded to cents so that equal
+closes and flat-topped pivots occur) with several parameter sets, and on
+fixture files if a directory is given; batch detectors must also return each
+series' own matches when given all of them at once. Each detector must also
+find a textbook instance of its pattern drawn through known turning points,
+and detect_latest_patterns must only report matches inside each pattern's own
+lookback unless an explicit lookback is given. Exits non-zero on any mismatch.
+
+Series are expected to be NaN-free: the loop versions used Python's max() over
+the pivot window, whose result with NaN depends on where the NaN sits.
+
+Run from the repository root:
+    python -m benchmarks.check_chart_pattern_parity [fixture_dir]
+"""
+import sys
+import numpy as np
+import pandas as pd
+
+from chart_patterns import (CHART_PATTERN_DETECTORS, CHART_PATTERN_LOOKBACK, detect_latest_patterns,
+                            detect_double_top, detect_inverted_flag_and_pole, detect_inverted_flag_and_pole_batch)
+from benchmarks.check_candlestick_parity import load_fixtures
+
+def reference_double_top(df, tolerance=0.005, min_separation=8, trend_lookback=10):
+    """Loop double top detector: rescans forward from every pivot high"""
+    results = []
+    closes = df['Close'].values
+    n = len(df)
+    for i in range(3 + trend_lookback, n-3):
+        if closes[i] <= closes[i - trend_lookback]:
+            continue
+        if closes[i] == max(closes[i-3:i+4]):
+            for j in range(i+min_separation, n-3):
+                if closes[j] == max(closes[j-3:j+4]):
+                    if abs(closes[j] - closes[i]) <= tolerance * closes[i]:
+                        pivot_range = closes[i+1:j]
+                        if len(pivot_range) == 0:
+                            continue
+                        pivot_low_idx = i + 1 + pivot_range.argmin()
+                        if closes[pivot_low_idx] < min(closes[i], closes[j]):
+                            results.append((i, int(pivot_low_idx), j))
+                    break
+    return results
+
+def reference_inverted_flag_and_pole(df, pole_lookback=10, flag_length=5, min_downtrend_pct=0.03, min_flag_retrace=0.01):
+    """Loop inverted flag and pole detector: checks the flag window bar by bar at every position"""
+    results = []
+    closes = df['Close'].values
+    n = len(df)
+    for i in range(pole_lookback + flag_length, n):
+        pole_start = i - pole_lookback - flag_length
+        pole_end = i - flag_length
+        flag_start = pole_end
+        flag_end = i
+        pole_drop = (closes[pole_start] - closes[pole_end]) / closes[pole_start]
+        flag_retrace = (closes[flag_end] - closes[flag_start]) / closes[pole_end]
+        if pole_drop >= min_downtrend_pct and flag_retrace >= min_flag_retrace:
+            if all(closes[j] >= closes[flag_start] for j in range(flag_start, flag_end+1)):
+                results.append((pole_start, pole_end, flag_start, flag_end))
+    return results
+
+# Pattern -> (reference, detector, parameter sets)
+CHECKS = {
+    "Double Top": (reference_double_top, detect_double_top, [
+        {},
+        {"tolerance": 0.02, "min_separation": 4, "trend_lookback": 5},
+        {"tolerance": 0.05, "min_separation": 1, "trend_lookback": 3},
+        {"tolerance": 0.05, "min_separation": 0, "trend_lookback": 20},
+    ]),
+    "Inverted Flag and Pole": (reference_inverted_flag_and_pole, detect_inverted_flag_and_pole, [
+        {},
+        {"pole_lookback": 5, "flag_length": 0, "min_downtrend_pct": 0.01, "min_flag_retrace": 0.0},
+        {"pole_lookback": 20, "flag_length": 10, "min_downtrend_pct": 0.05, "min_flag_retrace": 0.005},
+    ]),
+}
+
+# Pattern -> batch detector, for patterns with a batch mode
+BATCH_CHECKS = {
+    "Inverted Flag and Pole": detect_inverted_flag_and_pole_batch,
+}
+
+def synthetic_frame(rows, seed):
+    """Random-walk OHLC frame with closes rounded to cents"""
+    rng = np.random.default_rng(seed)
+    close = np.round(20 * np.exp(np.cumsum(rng.normal(0, 0.015, rows))), 2)
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close})
+
+def drawn_frame(points):
+    """OHLC frame whose closes run in straight lines through (bar, price) turning points"""
+    bars, prices = zip(*points)
+    close = np.interp(np.arange(bars[-1] + 1), bars, prices)
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close})
+
+# Pattern -> (turning points, a match the detector must report)
+KNOWN_PATTERNS = {
+    "Double Bottom": ([(0, 100), (30, 80), (45, 90), (60, 80.2), (80, 95)], (30, 45, 60)),
+    "Double Top": ([(0, 80), (30, 100), (45, 90), (60, 99.8), (80, 85)], (30, 45, 60)),
+    "Head and Shoulders": ([(0, 80), (20, 100), (30, 92), (40, 110), (50, 92.5), (60, 100.5), (75, 85)],
+                           (20, 30, 40, 50, 60)),
+    "Inverted Head and Shoulders": ([(0, 120), (20, 100), (30, 108), (40, 90), (50, 107.5), (60, 99.5), (75, 115)],
+                                    (20, 30, 40, 50, 60)),
+    "Flag and Pole": ([(0, 100), (20, 100), (30, 110), (35, 108), (50, 108)], (20, 30, 30, 35)),
+    "Inverted Flag and Pole": ([(0, 110), (20, 110), (30, 100), (35, 102), (50, 102)], (20, 30, 30, 35)),
+}
+
+def check_known_patterns():
+    """Detectors find drawn patterns; recency scans keep each pattern's own lookback. Returns failures."""
+    failures = []
+    for pattern, (points, expected) in KNOWN_PATTERNS.items():
+        matches = CHART_PATTERN_DETECTORS[pattern](drawn_frame(points))
+        if expected not in matches:
+            failures.append(f"{pattern}: {expected} not among {matches}")
+
+    # A flag 130 bars back is older than its 60-bar lookback but inside the 150 bars of
+    # Head and Shoulders, which shares the scan window
+    points, expected = KNOWN_PATTERNS["Flag and Pole"]
+    df = drawn_frame(points + [(160, 108)])
+    patterns = ["Flag and Pole", "Head and Shoulders"]
+    if detect_latest_patterns(df, patterns)["Flag and Pole"] is not None:
+        failures.append("Flag and Pole: match before its own lookback reported")
+    if detect_latest_patterns(df, patterns, lookback=CHART_PATTERN_LOOKBACK["Head and Shoulders"])["Flag and Pole"] is None:
+        failures.append("Flag and Pole: match inside an explicit lookback not reported")
+    if detect_latest_patterns(df.iloc[:70], patterns)["Flag and Pole"] is None:
+        failures.append("Flag and Pole: match inside its own lookback not reported")
+    return failures
+
+def main():
+    # Lengths differ so that batch detectors pad their inputs
+    frames = {f"synthetic-{seed}": synthetic_frame(1000 + 25 * seed, seed) for seed in range(40)}
+    if len(sys.argv) > 1:
+        frames.update(load_fixtures(sys.argv[1]))
+
+    mismatches = 0
+    for pattern, (reference, detector, param_sets) in CHECKS.items():
+        matches = 0
+        for name, df in frames.items():
+            for params in param_sets:
+                expected = reference(df, **params)
+                actual = detector(df, **params)
+                matches += len(expected)
+                if actual != expected:
+                    mismatches += 1
+                    print(f"{pattern} {name} {params}: {len(actual)} matches, expected {len(expected)}")
+        print(f"{pattern}: {len(frames)} series x {len(param_sets)} parameter sets, {matches} reference matches")
+        if pattern in BATCH_CHECKS:
+            close_arrays = [df["Close"].values for df in frames.values()]
+            for params in param_sets:
+                expected = [reference(df, **params) for df in frames.values()]
+                if BATCH_CHECKS[pattern](close_arrays, **params) != expected:
+                    mismatches += 1
+                    print(f"{pattern} batch {params}: results differ from the per-series reference")
+    known_failures = check_known_patterns()
+    for failure in known_failures:
+        print(failure)
+    print(f"known patterns: {len(KNOWN_PATTERNS)} drawn patterns, {len(known_failures)} failures")
+    mismatches += len(known_failures)
+    if mismatches:
+        print(f"{mismatches} mismatching runs")
+        sys.exit(1)
+    print("all detectors match their loop versions and find the drawn patterns")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Check: ChartPatternCNN weights trained on 100-step windows still load and score the same.
+
+The model pools its convolution output to a fixed length with AdaptiveAvgPool1d
+before the classifier, so it accepts any window length. This check saves the
+state_dict of the original fixed-length architecture (no adaptive pooling,
+fc1 sized for 100-step windows) to a temporary file and verifies that:
+
+- chart_pattern_cnn.inference.load_model loads it strictly (same keys and shapes);
+- on 100-step windows the loaded model returns the original model's logits;
+- ChartPatternScorer scores strided windows with those weights like a per-window loop;
+- shorter windows (e.g. 60 steps) still run, and windows under 4 steps are rejected.
+
+Skipped (exit code 0) when torch is not installed. Exits non-zero on any failed check.
+
+Run from the repository root:
+    python -m benchmarks.check_cnn_weights
+"""
+import os
+import sys
+import tempfile
+import importlib.util
+import numpy as np
+
+WINDOW = 100
+
+def legacy_model_class():
+    """ChartPatternCNN as it was before adaptive pooling: fc1 takes exactly 100-step windows"""
+    import torch.nn as nn
+    import torch.nn.functional as F
+
+    class LegacyChartPatternCNN(nn.Module):
+        def __init__(self, num_classes=2):
+            super().__init__()
+            self.conv1 = nn.Conv1d(1, 16, kernel_size=5, stride=1, padding=2)
+            self.conv2 = nn.Conv1d(16, 32, kernel_size=5, stride=1, padding=2)
+            self.pool = nn.MaxPool1d(2)
+            self.fc1 = nn.Linear(32 * 25, 64)
+            self.fc2 = nn.Linear(64, num_classes)
+
+        def forward(self, x):
+            x = self.pool(F.relu(self.conv1(x)))
+            x = self.pool(F.relu(self.conv2(x)))
+            x = x.view(x.size(0), -1)
+            x = F.relu(self.fc1(x))
+            return self.fc2(x)
+
+    return LegacyChartPatternCNN
+
+def main():
+    if importlib.util.find_spec("torch") is None:
+        print("skipped (torch is not installed)")
+        return
+    import torch
+    from chart_pattern_cnn.inference import ChartPatternScorer, load_model, window_view, normalize_windows
+
+    torch.manual_seed(0)
+    legacy = legacy_model_class()(num_classes=2).eval()
+    rng = np.random.default_rng(0)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 600))
+    windows, _ = window_view(closes, WINDOW, 5)
+    batch = normalize_windows(windows, np.empty(windows.shape, dtype=np.float32))
+    failures = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        weights_path = os.path.join(directory, "legacy.pt")
+        torch.save(legacy.state_dict(), weights_path)
+        try:
+            model = load_model(weights_path)
+        except RuntimeError as e:
+            print(f"load_model                FAILED {e}")
+            sys.exit(1)
+        print("load_model                ok (strict load of 100-step weights)")
+
+        with torch.no_grad():
+            expected = legacy(torch.from_numpy(batch).view(len(batch), 1, -1))
+            actual = model(torch.from_numpy(batch).view(len(batch), 1, -1))
+        difference = (expected - actual).abs().max().item()
+        if difference > 1e-6:
+            failures.append(f"logits on 100-step windows differ by {difference:.3g}")
+        print(f"100-step logits           max difference {difference:.3g}")
+
+        scorer = ChartPatternScorer(weights_path=weights_path, window=WINDOW, stride=5)
+        scores = scorer.score({"CHECK": closes})["CHECK"]["probabilities"]
+        probabilities = torch.softmax(expected, dim=1).numpy()
+        difference = float(np.abs(scores - probabilities).max())
+        if difference > 1e-5:
+            failures.append(f"scorer probabilities differ from the original model by {difference:.3g}")
+        print(f"scorer probabilities      max difference {difference:.3g}")
+
+        with torch.no_grad():
+            shape = tuple(model(torch.rand(3, 1, 60)).shape)
+        if shape != (3, 2):
+            failures.append(f"60-step windows give logits of shape {shape}")
+        print(f"60-step windows           logits of shape {shape}")
+        try:
+            ChartPatternScorer(model=model, window=3)
+        except ValueError:
+            print("3-step windows            rejected")
+        else:
+            failures.append("a 3-step window was accepted")
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Check: shard queue leases, re-queueing and a sharded scan surviving a dead worker.
+
+Runs against a throwaway queue database and OHLCV store in a temporary
+directory, with synthetic fixture files served by data_providers.LocalProvider:
+
+- a shard whose lease runs out without heartbeats is re-queued and claimed
+  again, and the first worker's heartbeat and result are refused afterwards;
+- a shard is marked failed after max_attempts expired leases or failures;
+- leases of a cancelled job stop renewing;
+- a worker whose heartbeat raises sqlite3.OperationalError abandons its shard;
+- a sharded chart scan, one of whose shards was claimed by a worker that then
+  died, still completes with the same matches as the unsharded scan.
+- a sharded scan with no worker running fails after its idle timeout and
+  cancels its job, and old finished jobs are purged when a scan starts.
+
+Exits non-zero on any failed check.
+
+Run from the repository root:
+    python -m benchmarks.check_shard_queue
+"""
+import os
+import sys
+import json
+import time
+import queue
+import sqlite3
+import tempfile
+import threading
+from datetime import date
+import pandas as pd
+
+import stock_data
+import scan_worker
+from ohlcv_store import OHLCVStore
+from data_providers import LocalProvider
+from shard_queue import ShardQueue
+from scan_jobs import ScanJobScheduler
+from chart_patterns import CHART_PATTERN_DETECTORS
+from benchmarks.check_chart_pattern_parity import synthetic_frame
+
+SYMBOLS = [f"S{i:02d}" for i in range(7)]
+
+def write_fixtures(directory):
+    """Synthetic daily histories for SYMBOLS as LocalProvider CSV files"""
+    os.makedirs(directory)
+    for seed, symbol in enumerate(SYMBOLS):
+        df = synthetic_frame(1500, seed)
+        df["Volume"] = 1000.0
+        df.index = pd.bdate_range("2015-01-01", periods=len(df), name="Date")
+        df.to_csv(os.path.join(directory, f"{symbol}.csv"))
+
+def check_lease_expiry(directory):
+    shard_queue = ShardQueue(os.path.join(directory, "leases.sqlite"), max_attempts=2)
+    job_id = shard_queue.create_job({"kind": "check"}, ["A", "B"], shard_size=1)
+    first = shard_queue.claim("dead", lease_seconds=0.2)
+    assert (first["shard_no"], first["attempt"]) == (0, 1)
+    time.sleep(0.3)
+    second = shard_queue.claim("alive", lease_seconds=30)
+    assert (second["shard_no"], second["attempt"]) == (0, 2), "expired shard was not re-queued"
+    assert not shard_queue.heartbeat(job_id, 0, "dead"), "lost lease was renewed"
+    assert not shard_queue.complete(job_id, 0, "dead", {}), "result of a lost lease was accepted"
+    assert shard_queue.heartbeat(job_id, 0, "alive") and shard_queue.complete(job_id, 0, "alive", {})
+
+    # Shard 1 expires on every claim until max_attempts is reached
+    for attempt in (1, 2):
+        shard = shard_queue.claim("dead", lease_seconds=0.1)
+        assert (shard["shard_no"], shard["attempt"]) == (1, attempt)
+        time.sleep(0.2)
+    assert shard_queue.claim("alive") is None, "shard was handed out after max_attempts"
+    status = shard_queue.status(job_id)
+    assert (status["done"], status["failed"]) == (1, 1), status
+    assert shard_queue.shards(job_id, ("failed",))[0]["error"] == "lease expired"
+
+def check_fail_and_cancel(directory):
+    shard_queue = ShardQueue(os.path.join(directory, "failures.sqlite"), max_attempts=2)
+    job_id = shard_queue.create_job({"kind": "check"}, ["A"], shard_size=1)
+    for attempt in (1, 2):
+        shard = shard_queue.claim("worker")
+        assert shard["attempt"] == attempt
+        shard_queue.fail(job_id, 0, "worker", "boom")
+    assert shard_queue.status(job_id)["failed"] == 1, "failed shard was not given up after max_attempts"
+
+    job_id = shard_queue.create_job({"kind": "check"}, ["A", "B"], shard_size=1)
+    shard_queue.claim("worker")
+    shard_queue.cancel_job(job_id)
+    assert not shard_queue.heartbeat(job_id, 0, "worker"), "lease of a cancelled job was renewed"
+    assert shard_queue.claim("worker") is None, "shard of a cancelled job was handed out"
+
+def check_heartbeat_error(directory):
+    queue_path = os.path.join(directory, "heartbeat.sqlite")
+    shard_queue = ShardQueue(queue_path)
+    job_id = shard_queue.create_job({"kind": "check"}, ["A"], shard_size=1)
+    abandoned = threading.Event()
+
+    class UnreachableQueue(ShardQueue):
+        def heartbeat(self, *args, **kwargs):
+            raise sqlite3.OperationalError("database is locked")
+
+    def run_shard(service, spec, symbols, cancel_event):
+        if cancel_event.wait(5):
+            abandoned.set()
+        return {"results": [], "hits": {}, "skipped": [], "cached": 0, "cancelled": True, "error": None}
+
+    get_shard_queue, original_run_shard = scan_worker.get_shard_queue, scan_worker.run_shard
+    scan_worker.get_shard_queue = lambda path=None: UnreachableQueue(queue_path)
+    scan_worker.run_shard = run_shard
+    try:
+        completed = scan_worker.run_worker(queue_path, "worker", lease_seconds=0.3, poll_interval=0.05, exit_when_idle=0.2)
+    finally:
+        scan_worker.get_shard_queue, scan_worker.run_shard = get_shard_queue, original_run_shard
+    assert abandoned.is_set(), "worker kept scanning after its heartbeat failed"
+    assert completed == 0 and shard_queue.status(job_id)["done"] == 0
+
+def run_to_done(start_scan):
+    result_queue = queue.Queue()
+    start_scan(result_queue)
+    while True:
+        message = result_queue.get(timeout=120)
+        if message.get("type") != "partial":
+            return message
+
+def check_sharded_scan(directory):
+    from services.scan_service import ScannerService
+
+    stock_data.set_ohlcv_store(OHLCVStore(os.path.join(directory, "store")))
+    stock_data.set_data_provider(LocalProvider(os.path.join(directory, "fixtures")))
+    queue_path = os.path.join(directory, "scan_queue.sqlite")
+    patterns = list(CHART_PATTERN_DETECTORS)
+    start, end = date(2015, 1, 1), date.today()
+    # The coordinator gets its own scheduler, so it never holds the slot the worker's shard scans need
+    coordinator = ScannerService(scheduler=ScanJobScheduler(max_concurrent_jobs=1))
+
+    stop_event = threading.Event()
+    worker = threading.Thread(target=scan_worker.run_worker, daemon=True, kwargs=dict(
+        queue_path=queue_path, worker_id="alive", lease_seconds=5, poll_interval=0.05, stop_event=stop_event))
+    dead_shard = []
+
+    def start_sharded(result_queue):
+        coordinator.start_sharded_scan("chart", patterns, "1d", start, end, result_queue, threading.Event(),
+                                       shard_size=2, queue_path=queue_path, symbols=SYMBOLS, poll_interval=0.1)
+        # A worker claims the first shard and dies before heartbeating
+        shard_queue = ShardQueue(queue_path)
+        while not dead_shard:
+            shard = shard_queue.claim("dead", lease_seconds=0.5)
+            if shard is not None:
+                dead_shard.append(shard)
+            time.sleep(0.01)
+        worker.start()
+
+    try:
+        sharded = run_to_done(start_sharded)
+    finally:
+        stop_event.set()
+    # A fresh store comes with an empty result cache, so the unsharded matches are computed anew
+    stock_data.set_ohlcv_store(OHLCVStore(os.path.join(directory, "store-unsharded")))
+    unsharded = run_to_done(lambda result_queue: ScannerService().start_chart_pattern_scan(
+        patterns, "1d", start, end, result_queue, threading.Event(), symbols=SYMBOLS))
+
+    assert not sharded["cancelled"] and not sharded["skipped"], sharded["skipped"]
+    shards = ShardQueue(queue_path).shards(sharded["sharded_job_id"])
+    assert all(shard["state"] == "done" for shard in shards), [shard["state"] for shard in shards]
+    assert shards[dead_shard[0]["shard_no"]]["attempts"] == 2, "the dead worker's shard was not re-run"
+    key = lambda row: json.dumps(row, sort_keys=True, default=str)
+    assert sorted(map(key, sharded["results"])) == sorted(map(key, unsharded["results"])), \
+        "sharded matches differ from the unsharded scan"
+    return len(sharded["results"])
+
+def check_no_workers(directory):
+    from services.scan_service import ScannerService
+
+    queue_path = os.path.join(directory, "idle.sqlite")
+    shard_queue = ShardQueue(queue_path)
+    old_job = shard_queue.create_job({"kind": "check"}, ["A"], shard_size=1)
+    shard_queue.finish_job(old_job)
+    shard_queue._connection().execute("UPDATE jobs SET created_at = 0 WHERE job_id = ?", (old_job,))
+
+    coordinator = ScannerService(scheduler=ScanJobScheduler(max_concurrent_jobs=1))
+    started_at = time.time()
+    message = run_to_done(lambda result_queue: coordinator.start_sharded_scan(
+        "chart", ["Double Top"], "1d", date(2015, 1, 1), date.today(), result_queue, threading.Event(),
+        shard_size=2, queue_path=queue_path, symbols=SYMBOLS, poll_interval=0.05, idle_timeout=0.3))
+    assert message.get("error") and time.time() - started_at < 30, "scan without workers did not fail"
+    assert shard_queue.status(old_job)["total"] == 0, "finished job was not purged"
+    assert shard_queue.claim("late") is None, "shards of the abandoned job are still handed out"
+
+CHECKS = {
+    "lease expiry and re-queue": check_lease_expiry,
+    "failures and cancellation": check_fail_and_cancel,
+    "heartbeat error abandons the shard": check_heartbeat_error,
+    "sharded scan with a dead worker": check_sharded_scan,
+    "sharded scan without workers": check_no_workers,
+}
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        write_fixtures(os.path.join(directory, "fixtures"))
+        for name, check in CHECKS.items():
+            try:
+                outcome = check(directory)
+            except AssertionError as e:
+                failures += 1
+                print(f"{name:<36} FAILED {e}")
+            else:
+                print(f"{name:<36} ok" + (f" ({outcome} matches)" if outcome is not None else ""))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Vectorized candlestick pattern kernels.
+
+Every kernel takes open/high/low/close as 2D float arrays shaped (symbols, bars) -
+aligned on the bar axis, NaN where a symbol has no data - and scores every
+candle of every symbol in one call using the +100 (bullish) / -100 (bearish) / 0
+convention of pandas_ta. 1D arrays are treated as a single symbol.
+
+The kernels follow TA-Lib's candle definitions (which pandas_ta's cdl_pattern
+wraps), including its rolling candle-size averages and lookback periods, except
+cdl_doji which matches pandas_ta's native implementation. cdl_sandwich is
+TA-Lib's stick sandwich.
+
+Scores only depend on the last LOOKBACK[name] bars before a candle, so the
+latest candles of a long history can be scored from a short tail window
+(see stack_tails).
+"""
+import numpy as np
+
+# TA-Lib candle settings: (range measured, averaging period, factor)
+_BODY_LONG = ("RealBody", 10, 1.0)
+_BODY_SHORT = ("RealBody", 10, 1.0)
+_SHADOW_LONG = ("RealBody", 0, 1.0)
+_SHADOW_VERY_SHORT = ("HighLow", 10, 0.1)
+_NEAR = ("HighLow", 5, 0.2)
+_FAR = ("HighLow", 5, 0.6)
+_EQUAL = ("HighLow", 5, 0.05)
+
+class _Candles:
+    """Derived candle measures shared by the kernels, computed once per panel"""
+
+    def __init__(self, open_, high, low, close):
+        self.open = np.atleast_2d(np.asarray(open_, dtype=np.float64))
+        self.high = np.atleast_2d(np.asarray(high, dtype=np.float64))
+        self.low = np.atleast_2d(np.asarray(low, dtype=np.float64))
+        self.close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+        self.body_top = np.maximum(self.open, self.close)
+        self.body_bottom = np.minimum(self.open, self.close)
+        self.real_body = self.body_top - self.body_bottom
+        self.upper_shadow = self.high - self.body_top
+        self.lower_shadow = self.body_bottom - self.low
+        self.high_low = self.high - self.low
+        self.white = self.close >= self.open
+        self.black = self.close < self.open
+        self._averages = {}
+        self._shifted = {}
+
+    def prev(self, name, bars):
+        """Measure `name` (e.g. "close", "white") from `bars` candles earlier"""
+        key = (name, bars)
+        if key not in self._shifted:
+            self._shifted[key] = _shift(getattr(self, name), bars)
+        return self._shifted[key]
+
+    def ranges(self, kind):
+        if kind == "RealBody":
+            return self.real_body
+        if kind == "HighLow":
+            return self.high_low
+        return self.upper_shadow + self.lower_shadow
+
+    def average(self, setting, shift=0):
+        """
+        TA-Lib candle average for each bar, measured shift bars back
+
+        The average covers the `period` candles before the measured candle (the
+        measured candle itself for a period of 0), times the setting's factor.
+        """
+        key = (setting, shift)
+        if key not in self._averages:
+            if shift:
+                self._averages[key] = _shift(self.average(setting), shift)
+                return self._averages[key]
+            kind, period, factor = setting
+            values = self.ranges(kind)
+            if period == 0:
+                average = values * factor
+            else:
+                average = _window_sum(values, period, end_offset=1) / period * factor
+            if kind == "Shadows":
+                average = average / 2.0
+            self._averages[key] = average
+        return self._averages[key]
+
+def _window_sum(values, period, end_offset=0):
+    """
+    Sum of `period` consecutive values ending end_offset bars before each bar
+
+    NaN where the window is incomplete. Built from shifted slices, so it costs
+    `period` array additions rather than a (symbols, bars, period) temporary.
+    """
+    bars = values.shape[1]
+    total = np.full(values.shape, np.nan)
+    first = period - 1 + end_offset
+    if bars > first:
+        window = np.zeros((values.shape[0], bars - first))
+        for lag in range(period):
+            window += values[:, period - 1 - lag:bars - end_offset - lag]
+        total[:, first:] = window
+    return total
+
+def _shift(values, bars):
+    """Values from `bars` candles earlier (NaN/False before the start)"""
+    if bars == 0:
+        return values
+    shifted = np.full(values.shape, np.nan if values.dtype.kind == "f" else False, dtype=values.dtype)
+    shifted[:, bars:] = values[:, :-bars]
+    return shifted
+
+def _score(signal, value, lookback):
+    """Turn a boolean signal into +/-100 scores, zeroing TA-Lib's lookback bars"""
+    scores = np.where(signal, value, 0).astype(np.int16)
+    scores[:, :lookback] = 0
+    return scores
+
+def _candles(open_, high, low, close):
+    """Kernels accept a shared _Candles (from evaluate_kernels) in place of open_"""
+    return open_ if isinstance(open_, _Candles) else _Candles(open_, high, low, close)
+
+def cdl_hammer(open_, high=None, low=None, close=None):
+    """Hammer: small body near the prior candle's low, long lower shadow, almost no upper shadow"""
+    c = _candles(open_, high, low, close)
+    signal = ((c.real_body < c.average(_BODY_SHORT))
+              & (c.lower_shadow > c.average(_SHADOW_LONG))
+              & (c.upper_shadow < c.average(_SHADOW_VERY_SHORT))
+              & (c.body_bottom <= c.prev("low", 1) + c.average(_NEAR, 1)))
+    return _score(signal, 100, LOOKBACK["cdl_hammer"])
+
+def cdl_hangingman(open_, high=None, low=None, close=None):
+    """Hanging man: hammer shape with the body near the prior candle's high"""
+    c = _candles(open_, high, low, close)
+    signal = ((c.real_body < c.average(_BODY_SHORT))
+              & (c.lower_shadow > c.average(_SHADOW_LONG))
+              & (c.upper_shadow < c.average(_SHADOW_VERY_SHORT))
+              & (c.body_bottom >= c.prev("high", 1) - c.average(_NEAR, 1)))
+    return _score(signal, -100, LOOKBACK["cdl_hangingman"])
+
+def cdl_inverted_hammer(open_, high=None, low=None, close=None):
+    """Inverted hammer: small body gapping down, long upper shadow, almost no lower shadow"""
+    c = _candles(open_, high, low, close)
+    signal = ((c.real_body < c.average(_BODY_SHORT))
+              & (c.upper_shadow > c.average(_SHADOW_LONG))
+              & (c.lower_shadow < c.average(_SHADOW_VERY_SHORT))
+              & (c.body_top < c.prev("body_bottom", 1)))
+    return _score(signal, 100, LOOKBACK["cdl_inverted_hammer"])
+
+def cdl_shootingstar(open_, high=None, low=None, close=None):
+    """Shooting star: small body gapping up, long upper shadow, almost no lower shadow"""
+    c = _candles(open_, high, low, close)
+    signal = ((c.real_body < c.average(_BODY_SHORT))
+              & (c.upper_shadow > c.average(_SHADOW_LONG))
+              & (c.lower_shadow < c.average(_SHADOW_VERY_SHORT))
+              & (c.body_bottom > c.prev("body_top", 1)))
+    return _score(signal, -100, LOOKBACK["cdl_shootingstar"])
+
+def cdl_engulfing(open_, high=None, low=None, close=None):
+    """
+    Engulfing: the body engulfs the prior opposite-colour body (+100 white, -100 black)
+
+    As in TA-Lib, a body sharing an edge with the prior body scores +/-80.
+    """
+    c = _candles(open_, high, low, close)
+    prev_open, prev_close = c.prev("open", 1), c.prev("close", 1)
+    bullish = c.white & c.prev("black", 1) & (((c.close >= prev_open) & (c.open < prev_close))
+                                              | ((c.close > prev_open) & (c.open <= prev_close)))
+    bearish = c.black & c.prev("white", 1) & (((c.open >= prev_close) & (c.close < prev_open))
+                                              | ((c.open > prev_close) & (c.close <= prev_open)))
+    strength = np.where((c.open != prev_close) & (c.close != prev_open), 100, 80)
+    scores = np.where(bullish, strength, np.where(bearish, -strength, 0)).astype(np.int16)
+    scores[:, :LOOKBACK["cdl_engulfing"]] = 0
+    return scores
+
+def cdl_morningstar(open_, high=None, low=None, close=None, penetration=0.3):
+    """Morning star: long black, short body gapping down, white closing well into the first body"""
+    c = _candles(open_, high, low, close)
+    body2 = c.prev("real_body", 2)
+    signal = ((body2 > c.average(_BODY_LONG, 2))
+              & c.prev("black", 2)
+              & (c.prev("real_body", 1) <= c.average(_BODY_SHORT, 1))
+              & (c.prev("body_top", 1) < c.prev("body_bottom", 2))
+              & (c.real_body > c.average(_BODY_SHORT))
+              & c.white
+              & (c.close > c.prev("close", 2) + body2 * penetration))
+    return _score(signal, 100, LOOKBACK["cdl_morningstar"])
+
+def cdl_eveningstar(open_, high=None, low=None, close=None, penetration=0.3):
+    """Evening star: long white, short body gapping up, black closing well into the first body"""
+    c = _candles(open_, high, low, close)
+    body2 = c.prev("real_body", 2)
+    signal = ((body2 > c.average(_BODY_LONG, 2))
+              & c.prev("white", 2)
+              & (c.prev("real_body", 1) <= c.average(_BODY_SHORT, 1))
+              & (c.prev("body_bottom", 1) > c.prev("body_top", 2))
+              & (c.real_body > c.average(_BODY_SHORT))
+              & c.black
+              & (c.close < c.prev("close", 2) - body2 * penetration))
+    return _score(signal, -100, LOOKBACK["cdl_eveningstar"])
+
+def cdl_doji(open_, high=None, low=None, close=None, length=10, factor=10):
+    """Doji (pandas_ta definition): body under factor% of the length-bar average high-low range"""
+    c = _candles(open_, high, low, close)
+    average_range = _window_sum(c.high_low, length) / length
+    return _score(c.real_body < 0.01 * factor * average_range, 100, 0)
+
+def cdl_piercing(open_, high=None, low=None, close=None):
+    """Piercing line: long black, then a long white opening below its low and closing above its midpoint"""
+    c = _candles(open_, high, low, close)
+    prev_body = c.prev("real_body", 1)
+    prev_close = c.prev("close", 1)
+    signal = (c.prev("black", 1)
+              & (prev_body > c.average(_BODY_LONG, 1))
+              & c.white
+              & (c.real_body > c.average(_BODY_LONG))
+              & (c.open < c.prev("low", 1))
+              & (c.close < c.prev("open", 1))
+              & (c.close > prev_close + prev_body * 0.5))
+    return _score(signal, 100, LOOKBACK["cdl_piercing"])
+
+def cdl_darkcloudcover(open_, high=None, low=None, close=None, penetration=0.5):
+    """Dark cloud cover: long white, then a black opening above its high and closing deep into its body"""
+    c = _candles(open_, high, low, close)
+    prev_body = c.prev("real_body", 1)
+    signal = (c.prev("white", 1)
+              & (prev_body > c.average(_BODY_LONG, 1))
+              & c.black
+              & (c.open > c.prev("high", 1))
+              & (c.close > c.prev("open", 1))
+              & (c.close < c.prev("close", 1) - prev_body * penetration))
+    return _score(signal, -100, LOOKBACK["cdl_darkcloudcover"])
+
+def cdl_3whitesoldiers(open_, high=None, low=None, close=None):
+    """Three white soldiers: three long whites with rising closes, each opening within the prior body"""
+    c = _candles(open_, high, low, close)
+    signal = np.ones(c.close.shape, dtype=bool)
+    for bars in (2, 1, 0):
+        signal &= c.prev("white", bars) & (c.prev("upper_shadow", bars) < c.average(_SHADOW_VERY_SHORT, bars))
+    for bars in (1, 0):
+        open_now, close_now, body_now = c.prev("open", bars), c.prev("close", bars), c.prev("real_body", bars)
+        open_before, close_before = c.prev("open", bars + 1), c.prev("close", bars + 1)
+        signal &= ((close_now > close_before)
+                   & (open_now > open_before)
+                   & (open_now <= close_before + c.average(_NEAR, bars + 1))
+                   & (body_now > c.prev("real_body", bars + 1) - c.average(_FAR, bars + 1)))
+    signal &= c.real_body > c.average(_BODY_SHORT)
+    return _score(signal, 100, LOOKBACK["cdl_3whitesoldiers"])
+
+def cdl_3blackcrows(open_, high=None, low=None, close=None):
+    """Three black crows: a white candle, then three blacks with falling closes, each opening within the prior body"""
+    c = _candles(open_, high, low, close)
+    signal = c.prev("white", 3) & (c.prev("high", 3) > c.prev("close", 2))
+    for bars in (2, 1, 0):
+        signal &= c.prev("black", bars) & (c.prev("lower_shadow", bars) < c.average(_SHADOW_VERY_SHORT, bars))
+    for bars in (1, 0):
+        open_now, close_now = c.prev("open", bars), c.prev("close", bars)
+        open_before, close_before = c.prev("open", bars + 1), c.prev("close", bars + 1)
+        signal &= (open_now < open_before) & (open_now > close_before) & (close_before > close_now)
+    return _score(signal, -100, LOOKBACK["cdl_3blackcrows"])
+
+def cdl_sandwich(open_, high=None, low=None, close=None):
+    """Stick sandwich: black, white trading above its close, black closing at the first close"""
+    c = _candles(open_, high, low, close)
+    first_close = c.prev("close", 2)
+    equal = c.average(_EQUAL, 2)
+    signal = (c.prev("black", 2)
+              & c.prev("white", 1)
+              & c.black
+              & (c.prev("low", 1) > first_close)
+              & (c.close <= first_close + equal)
+              & (c.close >= first_close - equal))
+    return _score(signal, 100, LOOKBACK["cdl_sandwich"])
+
+# Bars before the first candle TA-Lib scores (matching its *_Lookback functions)
+LOOKBACK = {
+    "cdl_hammer": 11,
+    "cdl_hangingman": 11,
+    "cdl_inverted_hammer": 11,
+    "cdl_shootingstar": 11,
+    "cdl_engulfing": 2,
+    "cdl_morningstar": 12,
+    "cdl_eveningstar": 12,
+    "cdl_doji": 9,
+    "cdl_piercing": 11,
+    "cdl_darkcloudcover": 11,
+    "cdl_3whitesoldiers": 12,
+    "cdl_3blackcrows": 13,
+    "cdl_sandwich": 7,
+}
+
+# Kernel revision, part of the scan result cache keys: bump a kernel's number whenever
+# a change to it can alter its scores, so results of the old code stop being served
+KERNEL_VERSIONS = {
+    "cdl_hammer": 1,
+    "cdl_hangingman": 1,
+    "cdl_inverted_hammer": 1,
+    "cdl_shootingstar": 1,
+    "cdl_engulfing": 1,
+    "cdl_morningstar": 1,
+    "cdl_eveningstar": 1,
+    "cdl_doji": 1,
+    "cdl_piercing": 1,
+    "cdl_darkcloudcover": 1,
+    "cdl_3whitesoldiers": 1,
+    "cdl_3blackcrows": 1,
+    "cdl_sandwich": 1,
+}
+
+CANDLESTICK_KERNELS = {
+    "cdl_hammer": cdl_hammer,
+    "cdl_hangingman": cdl_hangingman,
+    "cdl_inverted_hammer": cdl_inverted_hammer,
+    "cdl_shootingstar": cdl_shootingstar,
+    "cdl_engulfing": cdl_engulfing,
+    "cdl_morningstar": cdl_morningstar,
+    "cdl_eveningstar": cdl_eveningstar,
+    "cdl_doji": cdl_doji,
+    "cdl_piercing": cdl_piercing,
+    "cdl_darkcloudcover": cdl_darkcloudcover,
+    "cdl_3whitesoldiers": cdl_3whitesoldiers,
+    "cdl_3blackcrows": cdl_3blackcrows,
+    "cdl_sandwich": cdl_sandwich,
+}
+
+def evaluate_kernels(kernel_names, open_, high, low, close):
+    """
+    Run several kernels over one panel, sharing the derived candle measures
+
+    Returns:
+        dict: Kernel name -> int16 score array shaped (symbols, bars)
+    """
+    candles = _Candles(open_, high, low, close)
+    return {name: CANDLESTICK_KERNELS[name](candles) for name in dict.fromkeys(kernel_names)}
+
+def stack_tails(ohlc_arrays, width):
+    """
+    Align the last `width` bars of several symbols into one panel
+
+    Args:
+        ohlc_arrays: Per-symbol (4, n) open/high/low/close arrays
+        width: Bars kept per symbol; shorter histories are NaN-padded on the left
+
+    Returns:
+        np.ndarray: (4, symbols, width) float64 panel
+    """
+    panel = np.full((4, len(ohlc_arrays), width), np.nan)
+    for row, ohlc in enumerate(ohlc_arrays):
+        tail = ohlc[:, -width:]
+        panel[:, row, width - tail.shape[1]:] = tail
+    return panel
@@ -0,0 +1,182 @@
+# chart_pattern_cnn/inference.py
+"""
+Batched CPU inference of ChartPatternCNN over many symbols.
+
+Each symbol's close windows are a strided view over its closes (stepped by
+stride and aligned so the last window ends on the last bar), min-max normalized
+straight into one preallocated float32 batch buffer: the buffer is the only copy
+of the windows. Buffers of up to batch_size windows, mixed across symbols, run
+through the model under torch.inference_mode with a configurable number of
+threads and come back as per-symbol, per-window class probabilities.
+"""
+import os
+import threading
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import torch
+
+from chart_pattern_cnn.model import ChartPatternCNN
+
+DEFAULT_WINDOW = 100
+DEFAULT_STRIDE = 5
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_MIN_PROBABILITY = 0.5
+# Trained weights (a state_dict saved with torch.save)
+DEFAULT_WEIGHTS_PATH = os.environ.get(
+    "FP_CNN_WEIGHTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "chart_pattern_cnn.pt")
+)
+# Torch threads for inference (0 = torch's default)
+DEFAULT_NUM_THREADS = int(os.environ.get("FP_CNN_THREADS", "0"))
+
+# Model output classes, as in the model's example (class 0: head and shoulders)
+CLASS_NAMES = ("Head and Shoulders", "No Pattern")
+
+def window_view(closes, window=DEFAULT_WINDOW, stride=DEFAULT_STRIDE, last_windows=None):
+    """
+    Strided close windows ending on the last bar, as a view (nothing is copied)
+
+    Args:
+        closes: 1-D close array
+        window: Bars per window
+        stride: Bars between consecutive window ends
+        last_windows: Only the most recent windows (None for all of them)
+
+    Returns:
+        tuple: ((k, window) view oldest first, (k,) position of each window's last bar)
+    """
+    closes = np.asarray(closes)
+    if len(closes) < window:
+        return np.empty((0, window), dtype=closes.dtype), np.empty(0, dtype=np.int64)
+    windows = sliding_window_view(closes, window)
+    # First start whose steps of stride land on the window ending at the last bar
+    starts = np.arange((len(windows) - 1) % stride, len(windows), stride)
+    if last_windows:
+        starts = starts[-last_windows:]
+    return windows[starts[0]::stride], starts + window - 1
+
+def normalize_windows(windows, out):
+    """
+    Min-max normalize each window to [0, 1] into out
+
+    Flat windows become all zeros; windows with missing closes become NaN (and score NaN).
+
+    Args:
+        windows: (k, window) array or view
+        out: (k, window) float32 array to write to
+    """
+    low = windows.min(axis=1, keepdims=True)
+    span = windows.max(axis=1, keepdims=True) - low
+    span[span == 0] = 1
+    np.subtract(windows, low, out=out, casting="same_kind")
+    np.divide(out, span, out=out, casting="same_kind")
+    return out
+
+def load_model(weights_path=DEFAULT_WEIGHTS_PATH):
+    """
+    ChartPatternCNN with trained weights, in eval mode
+
+    Raises:
+        FileNotFoundError: If there is no weights file
+    """
+    if not os.path.exists(weights_path):
+        raise FileNotFoundError(f"No chart pattern CNN weights at {weights_path} (set FP_CNN_WEIGHTS)")
+    state = torch.load(weights_path, map_location="cpu", weights_only=True)
+    state = state.get("state_dict", state)
+    model = ChartPatternCNN(num_classes=state["fc2.weight"].shape[0], pooled_length=state["fc1.weight"].shape[1] // 32)
+    model.load_state_dict(state)
+    return model.eval()
+
+class ChartPatternScorer:
+    """Scores strided close windows of many symbols with ChartPatternCNN in large CPU batches"""
+
+    def __init__(self, model=None, weights_path=None, window=DEFAULT_WINDOW, stride=DEFAULT_STRIDE,
+                 batch_size=DEFAULT_BATCH_SIZE, num_threads=DEFAULT_NUM_THREADS, min_probability=DEFAULT_MIN_PROBABILITY):
+        """
+        Args:
+            model: ChartPatternCNN to use (loaded from weights_path if None)
+            weights_path: Weights file (defaults to DEFAULT_WEIGHTS_PATH)
+            window: Bars per window
+            stride: Bars between consecutive window ends
+            batch_size: Windows per forward pass
+            num_threads: Torch intra-op threads (process-wide; 0/None leaves torch's default)
+            min_probability: Probability a window needs to count as a match
+
+        Raises:
+            ValueError: If window is shorter than 4 bars (the model pools twice by 2)
+        """
+        if window < 4:
+            raise ValueError(f"CNN windows need at least 4 bars, got {window}")
+        weights_path = weights_path or DEFAULT_WEIGHTS_PATH
+        if model is None:
+            model = load_model(weights_path)
+            stat = os.stat(weights_path)
+            self.model_version = f"{os.path.basename(weights_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+        else:
+            self.model_version = f"in-memory:{id(model)}"
+        self.model = model.eval()
+        self.num_classes = self.model.fc2.out_features
+        self.window = window
+        self.stride = stride
+        self.batch_size = max(1, batch_size)
+        self.min_probability = min_probability
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+    def settings(self):
+        """Everything a window's probability depends on (for result cache keys)"""
+        return {"model": self.model_version, "window": self.window, "stride": self.stride,
+                "min_probability": self.min_probability}
+
+    def _run(self, buffer, filled, pending):
+        with torch.inference_mode():
+            logits = self.model(torch.from_numpy(buffer[:filled]))
+            probabilities = torch.softmax(logits, dim=1).numpy()
+        for target, row, buffer_row, count in pending:
+            target[row:row + count] = probabilities[buffer_row:buffer_row + count]
+
+    def score(self, close_arrays, last_windows=None):
+        """
+        Class probabilities of each symbol's strided close windows
+
+        Args:
+            close_arrays: Dict of symbol -> 1-D close array
+            last_windows: Only each symbol's most recent windows (None for all of them)
+
+        Returns:
+            dict: Symbol -> {'window_end': (k,) position of each window's last bar,
+                             'probabilities': (k, num_classes) float32 array}, oldest window first
+        """
+        results = {}
+        buffer = np.empty((self.batch_size, 1, self.window), dtype=np.float32)
+        filled = 0
+        pending = []  # (target array, first target row, first buffer row, rows) of the filled buffer
+        for symbol, closes in close_arrays.items():
+            windows, ends = window_view(closes, self.window, self.stride, last_windows)
+            probabilities = np.empty((len(windows), self.num_classes), dtype=np.float32)
+            results[symbol] = {"window_end": ends, "probabilities": probabilities}
+            done = 0
+            while done < len(windows):
+                # A symbol's windows may straddle two forward passes
+                take = min(len(windows) - done, self.batch_size - filled)
+                normalize_windows(windows[done:done + take], buffer[filled:filled + take, 0])
+                pending.append((probabilities, done, filled, take))
+                filled += take
+                done += take
+                if filled == self.batch_size:
+                    self._run(buffer, filled, pending)
+                    filled, pending = 0, []
+        if filled:
+            self._run(buffer, filled, pending)
+        return results
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_chart_pattern_scorer():
+    """Process-wide scorer with the default weights, created on first use"""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = ChartPatternScorer()
+        return _scorer
@@ -8,18 +8,22 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 class ChartPatternCNN(nn.Module):
-    def __init__(self, num_classes=2):
+    def __init__(self, num_classes=2, pooled_length=25):
         super().__init__()
         self.conv1 = nn.Conv1d(1, 16, kernel_size=5, stride=1, padding=2)
         self.conv2 = nn.Conv1d(16, 32, kernel_size=5, stride=1, padding=2)
         self.pool = nn.MaxPool1d(2)
-        self.fc1 = nn.Linear(32 * 25, 64)
+        # Any window length (>= 4) is pooled to pooled_length before the classifier; a
+        # 100-step window already pools to 25, so weights trained on those load unchanged
+        self.adaptive_pool = nn.AdaptiveAvgPool1d(pooled_length)
+        self.fc1 = nn.Linear(32 * pooled_length, 64)
         self.fc2 = nn.Linear(64, num_classes)
 
     def forward(self, x):
         # x shape: (batch, 1, window_length)
         x = self.pool(F.relu(self.conv1(x)))
         x = self.pool(F.relu(self.conv2(x)))
+        x = self.adaptive_pool(x)
         x = x.view(x.size(0), -1)
         x = F.relu(self.fc1(x))
         x = self.fc2(x)
@@ -28,3 +32,4 @@ class ChartPatternCNN(nn.Module):
 # Example usage:
 # model = ChartPatternCNN(num_classes=2)  # 2 classes: head-and-shoulders, no-pattern
 # output = model(torch.randn(8, 1, 100))  # batch of 8 windows, each 100 timesteps
+# output = model(torch.randn(8, 1, 60))   # other window lengths work too
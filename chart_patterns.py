@@ -1,14 +1,94 @@
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from pivot_index import PivotIndex
 
 # Chart pattern detection utilities
 # Each function takes a DataFrame with columns: ['Open', 'High', 'Low', 'Close'] and returns a list of indices or regions where the pattern is detected.
+# Detectors accept a shared PivotIndex (pivots=) so several patterns can run over one set of pivots and trend context per symbol.
+
+def _flag_and_pole_mask(closes, pole_lookback, flag_length, min_pole_pct, min_flag_retrace, inverted):
+    """
+    Flag end positions of (inverted) flag and pole patterns for a (symbols, bars) close array
+
+    Pole move, flag retrace and the flag's floor (inverted) or ceiling are
+    computed for every candidate flag end at once over sliding-window views.
+    Rows shorter than the array are padded with NaN at the end, which never
+    matches.
+
+    Returns:
+        np.ndarray: (symbols, bars - pole_lookback - flag_length) bool array; column k is flag end pole_lookback + flag_length + k
+    """
+    first = pole_lookback + flag_length
+    if closes.shape[1] <= first:
+        return np.zeros((closes.shape[0], 0), dtype=bool)
+    pole_start = closes[:, :-first]
+    pole_end = closes[:, pole_lookback:closes.shape[1] - flag_length]
+    flag_end = closes[:, first:]
+    flag = sliding_window_view(closes[:, pole_lookback:], flag_length + 1, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if inverted:
+            # Pole: sharp downtrend, Flag: mild retrace up that never closes below the pole's end
+            pole_move = (pole_start - pole_end) / pole_start
+            flag_retrace = (flag_end - pole_end) / pole_end
+            flag_ok = flag.min(axis=2) >= pole_end
+        else:
+            # Pole: sharp uptrend, Flag: mild pullback that never closes above the pole's end
+            pole_move = (pole_end - pole_start) / pole_start
+            flag_retrace = (pole_end - flag_end) / pole_end
+            flag_ok = flag.max(axis=2) <= pole_end
+    return (pole_move >= min_pole_pct) & (flag_retrace >= min_flag_retrace) & flag_ok
+
+def _stack_closes(close_arrays):
+    """Close arrays of different lengths as one (symbols, bars) float array, NaN-padded at the end"""
+    arrays = [np.asarray(closes, dtype=np.float64) for closes in close_arrays]
+    stacked = np.full((len(arrays), max((len(closes) for closes in arrays), default=0)), np.nan)
+    for row, closes in enumerate(arrays):
+        stacked[row, :len(closes)] = closes
+    return stacked
+
+def _flag_and_pole_batch(close_arrays, pole_lookback, flag_length, min_pole_pct, min_flag_retrace, inverted):
+    mask = _flag_and_pole_mask(_stack_closes(close_arrays), pole_lookback, flag_length,
+                               min_pole_pct, min_flag_retrace, inverted)
+    results = [[] for _ in close_arrays]
+    first = pole_lookback + flag_length
+    for row, k in zip(*np.nonzero(mask)):
+        flag_end = first + int(k)
+        flag_start = flag_end - flag_length
+        results[row].append((flag_start - pole_lookback, flag_start, flag_start, flag_end))
+    return results
 
-def detect_flag_and_pole(df):
-    # Placeholder: Implement flag and pole detection logic
-    # Return list of (start_idx, end_idx) for detected patterns
-    return []
+def detect_flag_and_pole(df, pole_lookback=10, flag_length=5, min_uptrend_pct=0.03, min_flag_retrace=0.01, pivots=None):
+    """
+    Detect flag and pole pattern during an uptrend.
+    Args:
+        df: DataFrame with columns ['Open', 'High', 'Low', 'Close']
+        pole_lookback: Number of candles to look back for the pole (sharp uptrend)
+        flag_length: Number of candles for the flag (consolidation)
+        min_uptrend_pct: Minimum % rise for pole
+        min_flag_retrace: Minimum % pullback for flag
+        pivots: PivotIndex of df's closes to reuse (its closes are used if given)
+    Returns:
+        List of tuples: (pole_start_idx, pole_end_idx, flag_start_idx, flag_end_idx)
+    """
+    closes = pivots.values if pivots is not None else df['Close'].values
+    return _flag_and_pole_batch([closes], pole_lookback, flag_length, min_uptrend_pct, min_flag_retrace, False)[0]
 
-def detect_inverted_flag_and_pole(df, pole_lookback=10, flag_length=5, min_downtrend_pct=0.03, min_flag_retrace=0.01):
+def detect_flag_and_pole_batch(close_arrays, pole_lookback=10, flag_length=5, min_uptrend_pct=0.03,
+                               min_flag_retrace=0.01):
+    """
+    Detect flag and pole patterns for many symbols at once.
+    Args:
+        close_arrays: Close arrays (one per symbol, lengths may differ) or a (symbols, bars) array
+        (other arguments as for detect_flag_and_pole)
+    Returns:
+        List with each symbol's list of (pole_start_idx, pole_end_idx, flag_start_idx, flag_end_idx) tuples
+    """
+    return _flag_and_pole_batch(close_arrays, pole_lookback, flag_length, min_uptrend_pct, min_flag_retrace, False)
+
+def detect_inverted_flag_and_pole(df, pole_lookback=10, flag_length=5, min_downtrend_pct=0.03, min_flag_retrace=0.01,
+                                  pivots=None):
     """
     Detect inverted flag and pole pattern during a downtrend.
     Args:
@@ -17,29 +97,68 @@ def detect_inverted_flag_and_pole(df, pole_lookback=10, flag_length=5, min_downt
         flag_length: Number of candles for the flag (consolidation)
         min_downtrend_pct: Minimum % drop for pole
         min_flag_retrace: Minimum % retrace for flag
+        pivots: PivotIndex of df's closes to reuse (its closes are used if given)
     Returns:
         List of tuples: (pole_start_idx, pole_end_idx, flag_start_idx, flag_end_idx)
     """
-    results = []
-    closes = df['Close'].values
-    n = len(df)
-    for i in range(pole_lookback + flag_length, n):
-        pole_start = i - pole_lookback - flag_length
-        pole_end = i - flag_length
-        flag_start = pole_end
-        flag_end = i
-        if pole_start < 0:
-            continue
-        pole_drop = (closes[pole_start] - closes[pole_end]) / closes[pole_start]
-        flag_retrace = (closes[flag_end] - closes[flag_start]) / closes[pole_end]
-        # Pole: sharp downtrend, Flag: mild retrace up
-        if pole_drop >= min_downtrend_pct and flag_retrace >= min_flag_retrace:
-            # Check that flag is a mild upward consolidation
-            if all(closes[j] >= closes[flag_start] for j in range(flag_start, flag_end+1)):
-                results.append((pole_start, pole_end, flag_start, flag_end))
-    return results
+    closes = pivots.values if pivots is not None else df['Close'].values
+    return _flag_and_pole_batch([closes], pole_lookback, flag_length, min_downtrend_pct, min_flag_retrace, True)[0]
+
+def detect_inverted_flag_and_pole_batch(close_arrays, pole_lookback=10, flag_length=5, min_downtrend_pct=0.03,
+                                        min_flag_retrace=0.01):
+    """
+    Detect inverted flag and pole patterns for many symbols at once.
+    Args:
+        close_arrays: Close arrays (one per symbol, lengths may differ) or a (symbols, bars) array
+        (other arguments as for detect_inverted_flag_and_pole)
+    Returns:
+        List with each symbol's list of (pole_start_idx, pole_end_idx, flag_start_idx, flag_end_idx) tuples
+    """
+    return _flag_and_pole_batch(close_arrays, pole_lookback, flag_length, min_downtrend_pct, min_flag_retrace, True)
 
-def detect_double_top(df, tolerance=0.005, min_separation=8, trend_lookback=10):
+def _double_extremes(pivots, bottoms, tolerance, min_separation, trend_lookback):
+    """
+    Pairs of pivot highs (double top) or pivot lows (double bottom) of similar close
+
+    Each first extreme that ends a trend over trend_lookback bars is paired with
+    the next pivot of the same kind at least min_separation bars later; the
+    most extreme close between them must retrace beyond both.
+
+    Returns:
+        list: (first_idx, middle_idx, second_idx) tuples
+    """
+    closes = pivots.values
+    extremes = pivots.lows if bottoms else pivots.highs
+    # First extremes: pivots that end an uptrend (tops) or a downtrend (bottoms)
+    first = extremes[extremes >= 3 + trend_lookback]
+    trend = pivots.change(trend_lookback)[first]
+    first = first[trend < 0] if bottoms else first[trend > 0]
+    # Second extreme: the first pivot of the same kind at least min_separation bars later
+    nxt = pivots.next_pivots(extremes, first + min_separation)
+    adjacent = nxt < len(extremes)
+    adjacent[adjacent] = extremes[nxt[adjacent]] - first[adjacent] <= 1
+    for row in np.flatnonzero(adjacent):
+        # Extremes closer than two bars leave no pivot between them; those are
+        # skipped while they match (only reachable with min_separation < 2)
+        k = nxt[row]
+        while (k < len(extremes) and extremes[k] - first[row] <= 1
+               and abs(closes[extremes[k]] - closes[first[row]]) <= tolerance * closes[first[row]]):
+            k += 1
+        nxt[row] = k
+    found = nxt < len(extremes)
+    first, second = first[found], extremes[nxt[found]]
+    close_enough = np.abs(closes[second] - closes[first]) <= tolerance * closes[first]
+    first, second = first[close_enough], second[close_enough]
+    # Middle pivot: most extreme close between them, beyond both
+    if bottoms:
+        middle = pivots.range_argmax(first + 1, second)
+        valid = closes[middle] > np.maximum(closes[first], closes[second])
+    else:
+        middle = pivots.range_argmin(first + 1, second)
+        valid = closes[middle] < np.minimum(closes[first], closes[second])
+    return [(int(i), int(m), int(j)) for i, m, j in zip(first[valid], middle[valid], second[valid])]
+
+def detect_double_top(df, tolerance=0.005, min_separation=8, trend_lookback=10, pivots=None):
     """
     Detect double top patterns in OHLC DataFrame.
     Args:
@@ -47,57 +166,217 @@ def detect_double_top(df, tolerance=0.005, min_separation=8, trend_lookback=10):
         tolerance: Fractional tolerance for closeness of tops (e.g. 0.005 = 0.5%)
         min_separation: Minimum number of candles between tops
         trend_lookback: Number of candles before first top to check for uptrend
+        pivots: PivotIndex of df's closes to reuse (built if None)
     Returns:
         List of tuples: (first_top_idx, pivot_low_idx, second_top_idx)
     """
-    results = []
-    closes = df['Close'].values
-    highs = df['High'].values
-    lows = df['Low'].values
-    n = len(df)
-    # Find local maxima (pivot highs)
-    for i in range(3 + trend_lookback, n-3):
-        # Check uptrend before first top
-        trend_start = i - trend_lookback
-        trend_end = i
-        if closes[trend_end] <= closes[trend_start]:
-            continue  # Not an uptrend
-        if closes[i] == max(closes[i-3:i+4]):
-            # First top candidate
-            first_top_idx = i
-            first_top_close = closes[i]
-            # Search for second top after min_separation
-            for j in range(i+min_separation, n-3):
-                if closes[j] == max(closes[j-3:j+4]):
-                    second_top_idx = j
-                    second_top_close = closes[j]
-                    # Check closeness of closes
-                    if abs(second_top_close - first_top_close) <= tolerance * first_top_close:
-                        # Find pivot low between tops
-                        pivot_range = closes[first_top_idx+1:second_top_idx]
-                        if len(pivot_range) == 0:
-                            continue
-                        pivot_low_idx_rel = pivot_range.argmin()
-                        pivot_low_idx = first_top_idx + 1 + pivot_low_idx_rel
-                        # Ensure pivot low is below both tops
-                        if closes[pivot_low_idx] < min(first_top_close, second_top_close):
-                            results.append((first_top_idx, pivot_low_idx, second_top_idx))
-                    break  # Only look for first valid second top after first top
-    return results
+    if pivots is None:
+        pivots = PivotIndex.from_frame(df)
+    return _double_extremes(pivots, False, tolerance, min_separation, trend_lookback)
 
-def detect_double_bottom(df):
-    # Placeholder: Implement double bottom detection logic
-    return []
+def detect_double_bottom(df, tolerance=0.005, min_separation=8, trend_lookback=10, pivots=None):
+    """
+    Detect double bottom patterns in OHLC DataFrame.
+    Args:
+        df: DataFrame with columns ['Open', 'High', 'Low', 'Close']
+        tolerance: Fractional tolerance for closeness of bottoms (e.g. 0.005 = 0.5%)
+        min_separation: Minimum number of candles between bottoms
+        trend_lookback: Number of candles before first bottom to check for downtrend
+        pivots: PivotIndex of df's closes to reuse (built if None)
+    Returns:
+        List of tuples: (first_bottom_idx, pivot_high_idx, second_bottom_idx)
+    """
+    if pivots is None:
+        pivots = PivotIndex.from_frame(df)
+    return _double_extremes(pivots, True, tolerance, min_separation, trend_lookback)
+
+def _head_and_shoulders(pivots, inverted, shoulder_tolerance, min_separation, trend_lookback, min_head_pct):
+    """
+    Head and shoulders (pivot highs) or inverted head and shoulders (pivot lows)
+
+    Every pivot is tried as the head; its shoulders are the nearest pivots of
+    the same kind at least min_separation bars away on either side. The head
+    must be the most extreme close from shoulder to shoulder and clear both by
+    min_head_pct, the shoulders must be within shoulder_tolerance of each other,
+    and the trend over trend_lookback bars into the left shoulder must point
+    towards the pattern.
+
+    Returns:
+        list: (left_shoulder_idx, left_neckline_idx, head_idx, right_neckline_idx, right_shoulder_idx) tuples
+    """
+    closes = pivots.values
+    extremes = pivots.lows if inverted else pivots.highs
+    gap = max(min_separation, 2)  # leaves a neckline bar on each side of the head
+    left_k = np.searchsorted(extremes, extremes - gap, side="right") - 1
+    right_k = pivots.next_pivots(extremes, extremes + gap)
+    found = (left_k >= 0) & (right_k < len(extremes))
+    head, left, right = extremes[found], extremes[left_k[found]], extremes[right_k[found]]
+
+    trend = pivots.change(trend_lookback)[left]
+    shoulders_level = np.abs(closes[right] - closes[left]) <= shoulder_tolerance * closes[left]
+    if inverted:
+        dominant = pivots.range_argmin(left, right + 1) == head
+        clears = closes[head] <= np.minimum(closes[left], closes[right]) * (1 - min_head_pct)
+        valid = (trend < 0) & shoulders_level & dominant & clears
+    else:
+        dominant = pivots.range_argmax(left, right + 1) == head
+        clears = closes[head] >= np.maximum(closes[left], closes[right]) * (1 + min_head_pct)
+        valid = (trend > 0) & shoulders_level & dominant & clears
+    head, left, right = head[valid], left[valid], right[valid]
+
+    # Neckline: most extreme close between each shoulder and the head, beyond both shoulders
+    if inverted:
+        left_neck = pivots.range_argmax(left + 1, head)
+        right_neck = pivots.range_argmax(head + 1, right)
+        shoulder_bound = np.maximum(closes[left], closes[right])
+        valid = (closes[left_neck] > shoulder_bound) & (closes[right_neck] > shoulder_bound)
+    else:
+        left_neck = pivots.range_argmin(left + 1, head)
+        right_neck = pivots.range_argmin(head + 1, right)
+        shoulder_bound = np.minimum(closes[left], closes[right])
+        valid = (closes[left_neck] < shoulder_bound) & (closes[right_neck] < shoulder_bound)
+    return [tuple(int(idx) for idx in points) for points in
+            zip(left[valid], left_neck[valid], head[valid], right_neck[valid], right[valid])]
+
+def detect_head_and_shoulders(df, shoulder_tolerance=0.03, min_separation=5, trend_lookback=10, min_head_pct=0.01,
+                              pivots=None):
+    """
+    Detect head and shoulders patterns in OHLC DataFrame.
+    Args:
+        df: DataFrame with columns ['Open', 'High', 'Low', 'Close']
+        shoulder_tolerance: Fractional tolerance for closeness of the shoulders
+        min_separation: Minimum number of candles between each shoulder and the head
+        trend_lookback: Number of candles before the left shoulder to check for uptrend
+        min_head_pct: Minimum % the head closes above both shoulders
+        pivots: PivotIndex of df's closes to reuse (built if None)
+    Returns:
+        List of tuples: (left_shoulder_idx, left_neckline_idx, head_idx, right_neckline_idx, right_shoulder_idx)
+    """
+    if pivots is None:
+        pivots = PivotIndex.from_frame(df)
+    return _head_and_shoulders(pivots, False, shoulder_tolerance, min_separation, trend_lookback, min_head_pct)
+
+def detect_inverted_head_and_shoulders(df, shoulder_tolerance=0.03, min_separation=5, trend_lookback=10,
+                                       min_head_pct=0.01, pivots=None):
+    """
+    Detect inverted head and shoulders patterns in OHLC DataFrame.
+    Args:
+        df: DataFrame with columns ['Open', 'High', 'Low', 'Close']
+        shoulder_tolerance: Fractional tolerance for closeness of the shoulders
+        min_separation: Minimum number of candles between each shoulder and the head
+        trend_lookback: Number of candles before the left shoulder to check for downtrend
+        min_head_pct: Minimum % the head closes below both shoulders
+        pivots: PivotIndex of df's closes to reuse (built if None)
+    Returns:
+        List of tuples: (left_shoulder_idx, left_neckline_idx, head_idx, right_neckline_idx, right_shoulder_idx)
+    """
+    if pivots is None:
+        pivots = PivotIndex.from_frame(df)
+    return _head_and_shoulders(pivots, True, shoulder_tolerance, min_separation, trend_lookback, min_head_pct)
+
+# Pattern name -> detector
+CHART_PATTERN_DETECTORS = {
+    "Double Top": detect_double_top,
+    "Double Bottom": detect_double_bottom,
+    "Head and Shoulders": detect_head_and_shoulders,
+    "Inverted Head and Shoulders": detect_inverted_head_and_shoulders,
+    "Flag and Pole": detect_flag_and_pole,
+    "Inverted Flag and Pole": detect_inverted_flag_and_pole,
+}
+
+# Names of the points in each detector's match tuple (scan rows carry <point>_idx and <point>_date)
+CHART_PATTERN_POINTS = {
+    "Double Top": ("first_top", "pivot_low", "second_top"),
+    "Double Bottom": ("first_bottom", "pivot_high", "second_bottom"),
+    "Head and Shoulders": ("left_shoulder", "left_neckline", "head", "right_neckline", "right_shoulder"),
+    "Inverted Head and Shoulders": ("left_shoulder", "left_neckline", "head", "right_neckline", "right_shoulder"),
+    "Flag and Pole": ("pole_start", "pole_end", "flag_start", "flag_end"),
+    "Inverted Flag and Pole": ("pole_start", "pole_end", "flag_start", "flag_end"),
+    "CNN Head and Shoulders": ("window_start", "window_end"),
+}
+
+# Patterns scored by the chart pattern CNN (chart_pattern_cnn.inference) over a batch of
+# symbols at once instead of by a per-symbol detector: pattern name -> model class index
+CNN_CHART_PATTERNS = {
+    "CNN Head and Shoulders": 0,
+}
 
-def detect_head_and_shoulders(df):
-    # Placeholder: Implement head and shoulders detection logic
-    return []
+# Bars a recency scan hands each detector: the pattern's span plus its trend context
+CHART_PATTERN_LOOKBACK = {
+    "Double Top": 120,
+    "Double Bottom": 120,
+    "Head and Shoulders": 150,
+    "Inverted Head and Shoulders": 150,
+    "Flag and Pole": 60,
+    "Inverted Flag and Pole": 60,
+    "CNN Head and Shoulders": 145,  # ten 100-bar windows, 5 bars apart
+}
 
-def detect_inverted_head_and_shoulders(df):
-    # Placeholder: Implement inverted head and shoulders detection logic
-    return []
+# Detector revision, part of the scan result cache keys: bump a pattern's number whenever
+# a change to its detector (or scoring) can alter its matches
+CHART_PATTERN_VERSIONS = {
+    "Double Top": 1,
+    "Double Bottom": 1,
+    "Head and Shoulders": 1,
+    "Inverted Head and Shoulders": 1,
+    "Flag and Pole": 1,
+    "Inverted Flag and Pole": 1,
+    "CNN Head and Shoulders": 1,
+}
+
+def chart_pattern_lookback(pattern_names):
+    """Bars a scan for several patterns evaluates: the longest of their lookbacks"""
+    return max((CHART_PATTERN_LOOKBACK.get(name, 0) for name in pattern_names), default=0)
+
+def _latest_match(matches, offset):
+    if not matches:
+        return None
+    latest = max(matches, key=lambda match: match[-1])
+    return tuple(offset + int(idx) for idx in latest)
+
+def detect_latest(detector, df, lookback=None, **params):
+    """
+    Run a detector on the last lookback bars only and return its freshest match.
+    Args:
+        detector: Detection function returning a list of index tuples
+        df: DataFrame with columns ['Open', 'High', 'Low', 'Close']
+        lookback: Bars to evaluate (None for the whole frame)
+        params: Passed through to the detector
+    Returns:
+        Tuple of indices into df for the match completing last (largest final index), or None
+    """
+    offset = max(0, len(df) - lookback) if lookback else 0
+    return _latest_match(detector(df.iloc[offset:], **params), offset)
+
+def detect_latest_patterns(df, pattern_names, lookback=None):
+    """
+    Run several detectors over one shared pivot index of the last lookback bars.
+    Args:
+        df: DataFrame with columns ['Open', 'High', 'Low', 'Close']
+        pattern_names: Names from CHART_PATTERN_DETECTORS
+        lookback: Bars to evaluate for every pattern (None for each pattern's own
+            CHART_PATTERN_LOOKBACK, 0 for the whole frame)
+    Returns:
+        Dict of pattern name -> freshest match as indices into df, or None
+    """
+    if lookback is None:
+        # The shared window covers the longest lookback; patterns with a shorter one
+        # drop the matches starting before their own
+        own_lookback = {name: CHART_PATTERN_LOOKBACK[name] for name in pattern_names}
+        window_bars = max(own_lookback.values(), default=0)
+    else:
+        own_lookback = dict.fromkeys(pattern_names, lookback)
+        window_bars = lookback
+    offset = max(0, len(df) - window_bars) if window_bars else 0
+    window = df.iloc[offset:]
+    # Pivots and trend context are computed once and shared by every detector
+    pivots = PivotIndex.from_frame(window)
+    first_bar = {name: max(0, len(window) - bars) if bars else 0 for name, bars in own_lookback.items()}
+    return {name: _latest_match([match for match in CHART_PATTERN_DETECTORS[name](window, pivots=pivots)
+                                 if match[0] >= first_bar[name]], offset)
+            for name in pattern_names}
 
 # Example usage:
 # detected_flags = detect_flag_and_pole(df)
 # detected_double_tops = detect_double_top(df)
-# ...
+# latest = detect_latest_patterns(df, list(CHART_PATTERN_DETECTORS), lookback=150)
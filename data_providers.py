@@ -0,0 +1,161 @@
+"""
+Pluggable market data providers for the data layer.
+
+A provider exposes ``download(symbol, interval, start=None)`` returning an OHLCV
+DataFrame indexed by date. ``start=None`` means the full history; otherwise only
+candles from ``start`` onwards are returned, which is what incremental refreshes use.
+``download_many(symbols, interval)`` fetches full histories for several symbols in
+one request and returns a dict of symbol -> DataFrame. Symbols the provider reports
+as having no data map to an empty DataFrame; symbols that came back empty for any
+other reason (network errors, throttling) are left out.
+"""
+import os
+import logging
+from contextlib import contextmanager
+import pandas as pd
+from ohlcv_store import OHLCV_COLUMNS
+
+# yfinance failure reasons that mean a ticker has no data, as opposed to throttling or network errors
+NO_DATA_REASONS = ("possibly delisted", "no price data found", "no timezone found", "no data found")
+
+def clean_ohlcv(df):
+    """Keep OHLCV columns, coerce them to numbers and drop incomplete rows"""
+    candlestick_df = df[OHLCV_COLUMNS].copy()
+    candlestick_df = candlestick_df.apply(pd.to_numeric, errors='coerce')
+    candlestick_df = candlestick_df.dropna()
+    return candlestick_df
+
+class _ErrorReport(logging.Handler):
+    """Collects the per-ticker failures yfinance logs at the end of a download"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+    def reason(self, ticker):
+        """Logged failure reason for ticker, or None if yfinance reported none"""
+        for message in self.messages:
+            if f"'{ticker}'" in message:
+                return message
+        return None
+
+@contextmanager
+def _yfinance_errors():
+    """Capture yfinance's per-ticker error report for the downloads run inside the block"""
+    report = _ErrorReport()
+    logger = logging.getLogger("yfinance")
+    logger.addHandler(report)
+    try:
+        yield report
+    finally:
+        logger.removeHandler(report)
+
+def _is_no_data(reason):
+    return reason is not None and any(marker in reason.lower() for marker in NO_DATA_REASONS)
+
+class YFinanceProvider:
+    """Provider backed by yfinance for NSE listed symbols"""
+
+    def __init__(self, suffix=".NS"):
+        self.suffix = suffix
+
+    def download(self, symbol, interval, start=None):
+        """
+        Download candles for symbol
+
+        Args:
+            symbol: Stock symbol without exchange suffix
+            interval: Candle interval, e.g. '1d'
+            start: First candle date to fetch, or None for the full history
+
+        Returns:
+            pandas.DataFrame: OHLCV data indexed by date (empty if yfinance has no data for symbol)
+
+        Raises:
+            RuntimeError: If yfinance reports a failure other than missing data, e.g. rate limiting
+        """
+        import yfinance as yf
+        ticker = f"{symbol}{self.suffix}"
+        with _yfinance_errors() as report:
+            if start is None:
+                # Fetch all available data from the first candle to today
+                all_data = yf.download(ticker, period="max", interval=interval,
+                                       auto_adjust=False, multi_level_index=False)
+            else:
+                all_data = yf.download(ticker, start=pd.Timestamp(start).strftime("%Y-%m-%d"),
+                                       interval=interval, auto_adjust=False, multi_level_index=False)
+        candlestick_df = clean_ohlcv(all_data)
+        # yfinance returns an empty frame instead of raising, whatever went wrong
+        reason = report.reason(ticker)
+        if candlestick_df.empty and reason is not None and not _is_no_data(reason):
+            raise RuntimeError(f"yfinance download of {ticker} failed: {reason}")
+        return candlestick_df
+
+    def download_many(self, symbols, interval):
+        """
+        Download full histories for several symbols through yfinance's multi-ticker path
+
+        Args:
+            symbols: Stock symbols without exchange suffix
+            interval: Candle interval
+
+        Returns:
+            dict: symbol -> OHLCV DataFrame; empty for symbols yfinance reports as having no
+            data, symbols that came back empty for any other reason are left out
+        """
+        import yfinance as yf
+        tickers = [f"{symbol}{self.suffix}" for symbol in symbols]
+        with _yfinance_errors() as report:
+            all_data = yf.download(tickers, period="max", interval=interval, auto_adjust=False,
+                                   group_by="ticker", threads=True, progress=False)
+        frames = {}
+        for symbol, ticker in zip(symbols, tickers):
+            if ticker in all_data.columns.get_level_values(0):
+                candlestick_df = clean_ohlcv(all_data[ticker])
+                if not candlestick_df.empty:
+                    frames[symbol] = candlestick_df
+                    continue
+            if _is_no_data(report.reason(ticker)):
+                frames[symbol] = pd.DataFrame(columns=OHLCV_COLUMNS)
+        return frames
+
+class LocalProvider:
+    """
+    Provider serving candles from local fixture files, a stand-in for the network in tests.
+
+    Files are looked up as ``<directory>/<SYMBOL>_<interval>.csv`` and then
+    ``<directory>/<SYMBOL>.csv`` (Parquet files with the same names also work).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _find_file(self, symbol, interval):
+        for name in (f"{symbol}_{interval}", symbol):
+            for ext in (".parquet", ".csv"):
+                path = os.path.join(self.directory, name + ext)
+                if os.path.exists(path):
+                    return path
+        return None
+
+    def download(self, symbol, interval, start=None):
+        """Read candles for symbol from the fixture directory (see YFinanceProvider.download)"""
+        path = self._find_file(symbol, interval)
+        if path is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        if 'Date' in df.columns:
+            df = df.set_index('Date')
+        df.index = pd.to_datetime(df.index)
+        df = clean_ohlcv(df).sort_index()
+        if start is not None:
+            df = df.loc[df.index >= pd.Timestamp(start)]
+        return df
+
+    def download_many(self, symbols, interval):
+        """Read full histories for several symbols (see YFinanceProvider.download_many)"""
+        # A symbol without a fixture file has no data
+        return {symbol: self.download(symbol, interval) for symbol in symbols}
@@ -0,0 +1,152 @@
+"""
+Memory-bounded LRU cache for stock histories.
+
+Entries are accounted by their DataFrame memory footprint and the least recently
+used unpinned entries are evicted once the byte budget is exceeded. The cache is
+shared by the scanner threads and the chart renderer, so every operation takes
+the cache lock. Pins are counted per key, so several owners (e.g. the watchlists
+of several sessions) can pin the same key and it stays pinned until all of them
+unpinned it.
+"""
+import os
+import threading
+from collections import OrderedDict, Counter
+
+# Default budget can be overridden per deployment (bytes)
+DEFAULT_MAX_BYTES = int(os.environ.get("FP_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+def frame_nbytes(df):
+    """Memory footprint of a DataFrame in bytes, including its index"""
+    if df is None:
+        return 0
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+class HistoryCache:
+    """Thread-safe LRU cache of DataFrames with a byte budget and pinning"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_bytes: Byte budget; unpinned entries are evicted beyond it
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # key -> (df, nbytes)
+        self._pinned = Counter()  # key -> pin count
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Get an entry and mark it most recently used, counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key, default=None):
+        """Get an entry without touching LRU order or counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def put(self, key, df):
+        """Insert or replace an entry, then evict down to the byte budget"""
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (df, nbytes)
+            self._total_bytes += nbytes
+            self._evict()
+
+    def pop(self, key, default=None):
+        """Remove an entry and return it"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._total_bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        """Drop all entries (pins and counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def pin(self, key):
+        """Exempt a key from eviction (the key does not need to be cached yet)"""
+        with self._lock:
+            self._pinned[key] += 1
+
+    def unpin(self, key):
+        """Release one pin of a key; it is evictable again once every pin is released"""
+        with self._lock:
+            if key not in self._pinned:
+                return
+            self._pinned[key] -= 1
+            if self._pinned[key] <= 0:
+                del self._pinned[key]
+                self._evict()
+
+    def pinned(self):
+        """Set of pinned keys"""
+        with self._lock:
+            return set(self._pinned)
+
+    def set_max_bytes(self, max_bytes):
+        """Change the byte budget, evicting immediately if it shrank"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        # Walk from least to most recently used, skipping pinned keys
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key in list(self._entries.keys()):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key in self._pinned:
+                continue
+            _, nbytes = self._entries.pop(key)
+            self._total_bytes -= nbytes
+            self.evictions += 1
+
+    def entry_sizes(self):
+        """Bytes held per key, in LRU order (least recent first)"""
+        with self._lock:
+            return OrderedDict((key, nbytes) for key, (_, nbytes) in self._entries.items())
+
+    def stats(self):
+        """
+        Cache counters
+
+        Returns:
+            dict: hits, misses, evictions, entries, pinned, bytes, max_bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'pinned': len(self._pinned),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
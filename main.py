@@ -3,6 +3,7 @@
 import pandas as pd
 import requests
 import os
+from symbol_universe import get_symbol_universe
 
 
 def fetch_nse_stock_names(csv_path="EQUITY_L.csv"):
@@ -17,9 +18,8 @@ def fetch_nse_stock_names(csv_path="EQUITY_L.csv"):
 		# response.raise_for_status()
 		# with open(csv_path, "wb") as f:
 		# 	f.write(response.content)
-		# Load the CSV locally
-		df = pd.read_csv(csv_path)
-		stock_names = df['NAME OF COMPANY'].tolist()
+		# Load the CSV locally through the shared universe index
+		stock_names = get_symbol_universe(csv_path).names.tolist()
 		return stock_names
 	except Exception as e:
 		print(f"Error fetching NSE stock names: {e}")
@@ -0,0 +1,97 @@
+"""
+Negative cache for symbols whose downloads fail or return no data.
+
+Each entry records why a (symbol, interval) is skipped and when it expires. The
+cache is persisted as JSON next to the on-disk OHLCV store so every process and
+restart skips the same suspended or delisted symbols until their TTL runs out.
+Processes re-read the file whenever it changed on disk and update it under a
+lock file (see shared_json), so concurrent scans keep each other's entries.
+"""
+import threading
+import time
+
+from shared_json import SharedJSONFile
+
+# Symbols that returned no candles are most likely delisted or suspended
+NO_DATA_TTL = 7 * 24 * 3600
+# Download errors may be transient, so they are retried sooner
+ERROR_TTL = 6 * 3600
+
+class NegativeCache:
+    """Persistent TTL cache of failing (symbol, interval) pairs with a reason per entry"""
+
+    FILE_NAME = "negative_cache.json"
+
+    def __init__(self, path):
+        """
+        Args:
+            path: JSON file the entries are persisted to
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._file = SharedJSONFile(path, indent=1, sort_keys=True)
+
+    @staticmethod
+    def make_key(symbol, interval):
+        return f"{symbol}_{interval}"
+
+    def _load(self):
+        return self._file.load()
+
+    def add(self, symbol, interval, reason, ttl=NO_DATA_TTL):
+        """Record a failing symbol for ttl seconds"""
+        now = time.time()
+        with self._lock, self._file.updating() as entries:
+            entries[self.make_key(symbol, interval)] = {
+                "symbol": symbol,
+                "interval": interval,
+                "reason": reason,
+                "failed_at": now,
+                "expires_at": now + ttl,
+            }
+
+    def get(self, symbol, interval):
+        """
+        Get the live entry for a symbol, dropping it if expired
+
+        Returns:
+            dict or None: {'symbol', 'interval', 'reason', 'failed_at', 'expires_at'}
+        """
+        key = self.make_key(symbol, interval)
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.time():
+                with self._file.updating() as entries:
+                    # Another process may have renewed the entry meanwhile
+                    entry = entries.get(key)
+                    if entry is not None and entry["expires_at"] <= time.time():
+                        del entries[key]
+                        entry = None
+            return dict(entry) if entry else None
+
+    def is_blocked(self, symbol, interval):
+        """Check whether symbol should be skipped"""
+        return self.get(symbol, interval) is not None
+
+    def remove(self, symbol, interval):
+        """Drop an entry so the symbol is probed again"""
+        with self._lock:
+            if self.make_key(symbol, interval) in self._load():
+                with self._file.updating() as entries:
+                    entries.pop(self.make_key(symbol, interval), None)
+
+    def clear(self, interval=None):
+        """Drop all entries, or only those for one interval"""
+        with self._lock, self._file.updating() as entries:
+            for key in [k for k, e in entries.items() if interval is None or e["interval"] == interval]:
+                del entries[key]
+
+    def entries(self, interval=None):
+        """List live entries, optionally filtered by interval"""
+        now = time.time()
+        with self._lock:
+            return [dict(e) for e in self._load().values()
+                    if e["expires_at"] > now and (interval is None or e["interval"] == interval)]
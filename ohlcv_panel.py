@@ -0,0 +1,157 @@
+"""
+Compact memory-mapped OHLCV panel for full-universe workloads.
+
+A panel stores one interval for many symbols as contiguous arrays on disk under
+``<root>/panel/<interval>/``:
+
+    timestamps.i64          int64 epoch nanoseconds, all symbols back to back
+    Open.f32 ... Volume.f32 float32 values aligned with timestamps
+    index.json              symbol order, offsets table and data versions
+
+Rows ``offsets[i]:offsets[i + 1]`` belong to ``symbols[i]``. The files are opened
+with ``numpy.memmap`` in read-only mode, so every process mapping the same panel
+shares the same page-cache pages instead of holding its own copy.
+
+Memory comparison (full NSE universe, ~2150 symbols x ~6.5k daily bars = ~14M rows):
+
+    dict of DataFrames   5 float64/int64 columns + DatetimeIndex = 48 B/row
+                         ~670 MB private memory per process, plus per-frame overhead
+    OHLCVPanel           5 float32 columns + int64 timestamps     = 28 B/row
+                         ~390 MB on disk, mapped once and shared by all processes;
+                         only pages actually touched become resident
+
+``python -m benchmarks.bench_panel_memory`` measures both on synthetic data.
+float32 keeps ~7 significant digits, which is ample for prices and for volumes
+used in indicators, but the panel is not meant for exact volume accounting.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+from ohlcv_store import OHLCV_COLUMNS
+
+PANEL_DIR_NAME = "panel"
+
+def panel_dir(store_root, interval):
+    """Directory holding the panel for interval under a store root"""
+    return os.path.join(store_root, PANEL_DIR_NAME, interval)
+
+def build_panel(symbols, interval, store_root, load_history, data_version=None):
+    """
+    Write a panel for symbols by streaming each history to the column files
+
+    Args:
+        symbols: Symbols to include (symbols without data are left out)
+        interval: Candle interval
+        store_root: Store directory the panel is written under
+        load_history: Callable (symbol, interval) -> OHLCV DataFrame
+        data_version: Optional callable (symbol, interval) -> int recorded per symbol
+
+    Returns:
+        OHLCVPanel: The freshly written panel, opened read-only
+    """
+    directory = panel_dir(store_root, interval)
+    os.makedirs(directory, exist_ok=True)
+    included, offsets, versions = [], [0], []
+    files = {field: open(os.path.join(directory, f"{field}.f32.tmp"), "wb") for field in OHLCV_COLUMNS}
+    files["timestamps"] = open(os.path.join(directory, "timestamps.i64.tmp"), "wb")
+    try:
+        for symbol in symbols:
+            df = load_history(symbol, interval)
+            if df is None or df.empty:
+                continue
+            np.asarray(df.index.as_unit("ns").asi8, dtype=np.int64).tofile(files["timestamps"])
+            for field in OHLCV_COLUMNS:
+                df[field].to_numpy(dtype=np.float32).tofile(files[field])
+            included.append(symbol)
+            offsets.append(offsets[-1] + len(df))
+            versions.append(int(data_version(symbol, interval)) if data_version else 0)
+    finally:
+        for f in files.values():
+            f.close()
+
+    for field in OHLCV_COLUMNS:
+        os.replace(os.path.join(directory, f"{field}.f32.tmp"), os.path.join(directory, f"{field}.f32"))
+    os.replace(os.path.join(directory, "timestamps.i64.tmp"), os.path.join(directory, "timestamps.i64"))
+    index_path = os.path.join(directory, "index.json")
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"interval": interval, "symbols": included, "offsets": offsets, "versions": versions}, f)
+    os.replace(index_path + ".tmp", index_path)
+    return OHLCVPanel.open(store_root, interval)
+
+class OHLCVPanel:
+    """Read-only memory-mapped view of one interval's OHLCV data for many symbols"""
+
+    def __init__(self, interval, symbols, offsets, versions, timestamps, fields):
+        self.interval = interval
+        self.symbols = symbols
+        self.offsets = offsets
+        self.versions = versions
+        self.timestamps = timestamps
+        self.fields = fields
+        self._row_by_symbol = {symbol: i for i, symbol in enumerate(symbols)}
+
+    @classmethod
+    def open(cls, store_root, interval):
+        """
+        Map an existing panel
+
+        Raises:
+            FileNotFoundError: If no panel was built for interval
+        """
+        directory = panel_dir(store_root, interval)
+        with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        offsets = np.asarray(index["offsets"], dtype=np.int64)
+
+        def mapped(name, dtype):
+            # np.memmap cannot map empty files
+            if offsets[-1] == 0:
+                return np.empty(0, dtype=dtype)
+            return np.memmap(os.path.join(directory, name), dtype=dtype, mode="r", shape=(int(offsets[-1]),))
+
+        fields = {field: mapped(f"{field}.f32", np.float32) for field in OHLCV_COLUMNS}
+        return cls(interval, index["symbols"], offsets, index.get("versions", [0] * len(index["symbols"])),
+                   mapped("timestamps.i64", np.int64), fields)
+
+    def __contains__(self, symbol):
+        return symbol in self._row_by_symbol
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def version(self, symbol):
+        """Data version the symbol had when the panel was built"""
+        return self.versions[self._row_by_symbol[symbol]]
+
+    def bounds(self, symbol):
+        """(start, end) row range of symbol in the column arrays"""
+        row = self._row_by_symbol[symbol]
+        return int(self.offsets[row]), int(self.offsets[row + 1])
+
+    def arrays(self, symbol):
+        """
+        Zero-copy arrays for symbol
+
+        Returns:
+            dict: 'timestamps' (int64 epoch ns) and one float32 array per OHLCV field
+        """
+        start, end = self.bounds(symbol)
+        arrays = {field: values[start:end] for field, values in self.fields.items()}
+        arrays["timestamps"] = self.timestamps[start:end]
+        return arrays
+
+    def frame(self, symbol):
+        """
+        DataFrame view of symbol's history backed by the mapped pages (read-only)
+
+        Returns:
+            pandas.DataFrame: OHLCV frame indexed by date, sharing memory with the panel
+        """
+        arrays = self.arrays(symbol)
+        index = pd.DatetimeIndex(np.asarray(arrays.pop("timestamps")).view("datetime64[ns]"), copy=False, name="Date")
+        return pd.DataFrame({field: np.asarray(arrays[field]) for field in OHLCV_COLUMNS}, index=index, copy=False)
+
+    def nbytes(self):
+        """Total size of the mapped column arrays"""
+        return int(self.timestamps.nbytes + sum(values.nbytes for values in self.fields.values()))
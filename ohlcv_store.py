@@ -0,0 +1,188 @@
+"""
+Persistent on-disk OHLCV store.
+
+Each (symbol, interval) history is kept as one compressed Parquet file under
+``<root>/<interval>/<SYMBOL>.parquet``. A JSON manifest at ``<root>/manifest.json``
+records the last candle timestamp, row count and data version of every file so
+callers can inspect the store without opening the data files. The data version
+is bumped on every write, so consumers can tell when a history gained new bars.
+
+Several processes (the dashboard, scan_cli.py, scan_worker.py workers) can share
+one store: the manifest is re-read whenever it changed on disk and updated under
+a lock file (see shared_json), so no process drops another's entries or reuses
+a data version.
+"""
+import os
+import threading
+import warnings
+from datetime import datetime
+import pandas as pd
+
+from shared_json import SharedJSONFile
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Store location can be overridden for deployments and offline tests
+DEFAULT_STORE_DIR = os.environ.get(
+    "FP_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_store")
+)
+
+def _parquet_available():
+    """Check whether a Parquet engine is installed"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        pass
+    try:
+        import fastparquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class OHLCVStore:
+    """Columnar on-disk store for OHLCV histories, one file per (symbol, interval)"""
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, root=DEFAULT_STORE_DIR, compression="zstd"):
+        """
+        Args:
+            root: Directory holding the data files and manifest
+            compression: Parquet compression codec
+        """
+        self.root = root
+        self.compression = compression
+        self.enabled = _parquet_available()
+        if not self.enabled:
+            warnings.warn("No Parquet engine installed (pyarrow/fastparquet); on-disk OHLCV store disabled")
+        self._lock = threading.RLock()
+        self._manifest = SharedJSONFile(os.path.join(root, self.MANIFEST_NAME), indent=1, sort_keys=True)
+
+    @staticmethod
+    def make_key(symbol, interval):
+        """Manifest key for a (symbol, interval) pair"""
+        return f"{symbol}_{interval}"
+
+    def _path(self, symbol, interval):
+        safe_symbol = symbol.replace(os.sep, "_")
+        return os.path.join(self.root, interval, f"{safe_symbol}.parquet")
+
+    def _load_manifest(self):
+        return self._manifest.load()
+
+    def get_entry(self, symbol, interval):
+        """
+        Get the manifest entry for a stored history
+
+        Returns:
+            dict or None: {'symbol', 'interval', 'last_timestamp', 'rows', 'version', 'updated_at'}
+        """
+        with self._lock:
+            entry = self._load_manifest().get(self.make_key(symbol, interval))
+            return dict(entry) if entry else None
+
+    def entries(self, interval=None):
+        """List manifest entries, optionally filtered by interval"""
+        with self._lock:
+            return [dict(e) for e in self._load_manifest().values()
+                    if interval is None or e.get("interval") == interval]
+
+    def has(self, symbol, interval):
+        """Check whether a history is stored for symbol and interval"""
+        return self.enabled and self.get_entry(symbol, interval) is not None and os.path.exists(self._path(symbol, interval))
+
+    def read(self, symbol, interval):
+        """
+        Read a stored history
+
+        Returns:
+            pandas.DataFrame or None: OHLCV frame indexed by date, None if not stored
+        """
+        if not self.has(symbol, interval):
+            return None
+        try:
+            df = pd.read_parquet(self._path(symbol, interval))
+        except Exception as e:
+            print(f"Error reading {symbol} ({interval}) from store: {e}")
+            return None
+        return df
+
+    def write(self, symbol, interval, df):
+        """
+        Write a full history for symbol and interval, replacing any stored copy
+
+        Args:
+            symbol: Stock symbol (without exchange suffix)
+            interval: Candle interval, e.g. '1d'
+            df: OHLCV DataFrame indexed by date
+
+        Returns:
+            int or None: New data version of the stored history, None if nothing was written
+        """
+        if not self.enabled or df is None or df.empty:
+            return None
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        frame = df[OHLCV_COLUMNS].rename_axis("Date")
+        # Per-writer temp file; the data file and its manifest entry are swapped in together
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        frame.to_parquet(tmp_path, compression=self.compression)
+        with self._lock, self._manifest.updating() as manifest:
+            os.replace(tmp_path, path)
+            # Versions only grow, also across processes writing the same history
+            previous = manifest.get(self.make_key(symbol, interval)) or {}
+            version = int(previous.get("version", 0)) + 1
+            manifest[self.make_key(symbol, interval)] = {
+                "symbol": symbol,
+                "interval": interval,
+                "last_timestamp": pd.Timestamp(frame.index[-1]).isoformat(),
+                "rows": int(len(frame)),
+                "version": version,
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+            }
+        return version
+
+    def delete(self, symbol, interval):
+        """Remove a stored history and its manifest entry"""
+        with self._lock, self._manifest.updating() as manifest:
+            try:
+                os.remove(self._path(symbol, interval))
+            except OSError:
+                pass
+            manifest.pop(self.make_key(symbol, interval), None)
+
+    def import_file(self, symbol, interval, path):
+        """
+        Fill the store from a CSV or Parquet fixture file
+
+        The file must have a Date column (or date index) and OHLCV columns.
+        """
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path)
+        if "Date" in df.columns:
+            df["Date"] = pd.to_datetime(df["Date"])
+            df = df.set_index("Date")
+        df.index = pd.to_datetime(df.index)
+        df = df[OHLCV_COLUMNS].apply(pd.to_numeric, errors="coerce").dropna().sort_index()
+        self.write(symbol, interval, df)
+        return len(df)
+
+    def load_fixtures(self, directory, interval="1d"):
+        """
+        Fill the store from a directory of fixture files named ``SYMBOL.csv`` or ``SYMBOL.parquet``
+
+        Returns:
+            list: Symbols that were imported
+        """
+        imported = []
+        for name in sorted(os.listdir(directory)):
+            symbol, ext = os.path.splitext(name)
+            if ext not in (".csv", ".parquet"):
+                continue
+            if self.import_file(symbol, interval, os.path.join(directory, name)):
+                imported.append(symbol)
+        return imported
@@ -1,10 +1,15 @@
 import pandas as pd
-from chart_patterns import detect_double_top
-from stock_data import get_all_stock_symbols, fetch_stock_chart_data
+from chart_patterns import detect_double_top, detect_latest, CHART_PATTERN_LOOKBACK
+from stock_data import get_all_stock_symbols, fetch_stock_chart_data, prefetch_stock_data, split_negative_cached
 
-def scan_stocks_for_double_top(interval="1d", start_date=None, end_date=None, cancel_event=None):
+def scan_stocks_for_double_top(interval="1d", start_date=None, end_date=None, cancel_event=None, skipped=None,
+                               lookback=CHART_PATTERN_LOOKBACK["Double Top"]):
     results = []
-    symbols = get_all_stock_symbols()
+    # Delisted/failing symbols are skipped up front and reported through skipped
+    symbols, skipped_entries = split_negative_cached(get_all_stock_symbols(), interval)
+    if skipped is not None:
+        skipped.extend(skipped_entries)
+    prefetch_stock_data(symbols, interval, cancel_event=cancel_event)
     for symbol in symbols:
         if cancel_event and cancel_event.is_set():
             break
@@ -13,10 +18,10 @@ def scan_stocks_for_double_top(interval="1d", start_date=None, end_date=None, ca
             if chart_data is None or chart_data.empty:
                 continue
             dt_index = chart_data.index if hasattr(chart_data.index, 'to_list') else chart_data['Date']
-            double_tops = detect_double_top(chart_data)
-            if double_tops:
-                # Only report the first double top found
-                first_top_idx, pivot_low_idx, second_top_idx = double_tops[0]
+            # Only the last lookback bars are evaluated; report the freshest double top
+            double_top = detect_latest(detect_double_top, chart_data, lookback)
+            if double_top:
+                first_top_idx, pivot_low_idx, second_top_idx = double_top
                 result = {
                     "symbol": symbol,
                     "first_top_idx": first_top_idx,
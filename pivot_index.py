@@ -0,0 +1,140 @@
+"""
+Pivot index shared by the chart pattern detectors.
+
+A PivotIndex is built once per price series. Centered rolling-window extrema
+give the sorted positions of every pivot high and pivot low in one vectorized
+pass: position p is a pivot high when values[p] == max(values[p-w:p+w+1]), with
+a full window on both sides. Range min/max queries (sparse tables, built on
+first use) then answer "lowest close between two pivots" for many pivot pairs
+at once, and trend context (change over a lookback) is computed once per
+lookback however many detectors use it. Detectors become walks over adjacent
+pivots instead of rescanning bars for every candidate, so a detector is
+O(n log n) in the series length instead of O(n^2).
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Bars on each side a pivot must dominate
+DEFAULT_PIVOT_WINDOW = 3
+
+def rolling_extrema(values, window=DEFAULT_PIVOT_WINDOW):
+    """
+    Centered rolling max and min over 2 * window + 1 bars
+
+    Returns:
+        tuple: (max, min) arrays aligned with values, NaN where the window is incomplete
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    rolling_max = np.full(n, np.nan)
+    rolling_min = np.full(n, np.nan)
+    span = 2 * window + 1
+    if n >= span:
+        windows = sliding_window_view(values, span)
+        rolling_max[window:n - window] = windows.max(axis=1)
+        rolling_min[window:n - window] = windows.min(axis=1)
+    return rolling_max, rolling_min
+
+class PivotIndex:
+    """Pivot high/low positions and range extremum queries for one series"""
+
+    def __init__(self, values, window=DEFAULT_PIVOT_WINDOW):
+        """
+        Args:
+            values: Price series (array-like)
+            window: Bars on each side a pivot must dominate
+        """
+        self.values = np.asarray(values, dtype=np.float64)
+        self.window = window
+        rolling_max, rolling_min = rolling_extrema(self.values, window)
+        self.highs = np.flatnonzero(self.values == rolling_max)
+        self.lows = np.flatnonzero(self.values == rolling_min)
+        self._tables = {}
+        self._changes = {}
+
+    @classmethod
+    def from_frame(cls, df, column="Close", window=DEFAULT_PIVOT_WINDOW):
+        """Pivot index of one column of an OHLC DataFrame"""
+        return cls(df[column].values, window)
+
+    def __len__(self):
+        return len(self.values)
+
+    def change(self, lookback):
+        """
+        Trend context: fractional change of each value over the previous lookback bars
+
+        Computed once per lookback and shared by every detector that asks for it.
+
+        Returns:
+            np.ndarray: (values[p] - values[p - lookback]) / values[p - lookback], NaN for the first lookback bars
+        """
+        if lookback not in self._changes:
+            n = len(self.values)
+            change = np.full(n, np.nan)
+            if 0 <= lookback < n:
+                base = self.values[:n - lookback]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    change[lookback:] = (self.values[lookback:] - base) / base
+            self._changes[lookback] = change
+        return self._changes[lookback]
+
+    def next_pivots(self, pivots, positions):
+        """
+        Index into pivots of the first pivot at or after each position
+
+        Returns:
+            np.ndarray: Indices (len(pivots) where there is none)
+        """
+        return np.searchsorted(pivots, positions, side="left")
+
+    def _sparse_table(self, kind):
+        """Levels of argmin/argmax over power-of-two windows (ties resolve to the earliest bar)"""
+        if kind not in self._tables:
+            values = self.values if kind == "min" else -self.values
+            levels = [np.arange(len(values))]
+            width = 1
+            while 2 * width <= len(values):
+                previous = levels[-1]
+                left, right = previous[:len(values) - 2 * width + 1], previous[width:len(values) - width + 1]
+                levels.append(np.where(values[left] <= values[right], left, right))
+                width *= 2
+            self._tables[kind] = (values, levels)
+        return self._tables[kind]
+
+    def _range_arg(self, kind, starts, ends):
+        values, levels = self._sparse_table(kind)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        result = np.full(len(starts), -1, dtype=np.int64)
+        valid = ends > starts
+        if not valid.any():
+            return result
+        s, e = starts[valid], ends[valid]
+        level = np.floor(np.log2(e - s)).astype(np.int64)
+        left = np.empty(len(s), dtype=np.int64)
+        right = np.empty(len(s), dtype=np.int64)
+        for k in np.unique(level):
+            rows = level == k
+            left[rows] = levels[k][s[rows]]
+            right[rows] = levels[k][e[rows] - (1 << int(k))]
+        result[valid] = np.where(values[left] <= values[right], left, right)
+        return result
+
+    def range_argmin(self, starts, ends):
+        """
+        Position of the lowest value in each [start, end) range (first occurrence)
+
+        Returns:
+            np.ndarray: Positions, -1 for empty ranges
+        """
+        return self._range_arg("min", starts, ends)
+
+    def range_argmax(self, starts, ends):
+        """
+        Position of the highest value in each [start, end) range (first occurrence)
+
+        Returns:
+            np.ndarray: Positions, -1 for empty ranges
+        """
+        return self._range_arg("max", starts, ends)
@@ -0,0 +1,284 @@
+"""
+Headless batch scanner for scheduled (e.g. end-of-day cron) runs.
+
+Runs candlestick and chart pattern scans through the same scanner service,
+job scheduler, pipeline and result cache as the dashboard, and writes each
+scan's results as JSON and/or Parquet together with timing metadata, so they
+can be precomputed after market close and loaded instantly later (the
+dashboard's scanners list the JSON outputs in DEFAULT_OUTPUT_DIR under
+"Precomputed scans").
+
+Examples:
+    python scan_cli.py candlestick --all-patterns --interval 1d
+    python scan_cli.py chart --patterns "Double Top" --symbols RELIANCE TCS INFY
+    python scan_cli.py candlestick --patterns Hammer Doji --universe EQUITY_L.csv --fetch-workers 8 --format json
+    python scan_cli.py chart --all-patterns --sharded --shard-size 200   (with scan_worker.py workers running)
+
+Exit codes:
+    0  the scan completed and its results were written
+    1  the scan failed or its results could not be written
+    2  invalid arguments
+    130  interrupted (the running scan is cancelled)
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from datetime import date, datetime
+
+import pandas as pd
+
+from scanner import PATTERN_MAP, RECENT_CANDLES
+from symbol_universe import get_symbol_universe, DEFAULT_UNIVERSE_CSV
+from services.scan_service import ScannerService
+from shard_queue import DEFAULT_SHARD_SIZE, DEFAULT_IDLE_TIMEOUT
+from chart_patterns import CHART_PATTERN_DETECTORS, CHART_PATTERN_LOOKBACK
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+DEFAULT_OUTPUT_DIR = "scan_results"
+OUTPUT_FORMATS = ("json", "parquet")
+
+def output_name(kind, patterns, interval, all_patterns=False):
+    """File name stem of a scan's output, e.g. 'candlestick_hammer-doji_1d'"""
+    slug = "all" if all_patterns else "-".join(p.lower().replace(" ", "") for p in patterns)
+    return f"{kind}_{slug}_{interval}"
+
+def chart_lookbacks(patterns, lookback=None):
+    """Bars a chart scan evaluated: the lookback given, or pattern name -> its own default"""
+    if lookback is not None:
+        return lookback
+    return {pattern: CHART_PATTERN_LOOKBACK[pattern] for pattern in patterns}
+
+def result_rows(kind, message):
+    """Flat result rows of a finished scan (one per candlestick hit or chart pattern match)"""
+    if kind == "candlestick":
+        return [row for rows in message.get("hits", {}).values() for row in rows]
+    return list(message.get("results", []))
+
+def _write_atomic(path, write):
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def write_scan_output(output_dir, name, message, metadata, formats=OUTPUT_FORMATS):
+    """
+    Write a finished scan's results
+
+    The JSON file holds the metadata plus the scanner's final message (results,
+    hits, skipped), in the format the dashboard receives; the Parquet file holds
+    the flat result rows with the metadata in its DataFrame attrs.
+
+    Returns:
+        list: Paths written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    if "json" in formats:
+        path = os.path.join(output_dir, name + ".json")
+        document = dict(metadata, scan={k: v for k, v in message.items() if k != "job_id"})
+
+        def write_json(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(document, f, indent=1, default=str)
+        _write_atomic(path, write_json)
+        written.append(path)
+    if "parquet" in formats:
+        path = os.path.join(output_dir, name + ".parquet")
+        df = pd.DataFrame(result_rows(metadata["kind"], message))
+        for column in df.columns:
+            # Mixed objects (dates, tuples) are stored as text
+            if df[column].dtype == object:
+                df[column] = df[column].map(lambda value: value if value is None or isinstance(value, str) else str(value))
+        df.attrs["scan"] = json.dumps(metadata, default=str)
+        _write_atomic(path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+        written.append(path)
+    return written
+
+def load_scan_output(path):
+    """
+    Load a scan written by write_scan_output
+
+    Returns:
+        dict: Metadata with the scanner's final message under 'scan'
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def list_scan_outputs(output_dir=DEFAULT_OUTPUT_DIR, kind=None):
+    """
+    JSON scan outputs in output_dir, newest first
+
+    Args:
+        output_dir: Directory scans were written to
+        kind: Only scans of this kind ('candlestick' or 'chart')
+
+    Returns:
+        dict: Output name -> path
+    """
+    try:
+        file_names = [name for name in os.listdir(output_dir) if name.endswith(".json")]
+    except OSError:
+        return {}
+    if kind:
+        file_names = [name for name in file_names if name.startswith(kind + "_")]
+    paths = [os.path.join(output_dir, name) for name in file_names]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    return {os.path.basename(path)[:-len(".json")]: path for path in paths}
+
+def wait_for_scan(result_queue, poll_interval=0.5):
+    """Wait for a scan's final message (streamed partial matches are skipped)"""
+    while True:
+        try:
+            message = result_queue.get(timeout=poll_interval)
+        except queue.Empty:
+            continue
+        if message.get("type") != "partial":
+            return message
+
+def _parse_date(value):
+    if value == "today":
+        return date.today()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date (expected YYYY-MM-DD or 'today'): {value}")
+
+def build_parser():
+    """Command-line arguments"""
+    today = date.today()
+    parser = argparse.ArgumentParser(
+        prog="scan_cli.py",
+        description="Run candlestick or chart pattern scans headlessly and write the results to disk.",
+    )
+    parser.add_argument("kind", choices=["candlestick", "chart"], help="Scan type")
+    parser.add_argument("--patterns", nargs="+", default=[], metavar="PATTERN", help="Pattern names")
+    parser.add_argument("--all-patterns", action="store_true", help="Scan every supported pattern (chart scans: every rule-based detector)")
+    parser.add_argument("--interval", default="1d", help="Data interval (default: 1d)")
+    parser.add_argument("--start", type=_parse_date, default=today.replace(year=today.year - 1),
+                        help="Start date, YYYY-MM-DD (default: one year ago)")
+    parser.add_argument("--end", type=_parse_date, default=today, help="End date, YYYY-MM-DD or 'today' (default)")
+    symbols = parser.add_mutually_exclusive_group()
+    symbols.add_argument("--symbols", nargs="+", metavar="SYMBOL", help="Symbols to scan")
+    symbols.add_argument("--universe", default=None, metavar="CSV",
+                         help=f"Symbol list CSV with a SYMBOL column (default: {DEFAULT_UNIVERSE_CSV})")
+    parser.add_argument("--recent-candles", type=int, default=RECENT_CANDLES,
+                        help=f"Candlestick scans: latest candles a hit must fall in (default: {RECENT_CANDLES})")
+    parser.add_argument("--lookback", type=int, default=None,
+                        help="Chart scans: bars evaluated per symbol for every pattern (default: each pattern's own, 0 = full range)")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Concurrent data fetch threads per scan (default: 4)")
+    parser.add_argument("--compute-workers", type=int, default=2, help="Concurrent compute threads per scan (default: 2)")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Bulk downloads per second")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Split the scan into shards run by scan_worker.py processes (start them separately)")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help=f"Sharded scans: symbols per shard (default: {DEFAULT_SHARD_SIZE})")
+    parser.add_argument("--queue", default=None, help="Sharded scans: shard queue database (default: next to the OHLCV store)")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help=f"Sharded scans: fail after this many seconds without worker activity (default: {DEFAULT_IDLE_TIMEOUT})")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help=f"Output directory (default: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument("--format", nargs="+", choices=OUTPUT_FORMATS, default=list(OUTPUT_FORMATS),
+                        dest="formats", help="Output formats (default: json parquet)")
+    return parser
+
+def run_scans(args):
+    """
+    Run the scan described by parsed arguments and write its results
+
+    Returns:
+        int: Exit code
+    """
+    supported = list(PATTERN_MAP) if args.kind == "candlestick" else list(CHART_PATTERN_LOOKBACK)
+    # CNN chart patterns need torch and trained weights, so they are only scanned when named
+    every_pattern = list(PATTERN_MAP) if args.kind == "candlestick" else list(CHART_PATTERN_DETECTORS)
+    patterns = every_pattern if args.all_patterns else args.patterns
+    unknown = [p for p in patterns if p not in supported]
+    if not patterns or unknown:
+        print(f"Error: unknown or missing patterns {unknown}; supported: {', '.join(supported)}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols]
+    elif args.universe:
+        try:
+            symbols = get_symbol_universe(args.universe).symbol_list()
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Error reading universe {args.universe}: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    else:
+        symbols = None
+
+    service = ScannerService(fetch_workers=args.fetch_workers, compute_workers=args.compute_workers,
+                             rate_limit=args.rate_limit)
+    cancel_event = threading.Event()
+    common = dict(kind=args.kind, interval=args.interval, start_date=str(args.start), end_date=str(args.end),
+                  universe=None if args.symbols else (args.universe or DEFAULT_UNIVERSE_CSV),
+                  requested_symbols=len(symbols) if symbols is not None else None,
+                  fetch_workers=args.fetch_workers, compute_workers=args.compute_workers)
+
+    # All selected patterns of either kind are evaluated in a single pass per symbol
+    name = output_name(args.kind, patterns, args.interval, args.all_patterns)
+    result_queue = queue.Queue()
+    if args.sharded:
+        lookback = args.lookback if args.kind == "chart" else None
+        service.start_sharded_scan(args.kind, patterns, args.interval, args.start, args.end, result_queue, cancel_event,
+                                   shard_size=args.shard_size, queue_path=args.queue, idle_timeout=args.idle_timeout,
+                                   recent_candles=args.recent_candles, lookback=lookback, symbols=symbols)
+        if args.kind == "candlestick":
+            options = dict(recent_candles=args.recent_candles)
+        else:
+            options = dict(lookback=chart_lookbacks(patterns, lookback))
+        options.update(sharded=True, shard_size=args.shard_size)
+    elif args.kind == "candlestick":
+        service.start_candlestick_scan(patterns, args.interval, args.start, args.end, result_queue, cancel_event,
+                                       recent_candles=args.recent_candles, symbols=symbols)
+        options = dict(recent_candles=args.recent_candles)
+    else:
+        service.start_chart_pattern_scan(patterns, args.interval, args.start, args.end, result_queue, cancel_event,
+                                         lookback=args.lookback, symbols=symbols)
+        options = dict(lookback=chart_lookbacks(patterns, args.lookback))
+
+    started_at = time.time()
+    try:
+        message = wait_for_scan(result_queue)
+    except KeyboardInterrupt:
+        cancel_event.set()
+        print("Interrupted; scan cancelled", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    finished_at = time.time()
+    progress = message.get("progress") or {}
+    metadata = dict(common, **options, patterns=patterns,
+                    generated_at=datetime.now().isoformat(timespec="seconds"),
+                    elapsed_seconds=round(finished_at - started_at, 3),
+                    scan_seconds=round(progress.get("elapsed", 0.0), 3),
+                    symbols_scanned=progress.get("total"),
+                    cached_symbols=message.get("cached"),
+                    skipped_symbols=len(message.get("skipped", [])),
+                    matches=len(message.get("results", [])))
+    if message.get("error") or message.get("cancelled"):
+        print(f"Error: {name} did not complete: {message.get('error') or 'cancelled'}", file=sys.stderr)
+        return EXIT_FAILED
+    for pattern, reason in (message.get("skipped_patterns") or {}).items():
+        print(f"Warning: {name}: {pattern} was not scanned: {reason}", file=sys.stderr)
+    try:
+        written = write_scan_output(args.output_dir, name, message, metadata, args.formats)
+    except Exception as e:
+        print(f"Error writing {name}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    print(f"{name}: {metadata['matches']} matches in {metadata['symbols_scanned']} symbols "
+          f"({metadata['elapsed_seconds']:.1f}s) -> {', '.join(written)}")
+    return EXIT_OK
+
+def main(argv=None):
+    """Command-line entry point"""
+    args = build_parser().parse_args(argv)
+    return run_scans(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""
+Process-wide scan job scheduler.
+
+Every Streamlit session submits its scans here instead of starting its own
+threads. A job is identified by a key describing the scan (kind, patterns,
+interval, range, options): while a job with the same key is queued or running,
+further identical requests subscribe to it instead of starting another scan,
+and its streamed matches, progress snapshots and final summary are fanned out
+to every subscriber's queues. Jobs wait in a priority queue and at most
+max_concurrent_jobs of them run at once.
+
+A job is cancelled once every subscriber has set its cancel event; a cancelled
+subscriber is detached and stops receiving messages.
+"""
+import os
+import itertools
+import queue
+import threading
+import time
+
+from scan_progress import publish_latest
+
+# Lower values run first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+# Finished jobs kept for get_job()/jobs()
+MAX_FINISHED_JOBS = 100
+
+class _Subscriber:
+    """One session's channels for a job"""
+
+    def __init__(self, result_queue, progress_queue, cancel_event):
+        self.result_queue = result_queue
+        self.progress_queue = progress_queue
+        self.cancel_event = cancel_event
+
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+class _ResultChannel:
+    """Result queue stand-in broadcasting a job's messages to its subscribers"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def put(self, message, block=True, timeout=None):
+        self.job._broadcast_result(message)
+
+    put_nowait = put
+
+class _ProgressChannel:
+    """Progress queue stand-in publishing the latest snapshot to every subscriber"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def put(self, snapshot, block=True, timeout=None):
+        self.job._broadcast_progress(snapshot)
+
+    put_nowait = put
+
+class _JobCancelEvent:
+    """Cancel event stand-in that is set once no subscriber wants the job any more"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def is_set(self):
+        return self.job._all_cancelled()
+
+class ScanJob:
+    """A scan shared by one or more subscribers"""
+
+    def __init__(self, job_id, key, run, priority):
+        """
+        Args:
+            job_id: Unique job ID
+            key: Deduplication key
+            run: Callable (result_queue, progress_queue, cancel_event) running the scan
+            priority: Queue priority (lower runs first)
+        """
+        self.id = job_id
+        self.key = key
+        self.run = run
+        self.priority = priority
+        self.status = 'queued'  # queued, running, done, cancelled, failed
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._partials = []  # Streamed messages, replayed to late subscribers
+        self._progress = None
+        self._finished = False
+        self._cancelled = False
+        self.results = _ResultChannel(self)
+        self.progress = _ProgressChannel(self)
+        self.cancel_event = _JobCancelEvent(self)
+
+    def subscribe(self, result_queue, progress_queue=None, cancel_event=None):
+        """
+        Attach a subscriber, replaying the matches and progress published so far
+
+        Returns:
+            bool: False if the job has already finished or been cancelled
+        """
+        with self._lock:
+            if self._finished or self._all_cancelled():
+                return False
+            if any(s.result_queue is result_queue for s in self._subscribers):
+                return True
+            subscriber = _Subscriber(result_queue, progress_queue, cancel_event)
+            self._subscribers.append(subscriber)
+            for message in self._partials:
+                result_queue.put(message)
+            if progress_queue is not None and self._progress is not None:
+                publish_latest(progress_queue, self._progress)
+            return True
+
+    def subscriber_count(self):
+        """Number of attached subscribers"""
+        with self._lock:
+            return len(self._subscribers)
+
+    def info(self):
+        """
+        Job summary
+
+        Returns:
+            dict: id, status, priority, subscribers, created_at, started_at, finished_at, progress, error
+        """
+        with self._lock:
+            return {
+                'id': self.id,
+                'status': self.status,
+                'priority': self.priority,
+                'subscribers': len(self._subscribers),
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'progress': self._progress,
+                'error': self.error,
+            }
+
+    def _all_cancelled(self):
+        with self._lock:
+            if not self._cancelled and self._subscribers:
+                self._subscribers = [s for s in self._subscribers if not s.cancelled()]
+                self._cancelled = not self._subscribers
+            return self._cancelled
+
+    def _broadcast_result(self, message):
+        message = dict(message, job_id=self.id)
+        with self._lock:
+            if message.get('type') == 'partial':
+                self._partials.append(message)
+            else:
+                self._finished = True
+            for subscriber in self._subscribers:
+                if not subscriber.cancelled():
+                    subscriber.result_queue.put(message)
+            if self._finished:
+                # Nobody can subscribe any more, so the replay buffer is not needed by finished jobs
+                self._partials = []
+
+    def _broadcast_progress(self, snapshot):
+        with self._lock:
+            self._progress = snapshot
+            for subscriber in self._subscribers:
+                if subscriber.progress_queue is not None and not subscriber.cancelled():
+                    publish_latest(subscriber.progress_queue, snapshot)
+
+class ScanJobScheduler:
+    """Priority queue of deduplicated scan jobs run by a fixed number of worker threads"""
+
+    def __init__(self, max_concurrent_jobs=DEFAULT_MAX_CONCURRENT_JOBS):
+        """
+        Args:
+            max_concurrent_jobs: Jobs allowed to run at the same time
+        """
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self._lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._active = {}  # key -> queued or running ScanJob
+        self._jobs = {}  # job_id -> ScanJob
+        self._workers = []
+        self.submitted = 0
+        self.deduplicated = 0
+
+    def submit(self, key, run, result_queue, progress_queue=None, cancel_event=None, priority=PRIORITY_NORMAL):
+        """
+        Queue a scan, or subscribe to the identical scan already queued or running
+
+        Args:
+            key: Hashable description of the scan; equal keys are deduplicated
+            run: Callable (result_queue, progress_queue, cancel_event) running the scan and
+                finishing with a non-'partial' message on result_queue
+            result_queue: Subscriber queue for streamed matches and the final message
+            progress_queue: Subscriber queue for progress snapshots (ideally maxsize=1)
+            cancel_event: Subscriber event; the job is cancelled once all subscribers set theirs
+            priority: Lower values run first; joining a queued job can raise its priority
+
+        Returns:
+            str: ID of the job serving the request
+        """
+        with self._lock:
+            self.submitted += 1
+            job = self._active.get(key)
+            if job is not None and job.subscribe(result_queue, progress_queue, cancel_event):
+                self.deduplicated += 1
+                if priority < job.priority and job.status == 'queued':
+                    # Re-queued at the higher priority; the stale entry is skipped when popped
+                    job.priority = priority
+                    self._queue.put((priority, next(self._sequence), job))
+                return job.id
+
+            job = ScanJob(f"scan-{next(self._sequence)}", key, run, priority)
+            job.subscribe(result_queue, progress_queue, cancel_event)
+            self._active[key] = job
+            self._jobs[job.id] = job
+            self._queue.put((priority, next(self._sequence), job))
+            self._start_workers()
+            return job.id
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_concurrent_jobs:
+            worker = threading.Thread(target=self._work, name=f"scan-job-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            with self._lock:
+                if job.status != 'queued':
+                    continue  # Stale entry of a re-prioritized job
+                job.status = 'running'
+                job.started_at = time.time()
+            self._run_job(job)
+
+    def _run_job(self, job):
+        error = None
+        if job.cancel_event.is_set():
+            status = 'cancelled'
+        else:
+            try:
+                job.run(job.results, job.progress, job.cancel_event)
+                status = 'cancelled' if job.cancel_event.is_set() else 'done'
+            except Exception as e:
+                print(f"Error in scan job {job.id}: {e}")
+                status = 'failed'
+                error = str(e)
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.finished_at = time.time()
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+            finished = [j for j in self._jobs.values() if j.finished_at is not None]
+            for old_job in sorted(finished, key=lambda j: j.finished_at)[:len(finished) - MAX_FINISHED_JOBS]:
+                del self._jobs[old_job.id]
+        if status != 'done':
+            # Make sure subscribers leave the running state
+            job.results.put({'type': 'done', 'results': [], 'skipped': [],
+                             'cancelled': status == 'cancelled', 'error': error})
+
+    def get_job(self, job_id):
+        """Job by ID (None if unknown)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Summaries of all jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted((job.info() for job in jobs), key=lambda info: info['created_at'], reverse=True)
+
+    def stats(self):
+        """
+        Scheduler counters
+
+        Returns:
+            dict: submitted, deduplicated, queued, running, max_concurrent_jobs
+        """
+        with self._lock:
+            statuses = [job.status for job in self._active.values()]
+            return {
+                'submitted': self.submitted,
+                'deduplicated': self.deduplicated,
+                'queued': statuses.count('queued'),
+                'running': statuses.count('running'),
+                'max_concurrent_jobs': self.max_concurrent_jobs,
+            }
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scan_scheduler(max_concurrent_jobs=None):
+    """
+    Process-wide scan job scheduler, created on first use
+
+    Args:
+        max_concurrent_jobs: Concurrency limit for a newly created scheduler (defaults
+            to the FP_SCAN_JOBS environment variable, then DEFAULT_MAX_CONCURRENT_JOBS)
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            if max_concurrent_jobs is None:
+                max_concurrent_jobs = int(os.environ.get("FP_SCAN_JOBS", DEFAULT_MAX_CONCURRENT_JOBS))
+            _scheduler = ScanJobScheduler(max_concurrent_jobs=max_concurrent_jobs)
+        return _scheduler
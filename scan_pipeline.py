@@ -0,0 +1,177 @@
+"""
+Staged fetch/compute pipeline for scans.
+
+An I/O stage of fetch threads loads symbol data concurrently (optionally rate
+limited) and feeds a bounded queue; a compute stage of worker threads drains the
+queue in batches. A full queue blocks the fetchers (back-pressure), so memory
+stays bounded however far the network runs ahead, and one cancel event stops
+both stages.
+"""
+import queue
+import threading
+import time
+
+class RateLimiter:
+    """Thread-safe limiter allowing at most rate calls per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    def acquire(self, cancel_event=None):
+        """Block until the next call is allowed; returns False if cancelled while waiting"""
+        with self._lock:
+            now = time.monotonic()
+            wait_until = max(self._next_time, now)
+            self._next_time = wait_until + self.interval
+        while True:
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                return True
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            time.sleep(min(remaining, 0.1))
+
+class ScanPipeline:
+    """Two-stage pipeline: concurrent fetches -> bounded queue -> batched parallel compute"""
+
+    def __init__(self, fetch, compute_batch, fetch_workers=4, compute_workers=2, queue_size=64,
+                 batch_size=16, fetch_chunk_size=1, prepare_chunk=None, rate_limit=None):
+        """
+        Args:
+            fetch: Callable item -> data, or None to skip the item
+            compute_batch: Callable (items, datas) -> list of results, one per item
+            fetch_workers: Concurrent fetch threads
+            compute_workers: Concurrent compute threads
+            queue_size: Fetched items buffered between the stages
+            batch_size: Most items handed to one compute_batch call
+            fetch_chunk_size: Items a fetch thread claims at a time
+            prepare_chunk: Optional callable run once per claimed chunk before its fetches
+                (e.g. a bulk download of the chunk's symbols)
+            rate_limit: Optional limit on I/O calls per second (prepare_chunk calls, or
+                fetch calls when there is no prepare_chunk)
+        """
+        self.fetch = fetch
+        self.compute_batch = compute_batch
+        self.fetch_workers = max(1, fetch_workers)
+        self.compute_workers = max(1, compute_workers)
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.fetch_chunk_size = max(1, fetch_chunk_size)
+        self.prepare_chunk = prepare_chunk
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    def run(self, items, cancel_event=None, on_result=None, on_error=None):
+        """
+        Run the pipeline over items
+
+        Args:
+            items: Items to process (e.g. symbols)
+            cancel_event: Event to signal cancellation of both stages
+            on_result: Called as on_result(item, result) from a compute thread as results arrive
+                (and with None from a fetch thread for items the fetch skipped, and for
+                items whose fetch or compute batch raised)
+            on_error: Called as on_error(item, exception) for every item whose fetch or
+                compute batch raised, before on_result(item, None)
+
+        Returns:
+            list: One result per item in input order (None for skipped or unprocessed items)
+        """
+        items = list(items)
+        results = [None] * len(items)
+        stop = cancel_event if cancel_event is not None else threading.Event()
+        buffer = queue.Queue(maxsize=self.queue_size)
+        claim_lock = threading.Lock()
+        next_chunk = [0]
+        fetchers_left = [self.fetch_workers]
+
+        def claim():
+            with claim_lock:
+                start = next_chunk[0]
+                next_chunk[0] = start + self.fetch_chunk_size
+            return range(start, min(start + self.fetch_chunk_size, len(items)))
+
+        def put(entry):
+            # Blocks while the queue is full; gives up on cancellation
+            while not stop.is_set():
+                try:
+                    buffer.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fetch_worker():
+            try:
+                while not stop.is_set():
+                    positions = claim()
+                    if not positions:
+                        break
+                    if self.prepare_chunk is not None:
+                        if self.rate_limiter and not self.rate_limiter.acquire(stop):
+                            break
+                        try:
+                            self.prepare_chunk([items[p] for p in positions])
+                        except Exception as e:
+                            print(f"Error preparing chunk starting at {items[positions[0]]}: {e}")
+                    for position in positions:
+                        if stop.is_set():
+                            return
+                        if self.prepare_chunk is None and self.rate_limiter and not self.rate_limiter.acquire(stop):
+                            return
+                        try:
+                            data = self.fetch(items[position])
+                        except Exception as e:
+                            print(f"Error fetching {items[position]}: {e}")
+                            if on_error:
+                                on_error(items[position], e)
+                            data = None
+                        if data is None:
+                            if on_result:
+                                on_result(items[position], None)
+                        elif not put((position, data)):
+                            return
+            finally:
+                with claim_lock:
+                    fetchers_left[0] -= 1
+
+        def compute_worker():
+            while not stop.is_set():
+                batch = []
+                try:
+                    batch.append(buffer.get(timeout=0.1))
+                except queue.Empty:
+                    with claim_lock:
+                        if fetchers_left[0] == 0 and buffer.empty():
+                            return
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(buffer.get_nowait())
+                    except queue.Empty:
+                        break
+                positions = [position for position, _ in batch]
+                try:
+                    batch_results = self.compute_batch([items[p] for p in positions], [data for _, data in batch])
+                except Exception as e:
+                    print(f"Error computing batch starting at {items[positions[0]]}: {e}")
+                    # Every item of the batch still counts as processed, so progress reaches the total
+                    for position in positions:
+                        if on_error:
+                            on_error(items[position], e)
+                        if on_result:
+                            on_result(items[position], None)
+                    continue
+                for position, result in zip(positions, batch_results):
+                    results[position] = result
+                    if on_result:
+                        on_result(items[position], result)
+
+        threads = [threading.Thread(target=fetch_worker, daemon=True) for _ in range(self.fetch_workers)]
+        threads += [threading.Thread(target=compute_worker, daemon=True) for _ in range(self.compute_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
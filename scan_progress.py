@@ -0,0 +1,130 @@
+"""
+Structured, coalesced scan progress and incremental result streaming.
+
+Scans report through two channels. Progress is a snapshot (done/total, hits,
+throughput, ETA) published at most a few times a second onto a bounded queue
+that only ever holds the latest snapshot, so the UI reads one item per rerun
+however many symbols were scanned in between. Matches are buffered and sent to
+the result queue in small batches as they are found, ahead of the final
+summary message.
+"""
+import queue
+import threading
+import time
+
+# Seconds between published progress snapshots / streamed result batches
+DEFAULT_PUBLISH_INTERVAL = 0.25
+
+def publish_latest(target_queue, item):
+    """Put item on a bounded queue, replacing the unread item if it is full"""
+    while True:
+        try:
+            target_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                target_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+class ScanProgress:
+    """Thread-safe progress tracker publishing coalesced snapshots"""
+
+    def __init__(self, progress_queue=None, min_interval=DEFAULT_PUBLISH_INTERVAL):
+        """
+        Args:
+            progress_queue: Queue receiving snapshots (ideally maxsize=1), or None
+            min_interval: Least seconds between published snapshots
+        """
+        self.progress_queue = progress_queue
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self.total = 0
+        self.done = 0
+        self.hits = 0
+        self.symbol = None
+        self._started_at = time.monotonic()
+        self._published_at = 0.0
+
+    def start(self, total, done=0, hits=0):
+        """Begin a scan of total symbols, done of which (with hits matches) are already resolved"""
+        with self._lock:
+            self.total, self.done, self.hits = total, done, hits
+            self._started_at = time.monotonic()
+        self._publish(force=True)
+
+    def advance(self, symbol, hit=False):
+        """Record one evaluated symbol"""
+        with self._lock:
+            self.done += 1
+            self.hits += int(bool(hit))
+            self.symbol = symbol
+        self._publish()
+
+    def finish(self):
+        """Publish the final snapshot"""
+        self._publish(force=True)
+
+    def snapshot(self):
+        """
+        Current progress
+
+        Returns:
+            dict: {'done', 'total', 'hits', 'symbol', 'elapsed', 'rate' (symbols/s), 'eta' (seconds or None)}
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            remaining = max(self.total - self.done, 0)
+            return {
+                "done": self.done,
+                "total": self.total,
+                "hits": self.hits,
+                "symbol": self.symbol,
+                "elapsed": elapsed,
+                "rate": rate,
+                "eta": remaining / rate if rate > 0 else None,
+            }
+
+    def _publish(self, force=False):
+        if self.progress_queue is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._published_at < self.min_interval:
+                return
+            self._published_at = now
+        publish_latest(self.progress_queue, self.snapshot())
+
+class ResultStream:
+    """Buffers matches and sends them to a result queue in time-coalesced batches"""
+
+    def __init__(self, result_queue, min_interval=DEFAULT_PUBLISH_INTERVAL, **fields):
+        """
+        Args:
+            result_queue: Queue receiving {'type': 'partial', 'results': [...], ...} messages
+            min_interval: Least seconds between batches
+            fields: Constant fields added to every batch (e.g. pattern=...)
+        """
+        self.result_queue = result_queue
+        self.min_interval = min_interval
+        self.fields = fields
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._flushed_at = time.monotonic()
+
+    def add(self, results):
+        """Queue matches, sending the buffer if the interval has passed"""
+        with self._lock:
+            self._buffer.extend(results)
+            due = time.monotonic() - self._flushed_at >= self.min_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Send any buffered matches now"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._flushed_at = time.monotonic()
+        if batch:
+            self.result_queue.put(dict(self.fields, type='partial', results=batch))
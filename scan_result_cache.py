@@ -0,0 +1,160 @@
+"""
+Persistent cache of per-symbol scan results.
+
+A result is stored per (pattern, interval, params, symbol) together with the
+data version of the symbol's history it was computed from (see
+stock_data.get_data_version). A repeat scan serves every symbol whose version is
+unchanged from the cache and only re-evaluates symbols that gained or changed
+candles. The cache is persisted as JSON next to the on-disk OHLCV store, so the
+results survive Streamlit sessions and restarts, and are dropped together with
+the store (whose versions they refer to).
+
+Several processes (the dashboard, scan_cli.py, scan_worker.py workers) can share
+one cache file: each re-reads the file whenever it changed on disk, and writes
+are read-merge-replace cycles under an exclusive lock file (see shared_json), so
+concurrent scans add to each other's results instead of overwriting them.
+"""
+import os
+import json
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from stock_data import get_ohlcv_store
+from ohlcv_store import DEFAULT_STORE_DIR
+from shared_json import SharedJSONFile
+
+# Scan configurations kept; the least recently used ones are dropped first
+DEFAULT_MAX_SCANS = 64
+
+class ScanResultCache:
+    """Versioned (pattern, interval, params, symbol) -> result cache persisted as JSON"""
+
+    FILE_NAME = "scan_results.json"
+
+    def __init__(self, path, max_scans=DEFAULT_MAX_SCANS):
+        """
+        Args:
+            path: JSON file the results are persisted to
+            max_scans: Scan configurations (pattern, interval, params) to keep
+        """
+        self.path = path
+        self.max_scans = max_scans
+        self._lock = threading.RLock()
+        self._file = SharedJSONFile(path, separators=(",", ":"))
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_scan_key(pattern, interval, params):
+        """Stable key for a scan configuration; params must be JSON-serializable"""
+        raw = json.dumps([pattern, interval, params], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def _load(self):
+        """Cached scans, re-read whenever the file changed since it was last read or written"""
+        return self._file.load()
+
+    @contextmanager
+    def _updating(self):
+        """Read-modify-write cycle: yields the scans as currently on disk and persists them afterwards"""
+        with self._lock, self._file.updating() as scans:
+            yield scans
+
+    def lookup(self, scan_key, versions):
+        """
+        Get cached results computed from the current data
+
+        Args:
+            scan_key: Key from make_scan_key
+            versions: Dict of symbol -> current data version (0 = unknown, never a hit)
+
+        Returns:
+            dict: Symbol -> cached result for every symbol whose stored version matches
+        """
+        found = {}
+        with self._lock:
+            scan = self._load().get(scan_key)
+            stored = scan["results"] if scan else {}
+            for symbol, version in versions.items():
+                entry = stored.get(symbol)
+                if version and entry is not None and entry[0] == version:
+                    found[symbol] = entry[1]
+            self.hits += len(found)
+            self.misses += len(versions) - len(found)
+        return found
+
+    def store(self, scan_key, pattern, interval, params, results):
+        """
+        Record freshly computed results and persist the cache
+
+        Args:
+            scan_key: Key from make_scan_key
+            pattern, interval, params: The scan configuration (kept for inspection)
+            results: Dict of symbol -> (data version, JSON-serializable result)
+        """
+        self.store_many([(scan_key, pattern, interval, params, results)])
+
+    def store_many(self, entries):
+        """
+        Record the results of several scan configurations (e.g. every pattern of one scan) with one write
+
+        Args:
+            entries: Iterable of (scan_key, pattern, interval, params, results) as taken by store
+        """
+        with self._updating() as scans:
+            for scan_key, pattern, interval, params, results in entries:
+                scan = scans.setdefault(scan_key, {
+                    "pattern": pattern,
+                    "interval": interval,
+                    "params": params,
+                    "results": {},
+                })
+                scan["used_at"] = time.time()
+                for symbol, (version, result) in results.items():
+                    if version:
+                        scan["results"][symbol] = [version, result]
+            if len(scans) > self.max_scans:
+                for old_key in sorted(scans, key=lambda key: scans[key].get("used_at", 0))[:len(scans) - self.max_scans]:
+                    del scans[old_key]
+
+    def clear(self, interval=None):
+        """Drop all cached results, or only those for one interval"""
+        with self._updating() as scans:
+            for key in [k for k, scan in scans.items() if interval is None or scan["interval"] == interval]:
+                del scans[key]
+
+    def stats(self):
+        """Hit/miss counters and number of cached results"""
+        with self._lock:
+            scans = self._load()
+            entries = sum(len(scan["results"]) for scan in scans.values())
+            return {"hits": self.hits, "misses": self.misses, "scans": len(scans), "entries": entries}
+
+def range_params(start_date, end_date):
+    """
+    Date-range part of a scan configuration
+
+    An end date of today or later is recorded as open-ended, so a repeat scan on a
+    later day still matches while the data versions are unchanged - as long as the
+    start date is the same. The start is kept as given, because cached results hold
+    bar positions within the range, which shift with it. A start date that moves
+    with the calendar (like the dashboard's default, one year back) therefore only
+    matches scans from the same day.
+    """
+    end = str(end_date)[:10]
+    return {"start": str(start_date)[:10], "end": "latest" if end >= date.today().isoformat() else end}
+
+_result_caches = {}
+_result_caches_lock = threading.Lock()
+
+def get_scan_result_cache():
+    """Scan result cache stored next to the current on-disk OHLCV store (one instance per location)"""
+    store = get_ohlcv_store()
+    path = os.path.join(store.root if store is not None else DEFAULT_STORE_DIR, ScanResultCache.FILE_NAME)
+    with _result_caches_lock:
+        if path not in _result_caches:
+            _result_caches[path] = ScanResultCache(path)
+        return _result_caches[path]
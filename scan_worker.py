@@ -0,0 +1,169 @@
+"""
+Scan worker processes for the shard queue.
+
+Each worker claims shards from the shard queue (shard_queue.ShardQueue), runs
+the shard's scan over its symbols with the normal scanner service (pipeline,
+on-disk store and result cache), heartbeats the lease while it works and writes
+the partial result back. Several workers on one machine stand in for separate
+nodes; a worker that dies simply stops heartbeating and its shard is re-queued
+when the lease runs out.
+
+Run from the repository root:
+    python scan_worker.py --workers 4
+    python scan_worker.py --workers 2 --queue /shared/scan_queue.sqlite --exit-when-idle 60
+"""
+import os
+import sys
+import time
+import queue
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from datetime import date
+
+from shard_queue import get_shard_queue, DEFAULT_LEASE_SECONDS
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+def default_worker_id():
+    """host-pid identifier recorded on leased shards"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def run_shard(service, spec, symbols, cancel_event):
+    """
+    Scan one shard's symbols and return its partial result
+
+    Args:
+        service: ScannerService running the scan
+        spec: Scan description from ScannerService.start_sharded_scan
+        symbols: The shard's symbols
+        cancel_event: Event set when the lease is lost or the job cancelled
+
+    Returns:
+        dict: 'results', 'hits', 'skipped', 'skipped_patterns', 'cached', 'cancelled' and 'error' of the scanner's final message
+    """
+    result_queue = queue.Queue()
+    start_date = date.fromisoformat(spec["start_date"])
+    end_date = date.fromisoformat(spec["end_date"])
+    if spec["kind"] == "candlestick":
+        service.start_candlestick_scan(spec["patterns"], spec["interval"], start_date, end_date,
+                                       result_queue, cancel_event, recent_candles=spec["recent_candles"],
+                                       lookback=spec["lookback"], symbols=symbols)
+    else:
+        service.start_chart_pattern_scan(spec["patterns"], spec["interval"], start_date, end_date,
+                                         result_queue, cancel_event, lookback=spec["lookback"], symbols=symbols)
+    while True:
+        message = result_queue.get()
+        if message.get("type") != "partial":
+            break
+    return {key: message.get(key) for key in ("results", "hits", "skipped", "skipped_patterns", "cached", "cancelled", "error")}
+
+def run_worker(queue_path=None, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+               exit_when_idle=None, stop_event=None, fetch_workers=4, compute_workers=2):
+    """
+    Claim and run shards until stopped
+
+    Args:
+        queue_path: Shard queue database (defaults to the one next to the OHLCV store)
+        worker_id: Identifier recorded on claimed shards (defaults to host-pid)
+        lease_seconds: Lease length; the lease is renewed every third of it
+        poll_interval: Seconds between claims while the queue is empty
+        exit_when_idle: Return after this many seconds without work (None to run forever)
+        stop_event: Event to stop the worker after its current shard
+        fetch_workers, compute_workers: Pipeline threads per shard scan
+
+    Returns:
+        int: Shards completed
+    """
+    from services.scan_service import ScannerService
+
+    shard_queue = get_shard_queue(queue_path)
+    worker_id = worker_id or default_worker_id()
+    service = ScannerService(fetch_workers=fetch_workers, compute_workers=compute_workers)
+    completed = 0
+    idle_since = time.time()
+    print(f"[WORKER] {worker_id} polling {shard_queue.path}")
+    while not (stop_event and stop_event.is_set()):
+        shard = shard_queue.claim(worker_id, lease_seconds)
+        if shard is None:
+            if exit_when_idle is not None and time.time() - idle_since >= exit_when_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        job_id, shard_no = shard["job_id"], shard["shard_no"]
+        print(f"[WORKER] {worker_id} shard {job_id}/{shard_no} ({len(shard['symbols'])} symbols, attempt {shard['attempt']})")
+        cancel_event = threading.Event()
+        finished = threading.Event()
+
+        def keep_lease():
+            while not finished.wait(lease_seconds / 3):
+                try:
+                    alive = shard_queue.heartbeat(job_id, shard_no, worker_id, lease_seconds)
+                except sqlite3.OperationalError as e:
+                    # Queue database locked or unavailable: the lease cannot be renewed
+                    print(f"Error renewing lease of shard {job_id}/{shard_no}: {e}")
+                    alive = False
+                if not alive:
+                    # Lease lost (expired and re-queued), job cancelled or queue unreachable: abandon the shard
+                    cancel_event.set()
+                    return
+
+        heartbeat = threading.Thread(target=keep_lease, daemon=True)
+        heartbeat.start()
+        try:
+            result = run_shard(service, shard["spec"], shard["symbols"], cancel_event)
+        except Exception as e:
+            print(f"Error in shard {job_id}/{shard_no}: {e}")
+            shard_queue.fail(job_id, shard_no, worker_id, e)
+            continue
+        finally:
+            finished.set()
+            heartbeat.join()
+            idle_since = time.time()
+
+        if cancel_event.is_set() or result["cancelled"]:
+            continue
+        if result["error"]:
+            shard_queue.fail(job_id, shard_no, worker_id, result["error"])
+        elif shard_queue.complete(job_id, shard_no, worker_id, result):
+            completed += 1
+    return completed
+
+def _worker_process(args, index):
+    run_worker(args.queue, f"{default_worker_id()}-{index}", args.lease, args.poll_interval,
+               args.exit_when_idle, fetch_workers=args.fetch_workers, compute_workers=args.compute_workers)
+
+def main(argv=None):
+    """Start local worker processes"""
+    parser = argparse.ArgumentParser(prog="scan_worker.py", description="Run scan workers for the shard queue.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes to start (default: 1)")
+    parser.add_argument("--queue", default=None, help="Shard queue database (default: next to the OHLCV store)")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help=f"Shard lease in seconds (default: {DEFAULT_LEASE_SECONDS})")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between claims when idle")
+    parser.add_argument("--exit-when-idle", type=float, default=None, help="Exit after this many idle seconds")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Fetch threads per worker (default: 4)")
+    parser.add_argument("--compute-workers", type=int, default=2, help="Compute threads per worker (default: 2)")
+    args = parser.parse_args(argv)
+
+    if args.workers == 1:
+        _worker_process(args, 0)
+        return 0
+    processes = [multiprocessing.Process(target=_worker_process, args=(args, index), daemon=False)
+                 for index in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        return 130
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
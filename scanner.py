@@ -1,67 +1,285 @@
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
-import time
-from stock_data import fetch_stock_chart_data
+from stock_data import fetch_stock_chart_data, prefetch_stock_data, split_negative_cached, get_data_version
+from symbol_universe import get_symbol_universe
+from scan_pipeline import ScanPipeline
+from candlestick_kernels import evaluate_kernels, stack_tails, LOOKBACK, KERNEL_VERSIONS
+from scan_result_cache import get_scan_result_cache, range_params
 
-def scan_stocks_for_pattern(pattern_name, interval, start_date, end_date, cancel_event=None, progress_callback=None):
-    print(f"[SCAN_START] Scanning for pattern: {pattern_name}")
+PATTERN_MAP = {
+    "Hammer": "cdl_hammer",
+    "Inverted Hammer": "cdl_inverted_hammer",
+    "Bullish Engulfing": "cdl_engulfing",
+    "Bearish Engulfing": "cdl_engulfing",
+    "Morning Star": "cdl_morningstar",
+    "Evening Star": "cdl_eveningstar",
+    "Doji": "cdl_doji",
+    "Shooting Star": "cdl_shootingstar",
+    "Hanging Man": "cdl_hangingman",
+    "Piercing Line": "cdl_piercing",
+    "Dark Cloud Cover": "cdl_darkcloudcover",
+    "3 White Soldiers": "cdl_3whitesoldiers",
+    "3 Black Crows": "cdl_3blackcrows",
+    "Sandwich": "cdl_sandwich"
+}
+BULLISH_PATTERNS = ["Hammer", "Inverted Hammer", "Bullish Engulfing", "Morning Star", "Piercing Line", "3 White Soldiers", "Sandwich"]
+BEARISH_PATTERNS = ["Bearish Engulfing", "Evening Star", "Shooting Star", "Hanging Man", "Dark Cloud Cover", "3 Black Crows"]
+
+# Number of most recent candles a pattern must appear in
+RECENT_CANDLES = 10
+
+# Symbols a scan's fetch stage bulk-downloads at a time
+PREFETCH_CHUNK_SIZE = 50
+
+def pattern_hit_mask(pattern_name, values):
+    """Boolean mask of the candles where a pattern fired in its bullish/bearish direction"""
+    if pattern_name == "Bullish Engulfing":
+        return values == 100
+    if pattern_name == "Bearish Engulfing":
+        return values == -100
+    if pattern_name in BULLISH_PATTERNS:
+        return values == 100
+    if pattern_name in BEARISH_PATTERNS:
+        return values == -100
+    return values != 0
+
+def pattern_lookback(pattern_names):
+    """Candles of context the patterns' kernels need before the first candle they score"""
+    return max(LOOKBACK[PATTERN_MAP[name]] for name in pattern_names)
+
+def detect_candlestick_pattern(pattern_name, open_, high, low, close):
+    """
+    Check whether a candlestick pattern occurs in the last RECENT_CANDLES candles
+
+    Args:
+        pattern_name: Pattern name from PATTERN_MAP
+        open_, high, low, close: pandas Series of prices
+
+    Returns:
+        bool: True if the pattern (in its bullish/bearish direction) was found
+    """
+    ohlc = np.vstack([np.asarray(series, dtype=np.float64) for series in (open_, high, low, close)])
+    return len(close) >= RECENT_CANDLES and find_candlestick_hits([pattern_name], [ohlc])[0][0] is not None
+
+def find_candlestick_hits(pattern_names, ohlc_arrays, recent_candles=RECENT_CANDLES, lookback=None, offsets=None):
+    """
+    Find the most recent hit of each pattern in the last recent_candles candles of each symbol
+
+    Only each symbol's tail - the recent candles plus the kernels' lookback - is
+    scored: the tails are stacked into one panel and every pattern is scored for
+    all of them in a single vectorized kernel call; patterns sharing a kernel
+    (e.g. Bullish/Bearish Engulfing) are scored once.
+
+    Args:
+        pattern_names: Pattern names from PATTERN_MAP
+        ohlc_arrays: Per-symbol (4, n) open/high/low/close arrays with n >= recent_candles
+        recent_candles: Candles a hit must fall in
+        lookback: Candles of context before the recent window (defaults to pattern_lookback)
+        offsets: Per-symbol position of each array's first candle in the full date range,
+            when the arrays are already tails (defaults to 0)
+
+    Returns:
+        list: Per symbol, the bar index (offset + position in its array) of each pattern's latest hit, or None
+    """
+    if not ohlc_arrays:
+        return []
+    if lookback is None:
+        lookback = pattern_lookback(pattern_names)
+    lengths = np.array([ohlc.shape[1] for ohlc in ohlc_arrays])
+    if offsets is not None:
+        lengths = lengths + np.asarray(offsets)
+    panel = stack_tails(ohlc_arrays, recent_candles + lookback)
+    scores = evaluate_kernels([PATTERN_MAP[name] for name in pattern_names], *panel)
+    last_position = np.arange(recent_candles)
+    columns = []
+    for pattern_name in pattern_names:
+        kernel_name = PATTERN_MAP[pattern_name]
+        mask = pattern_hit_mask(pattern_name, scores[kernel_name][:, -recent_candles:])
+        latest = np.where(mask, last_position, -1).max(axis=1)
+        bar_index = lengths - recent_candles + latest
+        # Candles inside the kernel's lookback from the start of the history never score
+        columns.append(np.where((latest >= 0) & (bar_index >= LOOKBACK[kernel_name]), bar_index, -1))
+    return [[int(hit) if hit >= 0 else None for hit in row] for row in np.array(columns).T]
+
+def load_ohlc_tail(symbol, interval, start_str, end_str, bars, min_bars=RECENT_CANDLES):
+    """
+    Compact (4, k) float64 open/high/low/close array of the last `bars` candles in a symbol's date range
+
+    Only the tail is converted, so the cost does not grow with the length of the range.
+
+    Returns:
+        tuple: (offset of the tail's first candle in the range, array), or None
+            if the range has fewer than min_bars candles
+    """
+    df = fetch_stock_chart_data(symbol, start_date=start_str, end_date=end_str, interval=interval)
+    if df is None or df.empty or len(df) < min_bars:
+        return None
+    offset = max(0, len(df) - bars)
+    tail = df.iloc[offset:]
+    return offset, np.vstack([tail[column].to_numpy(dtype=np.float64) for column in ("Open", "High", "Low", "Close")])
+
+def scan_stocks_for_patterns(pattern_names, interval, start_date, end_date, cancel_event=None, progress_callback=None, skipped=None,
+                             fetch_workers=4, compute_workers=2, queue_size=64, rate_limit=None,
+                             recent_candles=RECENT_CANDLES, lookback=None, use_cache=True,
+                             progress=None, result_callback=None, symbols=None):
+    """
+    Scan all stocks in EQUITY_L.csv (or the given symbols) for several candlestick patterns in one pass
+
+    Every symbol is fetched and sliced once and only the tail that can affect the
+    last recent_candles candles (plus the patterns' lookback) is loaded, so a scan
+    costs the same whatever the date range. All patterns are evaluated on the same
+    arrays by the vectorized kernels in candlestick_kernels, one call per batch of
+    symbols. The scan runs on a ScanPipeline: fetch threads bulk-download chunks
+    of the universe and load each symbol's arrays while compute workers evaluate
+    what is already loaded, so network latency and pattern evaluation overlap.
+
+    Results are cached per (pattern, interval, params, symbol, data version) in the
+    persistent scan result cache: symbols whose data version is unchanged since a
+    previous scan with the same settings are served from it, and only the others
+    are fetched and evaluated.
+
+    Symbols in the negative cache (delisted/failing) are not scanned; if a list is
+    passed as skipped, their negative cache entries are appended to it, as are
+    entries for symbols whose fetch or evaluation raised.
+
+    Args:
+        pattern_names: Pattern names from PATTERN_MAP (None for all of them)
+        fetch_workers: Concurrent fetch threads
+        compute_workers: Concurrent compute threads
+        queue_size: Loaded symbols buffered between fetch and compute
+        rate_limit: Optional bulk downloads per second
+        recent_candles: Candles a hit must fall in
+        lookback: Candles of context loaded before the recent window (defaults to
+            the longest lookback of the selected patterns' kernels)
+        use_cache: Serve unchanged symbols from the scan result cache
+        progress: Optional scan_progress.ScanProgress tracking done/total and hits
+        result_callback: Called as result_callback(symbol, hits) for every symbol with
+            at least one hit as soon as it is known (cached symbols first)
+        symbols: Symbols to scan instead of the whole universe
+
+    Returns:
+        pd.DataFrame: Hit matrix indexed by symbol (universe order, symbols with at
+            least one hit) with one nullable Int64 column per pattern holding the bar
+            index of its latest hit within the date range
+    """
+    pattern_names = tuple(name for name in (pattern_names or PATTERN_MAP) if name in PATTERN_MAP)
+    label = ", ".join(pattern_names)
+    print(f"[SCAN_START] Scanning for pattern: {label}")
     if progress_callback:
         progress_callback("[SCAN_START]")
-    pattern_map = {
-        "Hammer": "cdl_hammer",
-        "Inverted Hammer": "cdl_inverted_hammer",
-        "Bullish Engulfing": "cdl_engulfing",
-        "Bearish Engulfing": "cdl_engulfing",
-        "Morning Star": "cdl_morningstar",
-        "Evening Star": "cdl_eveningstar",
-        "Doji": "cdl_doji",
-        "Shooting Star": "cdl_shootingstar",
-        "Hanging Man": "cdl_hangingman",
-        "Piercing Line": "cdl_piercing",
-        "Dark Cloud Cover": "cdl_darkcloudcover",
-        "3 White Soldiers": "cdl_3whitesoldiers",
-        "3 Black Crows": "cdl_3blackcrows",
-        "Sandwich": "cdl_sandwich"
-    }
-    is_bullish = pattern_name in ["Hammer", "Inverted Hammer", "Bullish Engulfing", "Morning Star", "Piercing Line", "3 White Soldiers", "Sandwich"]
-    is_bearish = pattern_name in ["Bearish Engulfing", "Evening Star", "Shooting Star", "Hanging Man", "Dark Cloud Cover", "3 Black Crows"]
-    pattern_func = pattern_map.get(pattern_name)
-    if not pattern_func:
-        return []
-    stock_df = pd.read_csv("EQUITY_L.csv")
-    symbols = stock_df['SYMBOL'].tolist()
+    if not pattern_names:
+        return pd.DataFrame(columns=[], dtype="Int64")
+    if symbols is None:
+        symbols = get_symbol_universe().symbol_list()
+    symbols, skipped_entries = split_negative_cached(symbols, interval)
+    if skipped is not None:
+        skipped.extend(skipped_entries)
     start_str = start_date.strftime("%Y-%m-%d")
     end_str = end_date.strftime("%Y-%m-%d")
-    matches = []
-    for symbol in symbols:
-        if cancel_event and cancel_event.is_set():
-            break
+    if lookback is None:
+        lookback = pattern_lookback(pattern_names)
+
+    # Symbols whose data is unchanged since an identical scan come from the result cache
+    evaluated = {}
+    cache = get_scan_result_cache() if use_cache else None
+    if cache is not None:
+        params = dict(range_params(start_date, end_date), recent_candles=recent_candles, lookback=lookback)
+        pattern_params = [dict(params, version=KERNEL_VERSIONS[PATTERN_MAP[name]]) for name in pattern_names]
+        scan_keys = [cache.make_scan_key(name, interval, name_params)
+                     for name, name_params in zip(pattern_names, pattern_params)]
+        versions = {symbol: get_data_version(symbol, interval) for symbol in symbols}
+        cached = [cache.lookup(scan_key, versions) for scan_key in scan_keys]
+        for symbol in symbols:
+            if all(symbol in found for found in cached):
+                evaluated[symbol] = [found[symbol] for found in cached]
+        print(f"[SCAN_CACHE] {len(evaluated)} of {len(symbols)} symbols served from the result cache")
+    pending = [symbol for symbol in symbols if symbol not in evaluated]
+    cached_matches = [symbol for symbol in evaluated if any(hit is not None for hit in evaluated[symbol])]
+    if progress is not None:
+        progress.start(len(symbols), done=len(evaluated), hits=len(cached_matches))
+    if result_callback:
+        for symbol in cached_matches:
+            result_callback(symbol, evaluated[symbol])
+
+    def fetch(symbol):
+        # Read the version first: a refresh racing the load then only costs a later cache miss
+        version = get_data_version(symbol, interval)
+        tail = load_ohlc_tail(symbol, interval, start_str, end_str, recent_candles + lookback, recent_candles)
+        version = version or get_data_version(symbol, interval)
+        if tail is None:
+            # Too few bars in range: cached as a miss while the data is unchanged, unless nothing was loaded
+            return (version, None, None) if version else None
+        return (version,) + tail
+
+    def compute_batch(batch_symbols, tails):
+        loaded = [tail for tail in tails if tail[2] is not None]
+        offsets = [offset for _, offset, _ in loaded]
+        ohlc_arrays = [ohlc for _, _, ohlc in loaded]
+        hits = iter(find_candlestick_hits(pattern_names, ohlc_arrays, recent_candles, lookback, offsets))
+        return [(version, next(hits) if ohlc is not None else [None] * len(pattern_names))
+                for version, _, ohlc in tails]
+
+    def on_result(symbol, result):
         print(f"[SCANNING] {symbol}")
         if progress_callback:
             progress_callback(symbol)
-        df = fetch_stock_chart_data(symbol, start_date=start_str, end_date=end_str, interval=interval)
-        if df is not None and not df.empty and len(df) >= 10:
-            df_ta = df.rename(columns={"Open": "open", "High": "high", "Low": "low", "Close": "close"})
-            try:
-                pattern_series = getattr(ta, pattern_func)(df_ta['open'], df_ta['high'], df_ta['low'], df_ta['close'])
-                last10 = pattern_series[-10:]
-                if pattern_name == "Bullish Engulfing":
-                    found = (last10 == 100).any()
-                elif pattern_name == "Bearish Engulfing":
-                    found = (last10 == -100).any()
-                else:
-                    if is_bullish:
-                        found = (last10 == 100).any()
-                    elif is_bearish:
-                        found = (last10 == -100).any()
-                    else:
-                        found = (last10 != 0).any()
-                if found:
-                    matches.append(symbol)
-            except Exception:
-                pass
-        time.sleep(0.01)
-    print(f"[SCAN_END] Scanning complete for pattern: {pattern_name}")
+        hit = result is not None and any(hit is not None for hit in result[1])
+        if progress is not None:
+            progress.advance(symbol, hit)
+        if hit and result_callback:
+            result_callback(symbol, result[1])
+
+    def on_error(symbol, error):
+        if skipped is not None:
+            skipped.append({'symbol': symbol, 'interval': interval, 'reason': f"scan failed: {error}"})
+
+    pipeline = ScanPipeline(
+        fetch=fetch,
+        compute_batch=compute_batch,
+        fetch_workers=fetch_workers,
+        compute_workers=compute_workers,
+        queue_size=queue_size,
+        batch_size=queue_size,
+        fetch_chunk_size=PREFETCH_CHUNK_SIZE,
+        prepare_chunk=lambda chunk: prefetch_stock_data(chunk, interval, cancel_event=cancel_event),
+        rate_limit=rate_limit,
+    )
+    fresh = {}
+    computed = pipeline.run(pending, cancel_event=cancel_event, on_result=on_result, on_error=on_error)
+    for symbol, result in zip(pending, computed):
+        if result is not None:
+            fresh[symbol] = result
+            evaluated[symbol] = result[1]
+    if cache is not None and fresh:
+        cache.store_many(
+            (scan_key, pattern_name, interval, name_params,
+             {symbol: (version, hits[position]) for symbol, (version, hits) in fresh.items()})
+            for position, (pattern_name, scan_key, name_params) in enumerate(zip(pattern_names, scan_keys, pattern_params)))
+
+    if progress is not None:
+        progress.finish()
+
+    rows = {symbol: evaluated[symbol] for symbol in symbols
+            if symbol in evaluated and any(hit is not None for hit in evaluated[symbol])}
+    matrix = pd.DataFrame.from_dict(rows, orient="index", columns=list(pattern_names)).astype("Int64")
+
+    print(f"[SCAN_END] Scanning complete for pattern: {label}")
     if progress_callback:
         progress_callback("[SCAN_END]")
-    return matches
+    return matrix
+
+def scan_stocks_for_pattern(pattern_name, interval, start_date, end_date, cancel_event=None, progress_callback=None, skipped=None,
+                            **pipeline_options):
+    """
+    Scan all stocks in EQUITY_L.csv for a candlestick pattern in the last RECENT_CANDLES candles
+
+    Single-pattern form of scan_stocks_for_patterns.
+
+    Returns:
+        list: Matching symbols, in universe order
+    """
+    if pattern_name not in PATTERN_MAP:
+        return []
+    matrix = scan_stocks_for_patterns([pattern_name], interval, start_date, end_date, cancel_event,
+                                      progress_callback, skipped, **pipeline_options)
+    return matrix.index.tolist()
@@ -0,0 +1,687 @@
+"""
+Vectorized multi-condition stock screener.
+
+A screening rule such as
+
+    RSI(14) < 30 AND close > EMA(50) AND Hammer in last 3 bars
+
+is parsed into an expression tree and evaluated with whole-array operations
+over a panel holding the last few hundred bars of every symbol - one NumPy
+operation per node for all symbols at once instead of one pandas pass per
+symbol per condition. Every indicator, comparison and pattern node is cached by
+its canonical text, so a subexpression used by several conditions (or by
+several rules screened on the same panel) is computed only once.
+
+Rule grammar (keywords and names are case-insensitive):
+
+    rule        := term (OR term)*
+    term        := factor (AND factor)*
+    factor      := NOT factor | '(' rule ')' | pattern | condition
+    pattern     := PATTERN [IN LAST n BARS]        e.g. "Bullish Engulfing in last 5 bars"
+    condition   := value (< | <= | > | >= | = | == | !=) value
+                 | value CROSSES (ABOVE | BELOW) value
+    value       := number | field | indicator, combined with + - * / and parentheses
+    field       := open | high | low | close | volume
+    indicator   := RSI(n) | EMA(n[, field]) | SMA(n[, field]) | VOLUME_MA(n)
+                 | STOCH_K(k, d, smooth) | STOCH_D(k, d, smooth)
+                 | BB_UPPER(n, std) | BB_MIDDLE(n, std) | BB_LOWER(n, std)
+
+Conditions are tested on each symbol's latest bar. Indicators match
+services.technical_indicators.TechnicalIndicators computed over the same bars;
+EMAs are seeded at the start of the panel, so they converge to the full-history
+values once the panel is several times longer than the period.
+"""
+import re
+import threading
+import warnings
+import numpy as np
+import pandas as pd
+
+from stock_data import (get_all_stock_symbols, get_full_history, prefetch_stock_data,
+                        split_negative_cached, slice_history, get_data_version)
+from scanner import PATTERN_MAP, PREFETCH_CHUNK_SIZE, pattern_hit_mask
+from candlestick_kernels import evaluate_kernels, LOOKBACK
+
+# Bars loaded per symbol
+DEFAULT_HISTORY_BARS = 300
+
+FIELDS = ("open", "high", "low", "close", "volume")
+_FIELD_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# Indicator name -> default numeric arguments
+INDICATORS = {
+    "RSI": (14,),
+    "EMA": (20,),
+    "SMA": (20,),
+    "VOLUME_MA": (20,),
+    "STOCH_K": (14, 3, 3),
+    "STOCH_D": (14, 3, 3),
+    "BB_UPPER": (20, 2),
+    "BB_MIDDLE": (20, 2),
+    "BB_LOWER": (20, 2),
+}
+# Indicators taking an optional source field after their numeric arguments
+_SOURCE_INDICATORS = ("EMA", "SMA")
+
+_COMPARISONS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "=": np.equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+_ARITHMETIC = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+
+# ---------------------------------------------------------------------------
+# Rolling kernels over (symbols, bars) arrays, NaN-padded on the left
+# ---------------------------------------------------------------------------
+
+def _shift(values, bars):
+    shifted = np.full(values.shape, np.nan)
+    shifted[:, bars:] = values[:, :-bars]
+    return shifted
+
+def _rolling_mean(values, period):
+    """Rolling mean requiring period non-NaN values (pandas rolling(period).mean())"""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    sums[:, period:] = sums[:, period:] - sums[:, :-period]
+    counts[:, period:] = counts[:, period:] - counts[:, :-period]
+    return np.where(counts == period, sums / period, np.nan)
+
+def _rolling_std(values, period):
+    """Rolling sample standard deviation requiring period non-NaN values"""
+    # Centering per symbol keeps the cumulative sums of squares well conditioned
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        centered = values - np.nanmean(values, axis=1, keepdims=True)
+    mean = _rolling_mean(centered, period)
+    mean_of_squares = _rolling_mean(centered * centered, period)
+    variance = np.maximum(mean_of_squares - mean * mean, 0.0) * period / (period - 1)
+    return np.sqrt(variance)
+
+def _rolling_nan_mean(values, period):
+    """Rolling mean over the non-NaN values of the window (pandas rolling(period, min_periods=1).mean())"""
+    valid = ~np.isnan(values)
+    sums = np.where(valid, values, 0.0)
+    counts = valid.astype(np.float64)
+    total, count = sums.copy(), counts.copy()
+    for bars in range(1, period):
+        total[:, bars:] += sums[:, :-bars]
+        count[:, bars:] += counts[:, :-bars]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+def _rolling_extreme(values, period, combine):
+    """Rolling min/max ignoring NaN (combine is np.fmin or np.fmax)"""
+    result = values.copy()
+    for bars in range(1, period):
+        result[:, bars:] = combine(result[:, bars:], values[:, :-bars])
+    return result
+
+def _ema(values, period):
+    """EMA with span=period, adjust=False, seeded at each symbol's first value"""
+    alpha = 2.0 / (period + 1)
+    result = np.empty_like(values)
+    previous = np.full(values.shape[0], np.nan)
+    for bar in range(values.shape[1]):
+        current = values[:, bar]
+        previous = np.where(np.isnan(previous), current, alpha * current + (1 - alpha) * previous)
+        result[:, bar] = previous
+    return result
+
+def _rsi(close, period):
+    delta = close - _shift(close, 1)
+    # As in TechnicalIndicators.compute_rsi, the first change counts as 0
+    gain = np.where(np.isnan(close), np.nan, np.where(delta > 0, delta, 0.0))
+    loss = np.where(np.isnan(close), np.nan, np.where(delta < 0, -delta, 0.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = _rolling_mean(gain, period) / _rolling_mean(loss, period)
+        return 100 - (100 / (1 + rs))
+
+def _stochastic(high, low, close, k_period, d_period, smooth_k):
+    low_min = _rolling_extreme(low, k_period, np.fmin)
+    high_max = _rolling_extreme(high, k_period, np.fmax)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percent_k = 100 * (close - low_min) / (high_max - low_min)
+    percent_k = _rolling_nan_mean(percent_k, smooth_k)
+    return percent_k, _rolling_nan_mean(percent_k, d_period)
+
+# ---------------------------------------------------------------------------
+# Expression tree
+# ---------------------------------------------------------------------------
+
+class Node:
+    """Expression tree node; key is its canonical text, used as the cache key"""
+
+    key = ""
+    boolean = False
+
+    def children(self):
+        return ()
+
+    def compute(self, screener):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return self.key
+
+class Number(Node):
+    def __init__(self, value):
+        self.value = float(value)
+        # Exact text: two numbers only share a key (and cached results) if they are equal
+        self.key = str(int(self.value)) if self.value.is_integer() else repr(self.value)
+
+    def compute(self, screener):
+        return self.value
+
+class Field(Node):
+    def __init__(self, name):
+        self.name = name
+        self.key = name
+
+    def compute(self, screener):
+        return screener.fields[self.name]
+
+class Indicator(Node):
+    def __init__(self, name, args, source="close"):
+        self.name = name
+        self.args = tuple(int(a) if float(a).is_integer() else float(a) for a in args)
+        self.source = source
+        suffix = f", {source}" if source != "close" else ""
+        self.key = f"{name}({', '.join(str(a) for a in self.args)}{suffix})"
+
+    def compute(self, screener):
+        fields = screener.fields
+        name, args = self.name, self.args
+        if name == "RSI":
+            return _rsi(fields["close"], args[0])
+        if name == "EMA":
+            return _ema(fields[self.source], args[0])
+        if name == "SMA":
+            return _rolling_mean(fields[self.source], args[0])
+        if name == "VOLUME_MA":
+            return _rolling_mean(fields["volume"], args[0])
+        if name in ("STOCH_K", "STOCH_D"):
+            # Both lines come from one computation
+            key = ("stochastic",) + args
+            if key not in screener._cache:
+                screener._cache[key] = _stochastic(fields["high"], fields["low"], fields["close"], *args)
+            return screener._cache[key][0 if name == "STOCH_K" else 1]
+        middle = screener.evaluate(Indicator("SMA", args[:1]))
+        if name == "BB_MIDDLE":
+            return middle
+        width = _rolling_std(fields["close"], args[0]) * args[1]
+        return middle + width if name == "BB_UPPER" else middle - width
+
+class Arithmetic(Node):
+    def __init__(self, op, left, right):
+        self.op, self.left, self.right = op, left, right
+        self.key = f"({left.key} {op} {right.key})"
+
+    def children(self):
+        return (self.left, self.right)
+
+    def compute(self, screener):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return _ARITHMETIC[self.op](screener.evaluate(self.left), screener.evaluate(self.right))
+
+class Comparison(Node):
+    boolean = True
+
+    def __init__(self, op, left, right):
+        self.op, self.left, self.right = op, left, right
+        self.key = f"{left.key} {'==' if op == '=' else op} {right.key}"
+
+    def children(self):
+        return (self.left, self.right)
+
+    def compute(self, screener):
+        left, right = screener.evaluate(self.left), screener.evaluate(self.right)
+        with np.errstate(invalid="ignore"):
+            return np.broadcast_to(_COMPARISONS[self.op](left, right), screener.shape)
+
+class Cross(Node):
+    boolean = True
+
+    def __init__(self, direction, left, right):
+        self.direction, self.left, self.right = direction, left, right
+        self.key = f"{left.key} crosses {direction} {right.key}"
+
+    def children(self):
+        return (self.left, self.right)
+
+    def compute(self, screener):
+        difference = np.broadcast_to(screener.evaluate(Arithmetic("-", self.left, self.right)), screener.shape)
+        previous = _shift(difference, 1)
+        with np.errstate(invalid="ignore"):
+            if self.direction == "above":
+                return (previous <= 0) & (difference > 0)
+            return (previous >= 0) & (difference < 0)
+
+class Pattern(Node):
+    boolean = True
+
+    def __init__(self, name, bars=1):
+        self.name, self.bars = name, int(bars)
+        self.key = f"{name} in last {self.bars} bars"
+
+    def compute(self, screener):
+        kernel_name = PATTERN_MAP[self.name]
+        cache_key = ("kernel", kernel_name)
+        if cache_key not in screener._cache:
+            fields = screener.fields
+            scores = evaluate_kernels([kernel_name], fields["open"], fields["high"], fields["low"], fields["close"])
+            screener._cache[cache_key] = scores[kernel_name]
+        # Candles inside the kernel's lookback from the start of the loaded bars never score
+        mask = pattern_hit_mask(self.name, screener._cache[cache_key]) & (screener.bar_numbers >= LOOKBACK[kernel_name])
+        fired = np.cumsum(mask, axis=1)
+        fired[:, self.bars:] = fired[:, self.bars:] - fired[:, :-self.bars]
+        return fired > 0
+
+class Logical(Node):
+    boolean = True
+
+    def __init__(self, op, operands):
+        self.op, self.operands = op, tuple(operands)
+        if op == "NOT":
+            self.key = f"NOT ({operands[0].key})"
+        else:
+            self.key = "(" + f" {op} ".join(operand.key for operand in self.operands) + ")"
+
+    def children(self):
+        return self.operands
+
+    def compute(self, screener):
+        values = [screener.evaluate(operand) for operand in self.operands]
+        if self.op == "NOT":
+            return ~values[0]
+        combine = np.logical_and if self.op == "AND" else np.logical_or
+        result = values[0]
+        for value in values[1:]:
+            result = combine(result, value)
+        return result
+
+# ---------------------------------------------------------------------------
+# Parser
+# ---------------------------------------------------------------------------
+
+_PATTERN_NAMES = sorted(PATTERN_MAP, key=len, reverse=True)
+_TOKEN_RE = re.compile(r"\s*(?:(?P<number>\d+(?:\.\d+)?)|(?P<name>[A-Za-z_][A-Za-z0-9_]*)|(?P<op><=|>=|==|!=|[<>=()+\-*/,]))")
+
+def _tokenize(text):
+    """(kind, value, position) tokens; pattern names (which may contain spaces or digits) are single tokens"""
+    tokens, position = [], 0
+    lowered = text.lower()
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position >= len(text):
+            break
+        for pattern_name in _PATTERN_NAMES:
+            end = position + len(pattern_name)
+            if lowered.startswith(pattern_name.lower(), position) and not (end < len(text) and (text[end].isalnum() or text[end] == "_")):
+                tokens.append(("pattern", pattern_name, position))
+                position = end
+                break
+        else:
+            match = _TOKEN_RE.match(text, position)
+            if not match or match.end() == position:
+                raise ValueError(f"unexpected character {text[position]!r} at position {position}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            tokens.append((kind, value.upper() if kind == "name" else value, match.start(kind)))
+            position = match.end()
+    tokens.append(("end", None, len(text)))
+    return tokens
+
+class _Parser:
+    """Recursive-descent parser producing a Node tree"""
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.index = 0
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, kind, value=None):
+        token = self.peek()
+        if token[0] == kind and (value is None or token[1] == value):
+            self.index += 1
+            return token
+        return None
+
+    def expect(self, kind, value=None, what=None):
+        token = self.accept(kind, value)
+        if token is None:
+            found = self.peek()
+            found_text = "end of rule" if found[0] == "end" else repr(found[1])
+            raise ValueError(f"expected {what or value or kind} at position {found[2]}, found {found_text}")
+        return token
+
+    def parse(self):
+        node = self.rule()
+        self.expect("end", what="AND, OR or end of rule")
+        if not node.boolean:
+            raise ValueError(f"'{node.key}' is a value, not a condition (compare it, e.g. '{node.key} > 0')")
+        return node
+
+    def rule(self):
+        operands = [self.term()]
+        while self.accept("name", "OR"):
+            operands.append(self.term())
+        return self.combine("OR", operands)
+
+    def term(self):
+        operands = [self.factor()]
+        while self.accept("name", "AND"):
+            operands.append(self.factor())
+        return self.combine("AND", operands)
+
+    @staticmethod
+    def combine(op, operands):
+        if len(operands) == 1:
+            return operands[0]
+        for operand in operands:
+            if not operand.boolean:
+                raise ValueError(f"{op} needs conditions, not the value '{operand.key}'")
+        return Logical(op, operands)
+
+    def factor(self):
+        if self.accept("name", "NOT"):
+            operand = self.factor()
+            if not operand.boolean:
+                raise ValueError(f"NOT needs a condition, not the value '{operand.key}'")
+            return Logical("NOT", [operand])
+        pattern = self.accept("pattern")
+        if pattern:
+            bars = 1
+            if self.accept("name", "IN"):
+                self.expect("name", "LAST")
+                bars = int(float(self.expect("number", what="number of bars")[1]))
+                if bars < 1:
+                    raise ValueError(f"pattern window must be at least 1 bar (position {pattern[2]})")
+                if self.peek()[0] == "name" and self.peek()[1] in ("BAR", "BARS", "CANDLE", "CANDLES"):
+                    self.next()
+            return Pattern(pattern[1], bars)
+        left = self.value()
+        if left.boolean:
+            return left  # Parenthesised condition
+        token = self.peek()
+        if token[0] == "op" and token[1] in _COMPARISONS:
+            self.next()
+            return Comparison(token[1], left, self.value())
+        if self.accept("name", "CROSSES"):
+            direction = self.accept("name", "ABOVE") or self.expect("name", "BELOW", what="ABOVE or BELOW")
+            return Cross(direction[1].lower(), left, self.value())
+        return left
+
+    def value(self):
+        node = self.product()
+        while self.peek()[0] == "op" and self.peek()[1] in "+-":
+            op = self.next()[1]
+            node = Arithmetic(op, node, self.product())
+        return node
+
+    def product(self):
+        node = self.operand()
+        while self.peek()[0] == "op" and self.peek()[1] in "*/":
+            op = self.next()[1]
+            node = Arithmetic(op, node, self.operand())
+        return node
+
+    def operand(self):
+        token = self.next()
+        kind, value, position = token
+        if kind == "number":
+            return Number(value)
+        if kind == "op" and value == "-":
+            return Arithmetic("-", Number(0), self.operand())
+        if kind == "op" and value == "(":
+            # Either a grouped condition or a grouped arithmetic value
+            node = self.rule()
+            self.expect("op", ")")
+            return node
+        if kind == "name" and value.lower() in FIELDS:
+            return Field(value.lower())
+        if kind == "name" and value == "PRICE":
+            return Field("close")
+        if kind == "name" and value in INDICATORS:
+            return self.indicator(value, position)
+        found = "end of rule" if kind == "end" else repr(value)
+        raise ValueError(f"expected a number, price field or indicator at position {position}, found {found}")
+
+    def indicator(self, name, position):
+        args, source = [], "close"
+        if self.accept("op", "("):
+            while not self.accept("op", ")"):
+                if args or source != "close":
+                    self.expect("op", ",")
+                token = self.next()
+                if token[0] == "number":
+                    args.append(float(token[1]))
+                elif token[0] == "name" and token[1].lower() in FIELDS and name in _SOURCE_INDICATORS:
+                    source = token[1].lower()
+                else:
+                    raise ValueError(f"invalid argument {token[1]!r} to {name} at position {token[2]}")
+        defaults = INDICATORS[name]
+        if len(args) > len(defaults):
+            raise ValueError(f"{name} takes at most {len(defaults)} numeric arguments (position {position})")
+        args = args + list(defaults[len(args):])
+        periods = args if name.startswith("STOCH") else args[:1]
+        if any(period < 1 for period in periods):
+            raise ValueError(f"{name} periods must be at least 1 (position {position})")
+        return Indicator(name, args, source)
+
+def parse_rule(text):
+    """
+    Parse a screening rule into an expression tree
+
+    Raises:
+        ValueError: With the position of the problem if the rule is invalid
+    """
+    if not text or not text.strip():
+        raise ValueError("empty rule")
+    return _Parser(text).parse()
+
+def rule_values(node):
+    """Indicator and field nodes referenced by a rule, in order of appearance"""
+    found = {}
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, (Indicator, Field)):
+            found.setdefault(current.key, current)
+        stack.extend(reversed(current.children()))
+    return list(found.values())
+
+# ---------------------------------------------------------------------------
+# Screener
+# ---------------------------------------------------------------------------
+
+def load_panel(symbols, interval="1d", bars=DEFAULT_HISTORY_BARS, end_date=None, cancel_event=None):
+    """
+    Load the last `bars` candles of every symbol into (symbols, bars) arrays
+
+    Args:
+        symbols: Symbols to load
+        interval: Time interval
+        bars: Bars kept per symbol; shorter histories are NaN-padded on the left
+        end_date: Last date to include (None for the latest bar)
+        cancel_event: Event to stop loading early
+
+    Returns:
+        tuple: (loaded symbols, {field: float64 array}, data versions)
+    """
+    loaded, rows, versions = [], [], []
+    for start in range(0, len(symbols), PREFETCH_CHUNK_SIZE):
+        if cancel_event and cancel_event.is_set():
+            break
+        chunk = symbols[start:start + PREFETCH_CHUNK_SIZE]
+        prefetch_stock_data(chunk, interval, cancel_event=cancel_event)
+        for symbol in chunk:
+            try:
+                df = get_full_history(symbol, interval)
+            except Exception as e:
+                print(f"Error loading {symbol}: {e}")
+                continue
+            if df is None or df.empty:
+                continue
+            if end_date is not None:
+                df = slice_history(df, None, end_date)
+            tail = df.iloc[-bars:]
+            if tail.empty:
+                continue
+            loaded.append(symbol)
+            rows.append(tail)
+            versions.append(get_data_version(symbol, interval))
+    fields = {field: np.full((len(rows), bars), np.nan) for field in FIELDS}
+    for row, tail in enumerate(rows):
+        for field in FIELDS:
+            fields[field][row, bars - len(tail):] = tail[_FIELD_COLUMNS[field]].to_numpy(dtype=np.float64)
+    return loaded, fields, versions
+
+class Screener:
+    """Evaluates screening rules over a panel, caching every computed subexpression"""
+
+    def __init__(self, symbols, fields, versions=None):
+        """
+        Args:
+            symbols: Symbol of each panel row
+            fields: Dict of field name (open/high/low/close/volume) -> (symbols, bars) float64 array
+            versions: Optional data version of each symbol when it was loaded
+        """
+        self.symbols = list(symbols)
+        self.fields = fields
+        self.versions = versions
+        self.shape = fields["close"].shape
+        # Position of each bar within a symbol's loaded history (negative before its first bar)
+        valid = ~np.isnan(fields["close"])
+        self.bar_numbers = np.cumsum(valid, axis=1) - 1
+        self._cache = {}
+        self._lock = threading.RLock()
+        self.computed = 0
+        self.reused = 0
+
+    @classmethod
+    def load(cls, symbols=None, interval="1d", bars=DEFAULT_HISTORY_BARS, end_date=None, cancel_event=None):
+        """Build a screener over symbols (defaults to EQUITY_L.csv minus negative-cached symbols)"""
+        if symbols is None:
+            symbols = get_all_stock_symbols()
+        symbols, _ = split_negative_cached(symbols, interval)
+        loaded, fields, versions = load_panel(symbols, interval, bars, end_date, cancel_event)
+        return cls(loaded, fields, versions)
+
+    def evaluate(self, node):
+        """Values of node over the whole panel (numbers stay scalars), computed once per panel"""
+        if isinstance(node, Number):
+            return node.value
+        with self._lock:
+            if node.key in self._cache:
+                self.reused += 1
+                return self._cache[node.key]
+            values = node.compute(self)
+            self._cache[node.key] = values
+            self.computed += 1
+            return values
+
+    def screen(self, rule):
+        """
+        Symbols whose latest bar satisfies a rule
+
+        Args:
+            rule: Rule text or a tree from parse_rule
+
+        Returns:
+            pd.DataFrame: Matching symbols (panel order) with the latest value of every
+                indicator and field the rule references
+        """
+        node = parse_rule(rule) if isinstance(rule, str) else rule
+        if not self.symbols:
+            return pd.DataFrame(columns=[value.key for value in rule_values(node)])
+        matched = np.asarray(self.evaluate(node))[:, -1]
+        rows = np.flatnonzero(matched)
+        columns = {}
+        for value in rule_values(node):
+            latest = np.broadcast_to(self.evaluate(value), self.shape)[:, -1]
+            columns[value.key] = latest[rows]
+        return pd.DataFrame(columns, index=pd.Index([self.symbols[row] for row in rows], name="symbol"))
+
+    def stats(self):
+        """
+        Cache counters
+
+        Returns:
+            dict: computed (nodes evaluated), reused (cache hits), symbols, bars
+        """
+        return {"computed": self.computed, "reused": self.reused,
+                "symbols": self.shape[0], "bars": self.shape[1]}
+
+_screeners = {}
+_screeners_loading = {}  # key -> thread loading that panel
+_screeners_lock = threading.Lock()
+
+def _load_screener(key):
+    interval, bars, symbols = key
+    try:
+        screener = Screener.load(list(symbols), interval, bars)
+    except Exception as e:
+        print(f"Error loading screener panel for {interval}: {e}")
+        screener = None
+    with _screeners_lock:
+        _screeners_loading.pop(key, None)
+        if screener is not None:
+            # One panel per interval: switching intervals keeps the other intervals' panels
+            for old_key in [k for k in _screeners if k[0] == interval]:
+                del _screeners[old_key]
+            _screeners[key] = screener
+    return screener
+
+def get_screener(interval="1d", bars=DEFAULT_HISTORY_BARS, symbols=None, wait=True):
+    """
+    Shared screener for interval, reloaded when any symbol's data version changed
+
+    The panel and its cached indicators are reused by every rule and session until
+    the underlying data changes. One panel is kept per interval.
+
+    Args:
+        interval: Time interval
+        bars: Bars per symbol in the panel
+        symbols: Symbols to screen (defaults to all symbols in EQUITY_L.csv)
+        wait: Load a missing or outdated panel before returning. With False the panel
+            is loaded in a background thread and None is returned until it is ready,
+            so a UI never blocks on loading the whole universe
+
+    Returns:
+        Screener, or None while the panel is still loading (wait=False)
+    """
+    if symbols is None:
+        symbols = get_all_stock_symbols()
+    key = (interval, bars, tuple(symbols))
+    with _screeners_lock:
+        screener = _screeners.get(key)
+        if screener is not None and screener.versions == [get_data_version(s, interval) for s in screener.symbols]:
+            return screener
+        loading = _screeners_loading.get(key)
+        if loading is None and not wait:
+            loading = threading.Thread(target=_load_screener, args=(key,), daemon=True,
+                                       name=f"screener-load-{interval}")
+            _screeners_loading[key] = loading
+            loading.start()
+    if not wait:
+        return None
+    if loading is not None:
+        loading.join()
+        with _screeners_lock:
+            if key in _screeners:
+                return _screeners[key]
+    return _load_screener(key)
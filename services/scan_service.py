@@ -0,0 +1,517 @@
+"""
+Pattern scans without any UI: the scanner service used by the dashboard,
+scan_cli.py and scan_worker.py. It must not import streamlit, so the
+headless entry points run where streamlit is not installed.
+"""
+import os
+import numpy as np
+import pandas as pd
+import json
+import threading
+import time
+from scanner import scan_stocks_for_patterns, PREFETCH_CHUNK_SIZE, RECENT_CANDLES
+from scan_pipeline import ScanPipeline
+from scan_progress import ScanProgress, ResultStream
+from scan_jobs import get_scan_scheduler, PRIORITY_NORMAL
+from shard_queue import get_shard_queue, DEFAULT_SHARD_SIZE, DEFAULT_IDLE_TIMEOUT
+from stock_data import (get_all_stock_symbols, fetch_stock_chart_data, prefetch_stock_data,
+                        split_negative_cached, get_data_version)
+from scan_result_cache import get_scan_result_cache, range_params
+from chart_patterns import (detect_latest_patterns, chart_pattern_lookback,
+                            CHART_PATTERN_POINTS, CHART_PATTERN_VERSIONS, CNN_CHART_PATTERNS)
+
+# Loaded symbols per compute batch of a chart scan; with CNN patterns each batch's
+# windows are scored together, so larger batches make larger forward passes
+CHART_SCAN_BATCH_SYMBOLS = 16
+CNN_SCAN_BATCH_SYMBOLS = 64
+
+class ScannerService:
+    """Unified scanner service for both candlestick and chart patterns"""
+
+    def __init__(self, fetch_workers=4, compute_workers=2, queue_size=64, rate_limit=None, scheduler=None):
+        """
+        Args:
+            fetch_workers: Concurrent fetch threads per scan
+            compute_workers: Concurrent compute threads per scan
+            queue_size: Loaded symbols buffered between the fetch and compute stages
+            rate_limit: Optional bulk downloads per second
+            scheduler: Scan job scheduler (defaults to the process-wide one)
+        """
+        self.fetch_workers = fetch_workers
+        self.compute_workers = compute_workers
+        self.queue_size = queue_size
+        self.rate_limit = rate_limit
+        self.scheduler = scheduler or get_scan_scheduler()
+
+    def start_candlestick_scan(self, pattern_names, interval, start_date, end_date,
+                              result_queue, cancel_event, progress_queue=None,
+                              recent_candles=RECENT_CANDLES, lookback=None, priority=PRIORITY_NORMAL,
+                              symbols=None):
+        """
+        Start candlestick pattern scanning
+
+        All selected patterns are evaluated in a single pass over the universe. The
+        scan runs as a job on the shared scheduler; an identical scan already queued
+        or running is joined instead of started again.
+
+        Args:
+            pattern_names: Name of the candlestick pattern, or a list of names
+            interval: Time interval for data
+            start_date: Start date for scanning
+            end_date: End date for scanning
+            result_queue: Queue to put results
+            cancel_event: Event to signal cancellation
+            progress_queue: Queue for progress updates
+            recent_candles: Candles a hit must fall in
+            lookback: Candles of context before them (None for the patterns' own lookback)
+            priority: Job priority (lower runs first)
+            symbols: Symbols to scan instead of the whole universe
+
+        Returns:
+            str: ID of the scan job
+        """
+        if isinstance(pattern_names, str):
+            pattern_names = [pattern_names]
+        pattern_names = sorted(pattern_names)
+
+        def scanner_thread(result_queue, progress_queue, cancel_event):
+            label = ", ".join(pattern_names)
+            progress = ScanProgress(progress_queue)
+            # Matches are streamed to result_queue as they are found, ahead of the summary
+            stream = ResultStream(result_queue, pattern=label)
+
+            def result_callback(symbol, hits):
+                stream.add(self.candlestick_hit_rows(symbol, pattern_names, hits, interval, start_date, end_date))
+
+            skipped = []
+            # Fetches overlap with vectorized pattern kernels run per batch in the compute threads
+            hit_matrix = scan_stocks_for_patterns(
+                pattern_names, interval, start_date, end_date,
+                cancel_event, skipped=skipped,
+                fetch_workers=self.fetch_workers, compute_workers=self.compute_workers,
+                queue_size=self.queue_size, rate_limit=self.rate_limit,
+                recent_candles=recent_candles, lookback=lookback,
+                progress=progress, result_callback=result_callback, symbols=symbols
+            )
+            stream.flush()
+
+            result_queue.put({
+                'type': 'done',
+                'pattern': label,
+                'patterns': list(pattern_names),
+                'results': hit_matrix.index.tolist(),
+                'hits': self.group_candlestick_hits(hit_matrix, interval, start_date, end_date),
+                'skipped': skipped,
+                'progress': progress.snapshot(),
+                'cancelled': cancel_event.is_set() if cancel_event else False
+            })
+
+        if symbols is not None:
+            symbols = list(symbols)
+        key = ('candlestick', tuple(pattern_names), interval, str(start_date)[:10], str(end_date)[:10],
+               recent_candles, lookback, None if symbols is None else tuple(symbols))
+        return self.scheduler.submit(key, scanner_thread, result_queue, progress_queue, cancel_event, priority)
+
+    @staticmethod
+    def candlestick_hit_rows(symbol, pattern_names, hits, interval, start_date, end_date):
+        """
+        Hit rows for one symbol's row of the hit matrix
+
+        Returns:
+            list: {'symbol', 'pattern', 'bar_index', 'date'} for each pattern that hit
+        """
+        chart_data = fetch_stock_chart_data(symbol, start_date=start_date, end_date=end_date, interval=interval)
+        rows = []
+        for pattern_name, bar_index in zip(pattern_names, hits):
+            if bar_index is None or pd.isna(bar_index):
+                continue
+            bar_index = int(bar_index)
+            date = chart_data.index[bar_index] if bar_index < len(chart_data) else None
+            rows.append({
+                "symbol": symbol,
+                "pattern": pattern_name,
+                "bar_index": bar_index,
+                "date": str(date.date()) if date is not None else None,
+            })
+        return rows
+
+    @staticmethod
+    def group_candlestick_hits(hit_matrix, interval, start_date, end_date):
+        """
+        Group a symbol x pattern hit matrix by pattern
+
+        Returns:
+            dict: Pattern name -> list of {'symbol', 'pattern', 'bar_index', 'date'} for its hits
+        """
+        grouped = {pattern_name: [] for pattern_name in hit_matrix.columns}
+        for symbol, hits in hit_matrix.iterrows():
+            for row in ScannerService.candlestick_hit_rows(symbol, hit_matrix.columns, hits.tolist(),
+                                                           interval, start_date, end_date):
+                grouped[row["pattern"]].append(row)
+        return grouped
+
+    def start_chart_pattern_scan(self, pattern_names, interval, start_date, end_date,
+                                result_queue, cancel_event, progress_queue=None, lookback=None,
+                                priority=PRIORITY_NORMAL, symbols=None):
+        """
+        Start chart pattern scanning as a job on the shared scheduler
+
+        All selected patterns are detected in a single pass per symbol over one
+        shared set of pivots and trend context. CNN patterns (CNN_CHART_PATTERNS)
+        are scored by the chart pattern CNN over each compute batch of symbols at
+        once; they need torch and trained weights, and are reported under
+        'skipped_patterns' (pattern name -> reason) when the scorer can't be loaded.
+
+        Args:
+            pattern_names: Name of the chart pattern, or a list of names
+            interval: Time interval for data
+            start_date: Start date for scanning
+            end_date: End date for scanning
+            result_queue: Queue to put results
+            cancel_event: Event to signal cancellation
+            progress_queue: Queue for progress updates
+            lookback: Bars evaluated per symbol for every pattern (None for each pattern's own default, 0 for the full range)
+            priority: Job priority (lower runs first)
+            symbols: Symbols to scan instead of the whole universe
+
+        Returns:
+            str: ID of the scan job
+        """
+        if isinstance(pattern_names, str):
+            pattern_names = [pattern_names]
+        pattern_names = sorted(pattern_names)
+        label = ", ".join(pattern_names)
+        requested = None if symbols is None else list(symbols)
+        rule_patterns = [pattern_name for pattern_name in pattern_names if pattern_name not in CNN_CHART_PATTERNS]
+        cnn_patterns = [pattern_name for pattern_name in pattern_names if pattern_name in CNN_CHART_PATTERNS]
+        # The CNN scores all its patterns over one window
+        cnn_lookback = chart_pattern_lookback(cnn_patterns) if lookback is None else lookback
+
+        def symbol_rows(matches):
+            return [matches[pattern_name] for pattern_name in pattern_names if matches.get(pattern_name)]
+
+        def chart_pattern_scan_thread(result_queue, progress_queue, cancel_event):
+            scorer, scanned_cnn, skipped_patterns = None, cnn_patterns, {}
+            if cnn_patterns:
+                # Without torch or the trained weights the rule patterns are still scanned
+                try:
+                    from chart_pattern_cnn.inference import get_chart_pattern_scorer
+                    scorer = get_chart_pattern_scorer()
+                except Exception as e:
+                    print(f"Error loading the chart pattern CNN: {e}")
+                    scanned_cnn = []
+                    skipped_patterns = {pattern_name: f"CNN scorer unavailable: {e}" for pattern_name in cnn_patterns}
+            scanned = rule_patterns + scanned_cnn
+
+            # Delisted/failing symbols are skipped up front and listed in the result
+            symbols, skipped = split_negative_cached(
+                get_all_stock_symbols() if requested is None else requested, interval)
+
+            # Symbols whose data is unchanged since a scan with the same settings come from the
+            # result cache (kept per pattern); the others are evaluated for every selected pattern
+            cache = get_scan_result_cache()
+            params = dict(range_params(start_date, end_date), lookback=lookback)
+            pattern_params = {pattern_name: dict(params, version=CHART_PATTERN_VERSIONS[pattern_name],
+                                                 **(scorer.settings() if pattern_name in cnn_patterns else {}))
+                              for pattern_name in scanned}
+            scan_keys = {pattern_name: cache.make_scan_key(pattern_name, interval, pattern_params[pattern_name])
+                         for pattern_name in scanned}
+            versions = {symbol: get_data_version(symbol, interval) for symbol in symbols}
+            cached = {pattern_name: cache.lookup(scan_keys[pattern_name], versions) for pattern_name in scanned}
+            evaluated = {symbol: {pattern_name: cached[pattern_name][symbol] for pattern_name in scanned}
+                         for symbol in symbols if all(symbol in cached[pattern_name] for pattern_name in scanned)}
+            pending = [symbol for symbol in symbols if symbol not in evaluated]
+
+            # Matches are streamed to result_queue as they are found, ahead of the summary
+            progress = ScanProgress(progress_queue)
+            stream = ResultStream(result_queue, pattern=label)
+            cached_matches = [symbol_rows(evaluated[symbol]) for symbol in symbols if symbol in evaluated]
+            progress.start(len(symbols), done=len(evaluated), hits=sum(1 for rows in cached_matches if rows))
+            stream.add([row for rows in cached_matches for row in rows])
+
+            def fetch(symbol):
+                version = get_data_version(symbol, interval)
+                chart_data = fetch_stock_chart_data(
+                    symbol, interval=interval,
+                    start_date=start_date, end_date=end_date
+                )
+                version = version or get_data_version(symbol, interval)
+                if chart_data is None or chart_data.empty:
+                    # No bars in range: cached as a miss while the data is unchanged, unless nothing was loaded
+                    return (version, None) if version else None
+                return version, chart_data
+
+            def compute_batch(batch_symbols, loaded):
+                matches = [dict.fromkeys(scanned) for _ in loaded]
+                present = [position for position, (_, chart_data) in enumerate(loaded) if chart_data is not None]
+                symbols_present = [batch_symbols[position] for position in present]
+                frames = [loaded[position][1] for position in present]
+                if rule_patterns:
+                    for position, symbol, chart_data in zip(present, symbols_present, frames):
+                        matches[position].update(self.detect_chart_patterns(rule_patterns, symbol, chart_data, lookback))
+                if scanned_cnn and frames:
+                    cnn_matches = self.score_cnn_patterns(scanned_cnn, symbols_present, frames, cnn_lookback, scorer)
+                    for position, symbol_cnn_matches in zip(present, cnn_matches):
+                        matches[position].update(symbol_cnn_matches)
+                return [(version, symbol_matches) for (version, _), symbol_matches in zip(loaded, matches)]
+
+            def on_result(symbol, result):
+                rows = symbol_rows(result[1]) if result is not None else []
+                progress.advance(symbol, bool(rows))
+                stream.add(rows)
+
+            def on_error(symbol, error):
+                skipped.append({'symbol': symbol, 'interval': interval, 'reason': f"scan failed: {error}"})
+
+            # Chunks are bulk-downloaded by the fetch stage while detection runs on loaded symbols
+            pipeline = ScanPipeline(
+                fetch, compute_batch,
+                fetch_workers=self.fetch_workers,
+                compute_workers=self.compute_workers,
+                queue_size=self.queue_size,
+                batch_size=CNN_SCAN_BATCH_SYMBOLS if scanned_cnn else CHART_SCAN_BATCH_SYMBOLS,
+                fetch_chunk_size=PREFETCH_CHUNK_SIZE,
+                prepare_chunk=lambda chunk: prefetch_stock_data(chunk, interval, cancel_event=cancel_event),
+                rate_limit=self.rate_limit,
+            )
+            computed = pipeline.run(pending, cancel_event, on_result, on_error)
+            fresh = {symbol: result for symbol, result in zip(pending, computed) if result is not None}
+            if fresh:
+                cache.store_many(
+                    (scan_keys[pattern_name], pattern_name, interval, pattern_params[pattern_name],
+                     {symbol: (version, matches[pattern_name]) for symbol, (version, matches) in fresh.items()})
+                    for pattern_name in scanned)
+            evaluated.update({symbol: matches for symbol, (_, matches) in fresh.items()})
+            results = [row for symbol in symbols if symbol in evaluated for row in symbol_rows(evaluated[symbol])]
+            progress.finish()
+            stream.flush()
+
+            result_queue.put({
+                'type': 'done',
+                'pattern': label,
+                'patterns': list(pattern_names),
+                'results': results,
+                'skipped': skipped,
+                'skipped_patterns': skipped_patterns,
+                'cached': len(symbols) - len(pending),
+                'progress': progress.snapshot(),
+                'cancelled': cancel_event.is_set() if cancel_event else False
+            })
+
+        key = ('chart', tuple(pattern_names), interval, str(start_date)[:10], str(end_date)[:10], lookback,
+               None if requested is None else tuple(requested))
+        return self.scheduler.submit(key, chart_pattern_scan_thread, result_queue, progress_queue, cancel_event, priority)
+
+    def start_sharded_scan(self, kind, patterns, interval, start_date, end_date, result_queue, cancel_event,
+                           progress_queue=None, shard_size=DEFAULT_SHARD_SIZE, queue_path=None,
+                           recent_candles=RECENT_CANDLES, lookback=None, priority=PRIORITY_NORMAL,
+                           symbols=None, poll_interval=1.0, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """
+        Start a scan split into symbol shards that worker processes (scan_worker.py) run
+
+        The shards are put on the shard queue; this coordinator streams each shard's
+        matches and progress as it completes and finally merges the partial results
+        into the same 'done' message start_candlestick_scan/start_chart_pattern_scan
+        produce. Symbols of shards that failed on every attempt are listed as skipped.
+        If no worker touches the queue for idle_timeout seconds (none is running),
+        the job is cancelled and the scan fails.
+
+        Args:
+            kind: 'candlestick' or 'chart'
+            patterns: Pattern name, or a list of names
+            shard_size: Symbols per shard
+            queue_path: Shard queue database (defaults to the one next to the OHLCV store)
+            poll_interval: Seconds between polls of the queue
+            idle_timeout: Seconds without any worker claiming, heartbeating or completing a shard before the scan fails
+            (other arguments as for start_candlestick_scan / start_chart_pattern_scan)
+
+        Returns:
+            str: ID of the scan job
+        """
+        patterns = sorted([patterns] if isinstance(patterns, str) else patterns)
+        if kind == 'candlestick':
+            spec = {'kind': kind, 'patterns': patterns, 'recent_candles': recent_candles, 'lookback': lookback}
+        else:
+            spec = {'kind': kind, 'patterns': patterns, 'lookback': lookback}
+        label = ", ".join(patterns)
+        spec.update(interval=interval, start_date=str(start_date)[:10], end_date=str(end_date)[:10])
+        requested = None if symbols is None else list(symbols)
+
+        def coordinator_thread(result_queue, progress_queue, cancel_event):
+            shard_queue = get_shard_queue(queue_path)
+            shard_queue.purge()
+            symbols, skipped = split_negative_cached(
+                get_all_stock_symbols() if requested is None else requested, interval)
+            job_id = shard_queue.create_job(spec, symbols, shard_size)
+            print(f"[SHARDED_SCAN] {label}: {len(symbols)} symbols in job {job_id}")
+
+            progress = ScanProgress(progress_queue)
+            stream = ResultStream(result_queue, pattern=label)
+            progress.start(len(symbols))
+            merged = {}  # shard_no -> partial result
+            pending = set(range(-(-len(symbols) // shard_size)))  # Shards not merged yet
+            started_at = time.time()
+            cancelled = False
+            while True:
+                if cancel_event.is_set():
+                    shard_queue.cancel_job(job_id)
+                    cancelled = True
+                    break
+                status = shard_queue.status(job_id)
+                for shard in shard_queue.shards(job_id, ('done', 'failed'), pending):
+                    pending.discard(shard['shard_no'])
+                    partial = shard['result'] if shard['state'] == 'done' else {
+                        'results': [], 'hits': {}, 'cached': 0, 'skipped_patterns': {},
+                        'skipped': [{'symbol': symbol, 'interval': interval, 'reason': f"shard failed: {shard['error']}"}
+                                    for symbol in shard['symbols']],
+                    }
+                    merged[shard['shard_no']] = partial
+                    if kind == 'candlestick':
+                        rows = [row for pattern_rows in partial['hits'].values() for row in pattern_rows]
+                        matched = set(partial['results'])
+                    else:
+                        rows = partial['results']
+                        matched = {row['symbol'] for row in rows}
+                    for symbol in shard['symbols']:
+                        progress.advance(symbol, symbol in matched)
+                    stream.add(rows)
+                if status['done'] + status['failed'] >= status['total']:
+                    break
+                if time.time() - max(started_at, shard_queue.last_activity() or 0) > idle_timeout:
+                    shard_queue.cancel_job(job_id)
+                    raise RuntimeError(f"no scan worker has been active for {idle_timeout:g}s "
+                                       f"(start scan_worker.py processes); job {job_id} cancelled")
+                time.sleep(poll_interval)
+            if not cancelled:
+                shard_queue.finish_job(job_id)
+            progress.finish()
+            stream.flush()
+
+            partials = [merged[shard_no] for shard_no in sorted(merged)]
+            message = {
+                'type': 'done',
+                'pattern': label,
+                'results': [result for partial in partials for result in partial['results']],
+                'skipped': skipped + [entry for partial in partials for entry in partial['skipped']],
+                'skipped_patterns': {pattern: reason for partial in partials
+                                     for pattern, reason in (partial.get('skipped_patterns') or {}).items()},
+                'cached': sum(partial.get('cached') or 0 for partial in partials),
+                'progress': progress.snapshot(),
+                'sharded_job_id': job_id,
+                'cancelled': cancelled,
+                'patterns': list(patterns),
+            }
+            if kind == 'candlestick':
+                message['hits'] = {pattern_name: [row for partial in partials for row in partial['hits'].get(pattern_name, [])]
+                                   for pattern_name in patterns}
+            result_queue.put(message)
+
+        key = ('sharded', json.dumps(spec, sort_keys=True), shard_size, None if requested is None else tuple(requested))
+        return self.scheduler.submit(key, coordinator_thread, result_queue, progress_queue, cancel_event, priority)
+
+    @staticmethod
+    def chart_pattern_row(pattern_name, symbol, match, dt_index):
+        """
+        Scan result row for one detected chart pattern
+
+        Returns:
+            dict: 'symbol', 'pattern' and <point>_idx / <point>_date for each point of the pattern
+        """
+        row = {"symbol": symbol, "pattern": pattern_name}
+        for point, idx in zip(CHART_PATTERN_POINTS[pattern_name], match):
+            row[f"{point}_idx"] = idx
+            row[f"{point}_date"] = str(dt_index[idx])
+        return row
+
+    @staticmethod
+    def detect_chart_patterns(pattern_names, symbol, chart_data, lookback=None):
+        """
+        Detect the freshest occurrence of each chart pattern in one symbol's data
+
+        Pivots and trend context are computed once and shared by all the detectors.
+
+        Args:
+            lookback: Only the last lookback bars are evaluated (None for each pattern's own default, 0 for all of them)
+
+        Returns:
+            dict: Pattern name -> scan result row, or None if the pattern was not found
+        """
+        matches = dict.fromkeys(pattern_names)
+        try:
+            dt_index = chart_data.index if hasattr(chart_data.index, 'to_list') else chart_data['Date']
+            for pattern_name, match in detect_latest_patterns(chart_data, pattern_names, lookback).items():
+                if match:
+                    matches[pattern_name] = ScannerService.chart_pattern_row(pattern_name, symbol, match, dt_index)
+        except Exception as e:
+            print(f"Error scanning {symbol}: {e}")
+        return matches
+
+    @staticmethod
+    def score_cnn_patterns(pattern_names, symbols, frames, lookback, scorer):
+        """
+        Score several symbols' recent close windows with the chart pattern CNN in one batch
+
+        Every strided window inside the last lookback bars is scored; a symbol matches
+        a pattern when its most probable window reaches the scorer's min_probability.
+
+        Args:
+            pattern_names: Names from CNN_CHART_PATTERNS
+            symbols, frames: The symbols and their chart data
+            lookback: Bars whose windows are scored (None/0 for all of them)
+            scorer: chart_pattern_cnn.inference.ChartPatternScorer
+
+        Returns:
+            list: Per symbol, dict of pattern name -> scan result row (with 'probability'), or None
+        """
+        offsets = [max(0, len(chart_data) - lookback) if lookback else 0 for chart_data in frames]
+        scores = scorer.score({symbol: chart_data['Close'].values[offset:]
+                               for symbol, chart_data, offset in zip(symbols, frames, offsets)})
+        matches = []
+        for symbol, chart_data, offset in zip(symbols, frames, offsets):
+            dt_index = chart_data.index if hasattr(chart_data.index, 'to_list') else chart_data['Date']
+            symbol_matches = dict.fromkeys(pattern_names)
+            for pattern_name in pattern_names:
+                probabilities = scores[symbol]['probabilities'][:, CNN_CHART_PATTERNS[pattern_name]]
+                if not len(probabilities):
+                    continue
+                best = int(np.argmax(np.nan_to_num(probabilities, nan=-1.0)))
+                if probabilities[best] >= scorer.min_probability:
+                    window_end = offset + int(scores[symbol]['window_end'][best])
+                    row = ScannerService.chart_pattern_row(pattern_name, symbol,
+                                                           (window_end - scorer.window + 1, window_end), dt_index)
+                    row["probability"] = round(float(probabilities[best]), 4)
+                    symbol_matches[pattern_name] = row
+            matches.append(symbol_matches)
+        return matches
+
+    @staticmethod
+    def detect_chart_pattern(pattern_name, symbol, chart_data, lookback=None):
+        """
+        Detect the freshest occurrence of a chart pattern in one symbol's data
+
+        Args:
+            lookback: Only the last lookback bars are evaluated (None for the pattern's own default, 0 for all of them)
+
+        Returns:
+            dict: Scan result row, or None if the pattern was not found
+        """
+        return ScannerService.detect_chart_patterns([pattern_name], symbol, chart_data, lookback)[pattern_name]
+
+_scanner_service = None
+_scanner_service_lock = threading.Lock()
+
+def get_scanner_service():
+    """Process-wide scanner service shared by all sessions, created on first use"""
+    global _scanner_service
+    with _scanner_service_lock:
+        if _scanner_service is None:
+            _scanner_service = ScannerService()
+        return _scanner_service
+
+def cnn_scorer_available():
+    """Whether the chart pattern CNN can be used: torch imports and the trained weights exist"""
+    try:
+        from chart_pattern_cnn.inference import DEFAULT_WEIGHTS_PATH
+    except ImportError:
+        return False
+    return os.path.exists(DEFAULT_WEIGHTS_PATH)
@@ -1,122 +1,12 @@
 import streamlit as st
-import threading
-import queue
-import time
-from concurrent.futures import ThreadPoolExecutor
-from scanner import scan_stocks_for_pattern
-from stock_data import get_all_stock_symbols, fetch_stock_chart_data
-from chart_patterns import detect_double_top
-
-class ScannerService:
-    """Unified scanner service for both candlestick and chart patterns"""
-
-    def __init__(self):
-        self.executor = None
-
-    def get_executor(self):
-        """Get or create thread executor"""
-        if self.executor is None:
-            self.executor = ThreadPoolExecutor(max_workers=2)
-        return self.executor
-
-    def start_candlestick_scan(self, pattern_name, interval, start_date, end_date,
-                              result_queue, cancel_event, progress_queue=None):
-        """
-        Start candlestick pattern scanning
-
-        Args:
-            pattern_name: Name of the candlestick pattern
-            interval: Time interval for data
-            start_date: Start date for scanning
-            end_date: End date for scanning
-            result_queue: Queue to put results
-            cancel_event: Event to signal cancellation
-            progress_queue: Queue for progress updates
-        """
-        def scanner_thread():
-            def progress_callback(symbol):
-                if progress_queue:
-                    progress_queue.put(symbol)
-
-            results = scan_stocks_for_pattern(
-                pattern_name, interval, start_date, end_date,
-                cancel_event, progress_callback
-            )
-
-            result_queue.put({
-                'pattern': pattern_name,
-                'results': results,
-                'cancelled': cancel_event.is_set() if cancel_event else False
-            })
-
-        self.get_executor().submit(scanner_thread)
-
-    def start_chart_pattern_scan(self, pattern_name, interval, start_date, end_date,
-                                result_queue, cancel_event, progress_queue=None):
-        """
-        Start chart pattern scanning
-
-        Args:
-            pattern_name: Name of the chart pattern
-            interval: Time interval for data
-            start_date: Start date for scanning
-            end_date: End date for scanning
-            result_queue: Queue to put results
-            cancel_event: Event to signal cancellation
-            progress_queue: Queue for progress updates
-        """
-        def chart_pattern_scan_thread():
-            results = []
-            symbols = get_all_stock_symbols()
-
-            for symbol in symbols:
-                if cancel_event and cancel_event.is_set():
-                    break
-
-                if progress_queue:
-                    progress_queue.put(symbol)
-
-                try:
-                    chart_data = fetch_stock_chart_data(
-                        symbol, interval=interval,
-                        start_date=start_date, end_date=end_date
-                    )
-
-                    if chart_data is None or chart_data.empty:
-                        continue
-
-                    # For now, only handle Double Top pattern
-                    # This can be extended to support other patterns
-                    if pattern_name == "Double Top":
-                        double_tops = detect_double_top(chart_data)
-                        if double_tops:
-                            first_top_idx, pivot_low_idx, second_top_idx = double_tops[0]
-                            dt_index = chart_data.index if hasattr(chart_data.index, 'to_list') else chart_data['Date']
-                            result = {
-                                "symbol": symbol,
-                                "pattern": pattern_name,
-                                "first_top_idx": first_top_idx,
-                                "first_top_date": str(dt_index[first_top_idx]),
-                                "pivot_low_idx": pivot_low_idx,
-                                "pivot_low_date": str(dt_index[pivot_low_idx]),
-                                "second_top_idx": second_top_idx,
-                                "second_top_date": str(dt_index[second_top_idx]),
-                            }
-                            results.append(result)
-
-                    time.sleep(0.01)  # Small delay to prevent overwhelming the system
-
-                except Exception as e:
-                    print(f"Error scanning {symbol}: {e}")
-                    continue
-
-            result_queue.put({
-                'pattern': pattern_name,
-                'results': results,
-                'cancelled': cancel_event.is_set() if cancel_event else False
-            })
+from scanner import RECENT_CANDLES
+from stock_data import clear_negative_cache
+from chart_patterns import chart_pattern_lookback, CHART_PATTERN_POINTS, CNN_CHART_PATTERNS
+# The scan logic lives in the streamlit-free services.scan_service; imported from here by the dashboard
+from services.scan_service import ScannerService, get_scanner_service, cnn_scorer_available
 
-        self.get_executor().submit(chart_pattern_scan_thread)
+# Seconds between refreshes of a running scan's progress and streamed results
+SCAN_REFRESH_SECONDS = 1.0
 
 class ScannerUI:
     """UI components for scanner functionality"""
@@ -132,98 +22,134 @@ class ScannerUI:
         "Inverted Head and Shoulders", "Flag and Pole", "Inverted Flag and Pole"
     ]
 
+    @staticmethod
+    def chart_patterns():
+        """Chart patterns offered by the scanner, with the CNN ones only when the CNN can be loaded"""
+        return ScannerUI.CHART_PATTERNS + (list(CNN_CHART_PATTERNS) if cnn_scorer_available() else [])
+
     @staticmethod
     def render_candlestick_scanner(scanner_service, symbol, interval, start_date, end_date):
         """Render candlestick pattern scanner UI"""
         st.sidebar.header("Candlestick Pattern Scanner")
 
-        # Pattern selection
-        selected_pattern = st.sidebar.selectbox(
-            "Select Candlestick Pattern",
+        # Pattern selection (all selected patterns are scanned in one pass)
+        selected_patterns = st.sidebar.multiselect(
+            "Select Candlestick Patterns",
             ScannerUI.CANDLESTICK_PATTERNS,
+            default=ScannerUI.CANDLESTICK_PATTERNS[:1],
             key="pattern_select"
         )
+        if st.sidebar.checkbox("All patterns", key="pattern_select_all"):
+            selected_patterns = list(ScannerUI.CANDLESTICK_PATTERNS)
+
+        # Only the latest candles (plus the patterns' lookback) are evaluated
+        recent_candles = st.sidebar.number_input(
+            "Latest candles to check", min_value=1, max_value=250,
+            value=RECENT_CANDLES, key="pattern_recent_candles"
+        )
 
         # Scanner status
         scan_running = st.session_state.get('scanner_status') == 'running'
 
         # Scan button
-        if st.sidebar.button("Scan for Pattern", disabled=scan_running, key="scan_btn"):
-            ScannerUI._start_candlestick_scan(scanner_service, selected_pattern, interval, start_date, end_date)
+        if st.sidebar.button("Scan for Pattern", disabled=scan_running or not selected_patterns, key="scan_btn"):
+            ScannerUI._start_candlestick_scan(scanner_service, selected_patterns, interval, start_date, end_date,
+                                              int(recent_candles))
 
         # Cancel button
         if st.sidebar.button("Cancel Scan", disabled=not scan_running, key="cancel_btn"):
             ScannerUI._cancel_scan('scanner')
 
-        # Process results
-        ScannerUI._process_scanner_results()
+        # Scans precomputed by scan_cli.py
+        ScannerUI._show_saved_scans('scanner', disabled=scan_running)
 
-        # Show progress
-        ScannerUI._show_scan_progress('scanner')
+        # Progress and results (refreshed on their own while the scan runs)
+        with st.sidebar:
+            ScannerUI._render_scan_status('scanner', lambda: ScannerUI._show_scan_results('scanner'))
 
-        # Show results
-        ScannerUI._show_scan_results('scanner')
+        # Skipped symbols and re-probe
+        ScannerUI._show_skipped_symbols('scanner')
 
     @staticmethod
     def render_chart_pattern_scanner(scanner_service, symbol, interval, start_date, end_date):
         """Render chart pattern scanner UI"""
         st.sidebar.header("Chart Pattern Scanner")
 
-        # Pattern selection
-        selected_chart_pattern = st.sidebar.selectbox(
-            "Select Chart Pattern",
-            ScannerUI.CHART_PATTERNS,
+        # Pattern selection (all selected patterns are detected in one pass per symbol)
+        selected_chart_patterns = st.sidebar.multiselect(
+            "Select Chart Patterns",
+            ScannerUI.chart_patterns(),
+            default=ScannerUI.CHART_PATTERNS[:1],
             key="chart_pattern_select"
         )
 
+        # Recency scan: only the last bars are evaluated and the freshest match is reported
+        default_lookback = chart_pattern_lookback(selected_chart_patterns)
+        chart_lookback = st.sidebar.number_input(
+            "Lookback bars (0 = full range)", min_value=0, max_value=5000,
+            value=default_lookback, key="chart_pattern_lookback"
+        )
+
         # Scanner status
         chart_scan_running = st.session_state.get('chart_scanner_status') == 'running'
 
         # Scan button
-        if st.sidebar.button("Scan for Chart Pattern", disabled=chart_scan_running, key="scan_chart_pattern_btn"):
-            ScannerUI._start_chart_pattern_scan(scanner_service, selected_chart_pattern, interval, start_date, end_date)
+        if st.sidebar.button("Scan for Chart Pattern", disabled=chart_scan_running or not selected_chart_patterns,
+                             key="scan_chart_pattern_btn"):
+            # Left at the default, each pattern keeps its own (shorter) lookback
+            lookback = None if chart_lookback == default_lookback else int(chart_lookback)
+            ScannerUI._start_chart_pattern_scan(scanner_service, selected_chart_patterns, interval, start_date, end_date,
+                                                lookback)
 
         # Cancel button
         if st.sidebar.button("Cancel Chart Pattern Scan", disabled=not chart_scan_running, key="cancel_chart_pattern_btn"):
             ScannerUI._cancel_scan('chart_scanner')
 
-        # Process results
-        ScannerUI._process_chart_scanner_results()
+        # Scans precomputed by scan_cli.py
+        ScannerUI._show_saved_scans('chart_scanner', disabled=chart_scan_running)
 
-        # Show progress
-        ScannerUI._show_scan_progress('chart_scanner')
+        # Progress and chart pattern results (refreshed on their own while the scan runs)
+        with st.sidebar:
+            ScannerUI._render_scan_status('chart_scanner',
+                                          lambda: ScannerUI._show_chart_pattern_results(selected_chart_patterns))
 
-        # Show chart pattern results
-        ScannerUI._show_chart_pattern_results(selected_chart_pattern)
+        # Skipped symbols and re-probe
+        ScannerUI._show_skipped_symbols('chart_scanner')
 
     @staticmethod
-    def _start_candlestick_scan(scanner_service, pattern_name, interval, start_date, end_date):
+    def _start_candlestick_scan(scanner_service, pattern_names, interval, start_date, end_date,
+                                recent_candles=RECENT_CANDLES):
         """Start candlestick pattern scan"""
         st.session_state['scanner_status'] = 'running'
         st.session_state['scanner_results'] = []
-        st.session_state['scanner_pattern'] = pattern_name
+        st.session_state['scanner_hits'] = {}
+        st.session_state['scanner_progress'] = None
+        st.session_state['scanner_pattern'] = ", ".join(pattern_names)
         st.session_state['scanner_toast'] = False
         st.session_state['scanner_cancel_event'].clear()
 
-        scanner_service.start_candlestick_scan(
-            pattern_name, interval, start_date, end_date,
+        st.session_state['scanner_job_id'] = scanner_service.start_candlestick_scan(
+            pattern_names, interval, start_date, end_date,
             st.session_state['scanner_queue'],
             st.session_state['scanner_cancel_event'],
-            st.session_state['scanner_progress_queue']
+            st.session_state['scanner_progress_queue'],
+            recent_candles=recent_candles
         )
 
     @staticmethod
-    def _start_chart_pattern_scan(scanner_service, pattern_name, interval, start_date, end_date):
+    def _start_chart_pattern_scan(scanner_service, pattern_names, interval, start_date, end_date, lookback=None):
         """Start chart pattern scan"""
         st.session_state['chart_scanner_status'] = 'running'
         st.session_state['chart_scanner_results'] = []
+        st.session_state['chart_scanner_progress'] = None
         st.session_state['chart_scanner_cancel_event'].clear()
 
-        scanner_service.start_chart_pattern_scan(
-            pattern_name, interval, start_date, end_date,
+        st.session_state['chart_scanner_job_id'] = scanner_service.start_chart_pattern_scan(
+            pattern_names, interval, start_date, end_date,
             st.session_state['chart_scanner_queue'],
             st.session_state['chart_scanner_cancel_event'],
-            st.session_state['chart_scanner_progress_queue']
+            st.session_state['chart_scanner_progress_queue'],
+            lookback=lookback
         )
 
     @staticmethod
@@ -238,83 +164,194 @@ class ScannerUI:
 
     @staticmethod
     def _process_scanner_results():
-        """Process candlestick scanner results"""
+        """Process candlestick scanner results (streamed matches and the final summary)"""
         try:
             while not st.session_state['scanner_queue'].empty():
                 result = st.session_state['scanner_queue'].get_nowait()
-                st.session_state['scanner_results'] = result['results']
-                st.session_state['scanner_pattern'] = result['pattern']
-                if result['cancelled']:
-                    st.session_state['scanner_status'] = 'idle'
-                else:
-                    st.session_state['scanner_status'] = 'done'
-                    st.session_state['scanner_toast'] = True
+                if result.get('job_id') != st.session_state.get('scanner_job_id'):
+                    continue  # Left over from an earlier (cancelled) scan
+                if result.get('type') == 'partial':
+                    hits = st.session_state.setdefault('scanner_hits', {})
+                    results = st.session_state['scanner_results']
+                    for row in result['results']:
+                        hits.setdefault(row['pattern'], []).append(row)
+                        if row['symbol'] not in results:
+                            results.append(row['symbol'])
+                    continue
+                ScannerUI._finish_scan('scanner', result)
         except Exception:
             pass
 
     @staticmethod
     def _process_chart_scanner_results():
-        """Process chart pattern scanner results"""
+        """Process chart pattern scanner results (streamed matches and the final summary)"""
         try:
             chart_scanner_queue = st.session_state.get('chart_scanner_queue')
             if chart_scanner_queue:
                 while not chart_scanner_queue.empty():
                     result = chart_scanner_queue.get_nowait()
-                    st.session_state['chart_scanner_results'] = result['results']
-                    if result['cancelled']:
-                        st.session_state['chart_scanner_status'] = 'idle'
-                    else:
-                        st.session_state['chart_scanner_status'] = 'done'
+                    if result.get('job_id') != st.session_state.get('chart_scanner_job_id'):
+                        continue  # Left over from an earlier (cancelled) scan
+                    if result.get('type') == 'partial':
+                        st.session_state['chart_scanner_results'].extend(result['results'])
+                        continue
+                    ScannerUI._finish_scan('chart_scanner', result)
         except Exception:
             pass
 
+    @staticmethod
+    def _finish_scan(scanner_type, result):
+        """Show a scan's final message (from a finished job or a precomputed scan)"""
+        st.session_state[f'{scanner_type}_results'] = result['results']
+        st.session_state[f'{scanner_type}_skipped'] = result.get('skipped', [])
+        st.session_state[f'{scanner_type}_skipped_patterns'] = result.get('skipped_patterns', {})
+        st.session_state[f'{scanner_type}_progress'] = result.get('progress')
+        if scanner_type == 'scanner':
+            st.session_state['scanner_hits'] = result.get('hits', {})
+            st.session_state['scanner_pattern'] = result.get('pattern', st.session_state.get('scanner_pattern'))
+        if result.get('cancelled') or result.get('error'):
+            st.session_state[f'{scanner_type}_status'] = 'idle'
+        else:
+            st.session_state[f'{scanner_type}_status'] = 'done'
+            if scanner_type == 'scanner':
+                st.session_state['scanner_toast'] = True
+
+    @staticmethod
+    def _show_saved_scans(scanner_type, disabled=False):
+        """Offer the scans scan_cli.py wrote (e.g. after market close) for loading without rescanning"""
+        from scan_cli import list_scan_outputs, load_scan_output
+        outputs = list_scan_outputs(kind='candlestick' if scanner_type == 'scanner' else 'chart')
+        if not outputs:
+            return
+        with st.sidebar.expander("Precomputed scans"):
+            name = st.selectbox("Scan", list(outputs), key=f"{scanner_type}_saved_scan")
+            if st.button("Load results", disabled=disabled, key=f"{scanner_type}_load_saved_btn"):
+                try:
+                    document = load_scan_output(outputs[name])
+                except (OSError, ValueError) as e:
+                    st.error(f"Error loading {name}: {e}")
+                    return
+                ScannerUI._finish_scan(scanner_type, document['scan'])
+                st.caption(f"Generated {document.get('generated_at')}, "
+                           f"{document.get('start_date')} to {document.get('end_date')}")
+
+    @staticmethod
+    def _render_scan_status(scanner_type, show_results):
+        """
+        Process queued results, then show progress and results
+
+        Runs as a fragment that reruns every SCAN_REFRESH_SECONDS while the scan is
+        running, so streamed matches show up without any user interaction. Call it
+        inside the container it should render to (e.g. ``with st.sidebar:``).
+
+        Args:
+            scanner_type: 'scanner' or 'chart_scanner'
+            show_results: Callable rendering the results
+        """
+        status_key = f'{scanner_type}_status'
+        if scanner_type == 'scanner':
+            process_results = ScannerUI._process_scanner_results
+        else:
+            process_results = ScannerUI._process_chart_scanner_results
+
+        def scan_status():
+            was_running = st.session_state.get(status_key) == 'running'
+            process_results()
+            ScannerUI._show_scan_progress(scanner_type)
+            show_results()
+            if was_running and st.session_state.get(status_key) != 'running':
+                # Rerun the whole app so the scan buttons and skipped symbols catch up
+                st.rerun()
+
+        running = st.session_state.get(status_key) == 'running'
+        st.fragment(scan_status, run_every=SCAN_REFRESH_SECONDS if running else None)()
+
     @staticmethod
     def _show_scan_progress(scanner_type):
-        """Show scanning progress"""
+        """Show the latest coalesced progress snapshot"""
         status_key = f'{scanner_type}_status'
         progress_key = f'{scanner_type}_progress_queue'
+        snapshot_key = f'{scanner_type}_progress'
 
         if st.session_state.get(status_key) == 'running':
-            progress_placeholder = st.sidebar.empty()
-            last_scanned = None
-
-            # Check for progress updates
+            # The bounded queue only ever holds the most recent snapshot
             try:
                 progress_queue = st.session_state.get(progress_key)
-                if progress_queue:
-                    while not progress_queue.empty():
-                        last_scanned = progress_queue.get_nowait()
+                if progress_queue and not progress_queue.empty():
+                    st.session_state[snapshot_key] = progress_queue.get_nowait()
             except Exception:
                 pass
 
-            if last_scanned:
-                progress_placeholder.info(f"Scanning: {last_scanned}")
+            progress = st.session_state.get(snapshot_key)
+            if progress and progress['total']:
+                eta = f", ETA {progress['eta']:.0f}s" if progress['eta'] is not None else ""
+                st.progress(
+                    min(progress['done'] / progress['total'], 1.0),
+                    text=f"{progress['done']}/{progress['total']} symbols, {progress['hits']} hits, "
+                         f"{progress['rate']:.0f}/s{eta}"
+                )
 
     @staticmethod
     def _show_scan_results(scanner_type):
-        """Show candlestick scan results"""
+        """Show candlestick scan results (the hits streamed so far while the scan runs)"""
         # Toast alert when scan is done
         if st.session_state.get('scanner_toast', False):
             results_count = len(st.session_state.get('scanner_results', []))
-            st.sidebar.success(f"Scan done: {results_count} results found.")
+            st.success(f"Scan done: {results_count} results found.")
             st.session_state['scanner_toast'] = False
 
         # Show status
-        if st.session_state.get('scanner_status') == 'running':
-            st.sidebar.info("Scanning all stocks for pattern")
+        status = st.session_state.get('scanner_status')
+        if status == 'running':
+            st.info("Scanning all stocks for pattern")
+
+        # Hits grouped by pattern
+        if status in ('running', 'done'):
+            for pattern_name, hits in st.session_state.get('scanner_hits', {}).items():
+                with st.expander(f"{pattern_name} ({len(hits)})"):
+                    if not hits:
+                        st.write("No matches")
+                    for hit in hits:
+                        st.write(f"{hit['symbol']}: {hit['date']}")
+
+    @staticmethod
+    def _show_chart_pattern_results(selected_patterns):
+        """Show chart pattern scan results grouped by pattern (the matches streamed so far while the scan runs)"""
+        label = ", ".join(selected_patterns)
+        status = st.session_state.get('chart_scanner_status')
+        if status not in ('running', 'done'):
+            return
+        results = st.session_state.get('chart_scanner_results', [])
+        if status == 'running':
+            st.info(f"Scanning for {label}...")
+        elif results:
+            st.success(f"Found {len({r['symbol'] for r in results})} stocks with {label}")
+        else:
+            st.info(f"No {label} found in any stock.")
+
+        grouped = {}
+        for r in results:
+            grouped.setdefault(r.get('pattern'), []).append(r)
+        for pattern_name, rows in grouped.items():
+            with st.expander(f"{pattern_name} ({len(rows)})"):
+                for r in rows:
+                    points = ", ".join(f"{point.replace('_', ' ').capitalize()} {r[point + '_date']}"
+                                       for point in CHART_PATTERN_POINTS.get(pattern_name, ())
+                                       if point + '_date' in r)
+                    probability = f" (p={r['probability']:.2f})" if 'probability' in r else ""
+                    st.write(f"{r['symbol']}: {points}{probability}")
 
     @staticmethod
-    def _show_chart_pattern_results(selected_pattern):
-        """Show chart pattern scan results"""
-        if st.session_state.get('chart_scanner_status') == 'running':
-            st.sidebar.info(f"Scanning for {selected_pattern}...")
-
-        if st.session_state.get('chart_scanner_status') == 'done':
-            results = st.session_state.get('chart_scanner_results', [])
-            if results:
-                st.sidebar.success(f"Found {len(results)} stocks with {selected_pattern}")
-                for r in results:
-                    if 'first_top_date' in r:  # Double top format
-                        st.sidebar.write(f"{r['symbol']}: Top1 {r['first_top_date']}, Pivot {r['pivot_low_date']}, Top2 {r['second_top_date']}")
-            else:
-                st.sidebar.info(f"No {selected_pattern} found in any stock.")
\ No newline at end of file
+    def _show_skipped_symbols(scanner_type):
+        """Show patterns the last scan could not evaluate, and symbols skipped via the negative cache with a re-probe"""
+        for pattern_name, reason in st.session_state.get(f'{scanner_type}_skipped_patterns', {}).items():
+            st.sidebar.warning(f"{pattern_name} was not scanned: {reason}")
+        skipped = st.session_state.get(f'{scanner_type}_skipped', [])
+        if not skipped:
+            return
+        with st.sidebar.expander(f"Skipped {len(skipped)} delisted/failing symbols"):
+            for entry in skipped:
+                st.write(f"{entry['symbol']}: {entry['reason']}")
+            if st.button("Re-probe skipped symbols", key=f"{scanner_type}_reprobe_btn"):
+                clear_negative_cache([entry['symbol'] for entry in skipped])
+                st.session_state[f'{scanner_type}_skipped'] = []
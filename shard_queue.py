@@ -0,0 +1,275 @@
+"""
+SQLite work queue of scan shards shared by local worker processes.
+
+A scan job is split into shards of symbols. Any number of worker processes
+(see scan_worker.py) claim shards from the queue under a time-limited lease,
+extend the lease with heartbeats while they work and write each shard's partial
+result back. A shard whose lease runs out - its worker died or hung - is put
+back on the queue for another worker, up to max_attempts claims; after that it
+is marked failed. The coordinator (ScannerService.start_sharded_scan) polls the
+job and merges the shard results, and gives up on the job when no worker has
+claimed, heartbeated or completed any shard for DEFAULT_IDLE_TIMEOUT seconds.
+
+The database uses WAL journaling so readers do not block the writer; it is
+meant for workers on one machine (SQLite locking is not reliable on network
+file systems).
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from stock_data import get_ohlcv_store
+from ohlcv_store import DEFAULT_STORE_DIR
+
+DEFAULT_SHARD_SIZE = 100
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+# Seconds without any worker activity on the queue after which a coordinator fails its job
+DEFAULT_IDLE_TIMEOUT = 5 * DEFAULT_LEASE_SECONDS
+# Finished and cancelled jobs older than this are deleted when a new job starts
+DEFAULT_PURGE_SECONDS = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    job_id TEXT NOT NULL,
+    shard_no INTEGER NOT NULL,
+    symbols TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    heartbeat_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, shard_no)
+);
+CREATE INDEX IF NOT EXISTS shards_state ON shards (state, job_id, shard_no);
+"""
+
+class ShardQueue:
+    """Leased shard queue in a SQLite database"""
+
+    FILE_NAME = "scan_queue.sqlite"
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+            max_attempts: Claims of a shard before it is marked failed
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        # One connection per thread; autocommit mode with explicit transactions
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so concurrent claims never race
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def create_job(self, spec, symbols, shard_size=DEFAULT_SHARD_SIZE):
+        """
+        Split symbols into shards and queue them
+
+        Args:
+            spec: JSON-serializable scan description passed to the workers
+            symbols: Symbols to scan, in result order
+            shard_size: Symbols per shard
+
+        Returns:
+            str: Job ID
+        """
+        job_id = uuid.uuid4().hex[:12]
+        shards = [symbols[i:i + shard_size] for i in range(0, len(symbols), shard_size)]
+        with self._transaction() as db:
+            db.execute("INSERT INTO jobs VALUES (?, ?, 'running', ?)", (job_id, json.dumps(spec, default=str), time.time()))
+            db.executemany("INSERT INTO shards (job_id, shard_no, symbols, state) VALUES (?, ?, ?, 'queued')",
+                           [(job_id, shard_no, json.dumps(shard)) for shard_no, shard in enumerate(shards)])
+        return job_id
+
+    def _requeue_expired(self, db, now):
+        """Return shards with expired leases to the queue (or fail them after max_attempts)"""
+        db.execute("UPDATE shards SET state = 'failed', worker = NULL, error = 'lease expired' "
+                   "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?", (now, self.max_attempts))
+        db.execute("UPDATE shards SET state = 'queued', worker = NULL "
+                   "WHERE state = 'leased' AND lease_until < ?", (now,))
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Lease the next queued shard of any running job (oldest job first)
+
+        Returns:
+            dict or None: {'job_id', 'shard_no', 'symbols', 'spec', 'attempt'}, or None if nothing is queued
+        """
+        now = time.time()
+        with self._transaction() as db:
+            self._requeue_expired(db, now)
+            row = db.execute(
+                "SELECT s.job_id, s.shard_no, s.symbols, s.attempts, j.spec FROM shards s "
+                "JOIN jobs j ON j.job_id = s.job_id "
+                "WHERE s.state = 'queued' AND j.status = 'running' "
+                "ORDER BY j.created_at, s.shard_no LIMIT 1").fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE shards SET state = 'leased', worker = ?, lease_until = ?, heartbeat_at = ?, "
+                       "attempts = attempts + 1 WHERE job_id = ? AND shard_no = ?",
+                       (worker_id, now + lease_seconds, now, row["job_id"], row["shard_no"]))
+        return {
+            "job_id": row["job_id"],
+            "shard_no": row["shard_no"],
+            "symbols": json.loads(row["symbols"]),
+            "spec": json.loads(row["spec"]),
+            "attempt": row["attempts"] + 1,
+        }
+
+    def heartbeat(self, job_id, shard_no, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Extend a shard lease
+
+        Returns:
+            bool: False if the worker lost the lease or the job was cancelled (stop working on it)
+        """
+        now = time.time()
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE shards SET lease_until = ?, heartbeat_at = ? WHERE job_id = ? AND shard_no = ? "
+                "AND worker = ? AND state = 'leased' "
+                "AND (SELECT status FROM jobs WHERE job_id = ?) = 'running'",
+                (now + lease_seconds, now, job_id, shard_no, worker_id, job_id)).rowcount
+        return updated == 1
+
+    def complete(self, job_id, shard_no, worker_id, result):
+        """
+        Store a shard's partial result
+
+        Returns:
+            bool: False if the lease was lost in the meantime (the result is discarded)
+        """
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE shards SET state = 'done', result = ?, lease_until = NULL, heartbeat_at = ? "
+                "WHERE job_id = ? AND shard_no = ? AND worker = ? AND state = 'leased'",
+                (json.dumps(result, default=str), time.time(), job_id, shard_no, worker_id)).rowcount
+        return updated == 1
+
+    def fail(self, job_id, shard_no, worker_id, error):
+        """Give a shard back after an error; it is retried until max_attempts claims"""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE shards SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "worker = NULL, lease_until = NULL, error = ? "
+                "WHERE job_id = ? AND shard_no = ? AND worker = ? AND state = 'leased'",
+                (self.max_attempts, str(error), job_id, shard_no, worker_id))
+
+    def cancel_job(self, job_id):
+        """Stop handing out a job's shards; workers drop leased ones at their next heartbeat"""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = 'cancelled' WHERE job_id = ?", (job_id,))
+            db.execute("UPDATE shards SET state = 'cancelled', worker = NULL "
+                       "WHERE job_id = ? AND state IN ('queued', 'leased')", (job_id,))
+
+    def finish_job(self, job_id):
+        """Mark a job whose results have been collected as finished"""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = 'finished' WHERE job_id = ? AND status = 'running'", (job_id,))
+
+    def status(self, job_id):
+        """
+        Shard counts of a job
+
+        Returns:
+            dict: Shard state -> count (queued, leased, done, failed, cancelled), plus 'total'
+        """
+        with self._transaction() as db:
+            self._requeue_expired(db, time.time())
+            rows = db.execute("SELECT state, COUNT(*) FROM shards WHERE job_id = ? GROUP BY state", (job_id,)).fetchall()
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0, "cancelled": 0}
+        counts.update({state: count for state, count in rows})
+        counts["total"] = sum(count for _, count in rows)
+        return counts
+
+    def shards(self, job_id, states=None, shard_nos=None):
+        """
+        Shards of a job in shard order
+
+        Args:
+            states: Only shards in these states (e.g. ('done',))
+            shard_nos: Only shards with these numbers (e.g. the ones not merged yet)
+
+        Returns:
+            list: {'shard_no', 'symbols', 'state', 'worker', 'attempts', 'result', 'error'} dicts
+        """
+        query, params = "SELECT * FROM shards WHERE job_id = ?", [job_id]
+        if states:
+            query += f" AND state IN ({', '.join('?' * len(states))})"
+            params.extend(states)
+        if shard_nos is not None:
+            shard_nos = list(shard_nos)
+            query += f" AND shard_no IN ({', '.join('?' * len(shard_nos))})"
+            params.extend(shard_nos)
+        rows = self._connection().execute(query + " ORDER BY shard_no", params).fetchall()
+        return [{
+            "shard_no": row["shard_no"],
+            "symbols": json.loads(row["symbols"]),
+            "state": row["state"],
+            "worker": row["worker"],
+            "attempts": row["attempts"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+        } for row in rows]
+
+    def last_activity(self):
+        """
+        Time a worker last claimed, heartbeated or completed a shard of any job
+
+        Returns:
+            float or None: Epoch seconds, None if no shard was ever claimed
+        """
+        return self._connection().execute("SELECT MAX(heartbeat_at) FROM shards").fetchone()[0]
+
+    def purge(self, older_than_seconds=DEFAULT_PURGE_SECONDS):
+        """Delete finished or cancelled jobs older than the given age"""
+        cutoff = time.time() - older_than_seconds
+        with self._transaction() as db:
+            old = [row[0] for row in db.execute(
+                "SELECT job_id FROM jobs WHERE status != 'running' AND created_at < ?", (cutoff,))]
+            db.executemany("DELETE FROM shards WHERE job_id = ?", [(job_id,) for job_id in old])
+            db.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in old])
+        return len(old)
+
+def default_queue_path():
+    """Queue database next to the on-disk OHLCV store"""
+    store = get_ohlcv_store()
+    return os.path.join(store.root if store is not None else DEFAULT_STORE_DIR, ShardQueue.FILE_NAME)
+
+def get_shard_queue(path=None):
+    """Shard queue at path (defaults to the one next to the OHLCV store)"""
+    return ShardQueue(path or default_queue_path())
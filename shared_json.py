@@ -0,0 +1,91 @@
+"""
+JSON files shared by several processes.
+
+The dashboard, scan_cli.py and scan_worker.py workers keep their state (the
+OHLCV store manifest, the negative cache, the scan result cache) in JSON files
+next to the on-disk store. Each process re-reads such a file whenever it changed
+on disk, and every write is a read-merge-replace cycle under an exclusive lock
+file, so concurrent writers add to each other's entries instead of overwriting
+them.
+"""
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on path (created if missing), held across processes"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class SharedJSONFile:
+    """A JSON object on disk, kept in memory and re-read when another process changed it"""
+
+    def __init__(self, path, **dump_options):
+        """
+        Args:
+            path: JSON file (a '<path>.lock' file is created next to it)
+            dump_options: Passed to json.dump when writing, e.g. indent
+        """
+        self.path = path
+        self.dump_options = dump_options
+        self._lock = threading.RLock()
+        self._data = None
+        self._stamp = None  # (mtime, size) of the file _data was read from or written to
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """Current contents, re-read whenever the file changed since it was last read or written"""
+        with self._lock:
+            stamp = self._stat()
+            if self._data is None or stamp != self._stamp:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._data = json.load(f)
+                except (OSError, ValueError):
+                    self._data = {}
+                self._stamp = stamp
+            return self._data
+
+    @contextmanager
+    def updating(self):
+        """
+        Read-modify-write cycle: yields the contents as currently on disk and persists them afterwards
+
+        The lock file keeps other processes from writing in between, so their changes are merged, not lost.
+        """
+        with self._lock, file_lock(self.path + ".lock"):
+            data = self.load()
+            yield data
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, **self.dump_options)
+            os.replace(tmp_path, self.path)
+            self._stamp = self._stat()
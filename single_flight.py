@@ -0,0 +1,74 @@
+"""
+Single-flight call deduplication.
+
+Concurrent calls for the same key share one execution: the first caller runs the
+function, later callers wait on the same future and receive the same result (or
+exception).
+"""
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future of the in-flight call
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() for key, or wait for the call already in flight for key
+
+        Args:
+            key: Deduplication key
+            fn: Zero-argument callable
+
+        Returns:
+            Result of the shared call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self):
+        """Number of calls currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """
+        Call counters
+
+        Returns:
+            dict: executed, coalesced, in_flight
+        """
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+            }
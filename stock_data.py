@@ -1,5 +1,6 @@
 # Utility to get all stock symbols from EQUITY_L.csv
 import pandas as pd
+from symbol_universe import get_symbol_universe
 def get_all_stock_symbols():
     import os
     import warnings
@@ -7,36 +8,525 @@ def get_all_stock_symbols():
     if not os.path.exists(csv_path):
         warnings.warn(f"Stock list CSV not found: {csv_path}")
         return []
-    stock_df = pd.read_csv(csv_path)
-    if 'SYMBOL' not in stock_df.columns or stock_df.empty:
+    try:
+        universe = get_symbol_universe(csv_path)
+    except (KeyError, ValueError):
+        universe = None
+    if universe is None or len(universe) == 0:
         warnings.warn(f"Stock list CSV is empty or missing SYMBOL column: {csv_path}")
         return []
-    return stock_df['SYMBOL'].dropna().unique().tolist()
-import yfinance as yf
+    return universe.symbol_list()
+import os
+import time
+import itertools
 import pandas as pd
+from ohlcv_store import OHLCVStore, OHLCV_COLUMNS
+from data_providers import YFinanceProvider
+from negative_cache import NegativeCache, ERROR_TTL
+from ohlcv_panel import OHLCVPanel, build_panel
+from history_cache import HistoryCache
+from single_flight import SingleFlight
+
+# Byte-bounded LRU cache of full histories, keyed by "<symbol>_<interval>"
+_stock_data_cache = HistoryCache()
+
+# Concurrent cache misses for the same key share one load (chart renderer, scan threads, sessions)
+_history_flight = SingleFlight()
+
+# Data version of each history held in memory, keyed like the cache: the store's version
+# it was read or written at, or a process-local one when there is no store
+_data_versions = {}
+
+# Without a store, versions are drawn from a counter starting at the launch time, so they
+# never repeat across runs and results cached by an earlier run never match
+_process_versions = itertools.count(time.time_ns() // 1000)
+
+# Persistent on-disk store consulted before the network; None disables it
+_ohlcv_store = OHLCVStore()
+
+# Symbols whose downloads failed or came back empty, persisted next to the store
+_negative_cache = NegativeCache(os.path.join(_ohlcv_store.root, NegativeCache.FILE_NAME))
 
-_stock_data_cache = {}
+# Source of candles for full downloads and incremental refreshes
+_data_provider = YFinanceProvider()
 
-def fetch_stock_chart_data(symbol, start_date="2024-01-01", end_date="2024-06-01", interval="1d"):
+# Optional memory-mapped compact panels per interval, consulted before the store
+_ohlcv_panels = {}
+
+# Intervals derived locally from the cached daily history instead of separate downloads
+RESAMPLED_INTERVALS = ("1wk", "1mo")
+
+# Daily data version each cached resampled frame was built from, keyed like the cache
+_resampled_from_versions = {}
+
+def base_interval(interval):
+    """Interval that is actually downloaded and stored for interval (1d for resampled intervals)"""
+    return "1d" if interval in RESAMPLED_INTERVALS else interval
+
+def get_stock_data_cache():
+    """Get the in-memory history cache (for stats, pinning and budget changes)"""
+    return _stock_data_cache
+
+def get_fetch_stats():
     """
-    Fetch all available historical stock data for the given symbol and interval, cache it, and return only the data between start_date and end_date.
-    The full history is kept in memory for backend use.
+    Counters for full-history loads
+
+    Returns:
+        dict: executed (loads actually run), coalesced (requests that joined an in-flight
+        load instead of fetching again) and in_flight
+    """
+    return _history_flight.stats()
+
+def pin_symbols(symbols, intervals=("1d", "1wk", "1mo")):
+    """Exempt symbols (e.g. a session's watchlist) from cache eviction until the same caller unpins them"""
+    for symbol in symbols:
+        for interval in intervals:
+            _stock_data_cache.pin(f"{symbol}_{interval}")
+
+def unpin_symbols(symbols, intervals=("1d", "1wk", "1mo")):
+    """Release pins taken with pin_symbols; symbols still pinned by another caller stay resident"""
+    for symbol in symbols:
+        for interval in intervals:
+            _stock_data_cache.unpin(f"{symbol}_{interval}")
+
+def get_ohlcv_store():
+    """Get the on-disk OHLCV store used by the fetch path"""
+    return _ohlcv_store
+
+def set_ohlcv_store(store):
+    """Replace the on-disk OHLCV store (e.g. a fixture-filled store for offline tests), or None to disable it"""
+    global _ohlcv_store, _negative_cache
+    _ohlcv_store = store
+    if store is not None:
+        _negative_cache = NegativeCache(os.path.join(store.root, NegativeCache.FILE_NAME))
+
+def get_negative_cache():
+    """Get the negative cache of failing/delisted symbols"""
+    return _negative_cache
+
+def split_negative_cached(symbols, interval="1d"):
+    """
+    Separate symbols that are in the negative cache
+
+    Returns:
+        tuple: (active symbols, list of negative cache entries for the skipped ones)
+    """
+    interval = base_interval(interval)
+    active, skipped = [], []
+    for symbol in symbols:
+        entry = _negative_cache.get(symbol, interval)
+        if entry is None:
+            active.append(symbol)
+        else:
+            skipped.append(entry)
+    return active, skipped
+
+def clear_negative_cache(symbols=None, interval=None):
     """
-    global _stock_data_cache
+    Force a re-probe of negative-cached symbols
+
+    Args:
+        symbols: Symbols to re-probe, or None for all of them
+        interval: Interval to clear, or None for every interval
+    """
+    if symbols is None:
+        _negative_cache.clear(interval)
+        return
+    for symbol in symbols:
+        for entry in _negative_cache.entries(interval):
+            if entry['symbol'] == symbol:
+                _negative_cache.remove(symbol, entry['interval'])
+
+def get_data_provider():
+    """Get the market data provider used for downloads"""
+    return _data_provider
+
+def set_data_provider(provider):
+    """Replace the market data provider (e.g. data_providers.LocalProvider in tests)"""
+    global _data_provider
+    _data_provider = provider
+
+def attach_ohlcv_panel(panel):
+    """Serve histories of panel.interval from a memory-mapped OHLCVPanel where it is current"""
+    _ohlcv_panels[panel.interval] = panel
+
+def detach_ohlcv_panel(interval):
+    """Stop serving histories of interval from a panel"""
+    _ohlcv_panels.pop(interval, None)
+
+def get_ohlcv_panel(interval="1d"):
+    """Get the attached panel for interval, or None"""
+    return _ohlcv_panels.get(interval)
+
+def build_ohlcv_panel(symbols=None, interval="1d", attach=True):
+    """
+    Build a compact memory-mapped panel for interval under the store directory
+
+    Args:
+        symbols: Symbols to include (defaults to all symbols in EQUITY_L.csv)
+        interval: Time interval (histories are loaded through the normal fetch path)
+        attach: Attach the panel so fetch_stock_chart_data serves views from it
+
+    Returns:
+        OHLCVPanel: The built panel
+    """
+    if _ohlcv_store is None:
+        raise ValueError("Building a panel requires the on-disk OHLCV store")
+    if symbols is None:
+        symbols = get_all_stock_symbols()
+    panel = build_panel(symbols, interval, _ohlcv_store.root, get_full_history, get_data_version)
+    if attach:
+        attach_ohlcv_panel(panel)
+    return panel
+
+def open_ohlcv_panel(interval="1d", attach=True):
+    """Map a previously built panel from the store directory (shared between processes)"""
+    panel = OHLCVPanel.open(_ohlcv_store.root, interval)
+    if attach:
+        attach_ohlcv_panel(panel)
+    return panel
+
+def _store_enabled():
+    return _ohlcv_store is not None and _ohlcv_store.enabled
+
+def get_data_version(symbol, interval="1d"):
+    """
+    Get the current data version of a history
+
+    With the on-disk store this is the version in the store manifest, which every
+    process sees (the manifest is re-read when another process changed it);
+    otherwise it is the version of the history held in this process.
+    Resampled intervals share the version of the daily history they are derived from.
+
+    Returns:
+        int: Version number, 0 if the history has never been stored or loaded
+    """
+    interval = base_interval(interval)
+    if not _store_enabled():
+        return _data_versions.get(f"{symbol}_{interval}", 0)
+    entry = _ohlcv_store.get_entry(symbol, interval)
+    return int(entry.get("version", 0)) if entry else 0
+
+def _is_current(symbol, interval):
+    """Whether the history held in memory is the latest stored one (another process may have written a newer one)"""
+    return not _store_enabled() or _data_versions.get(f"{symbol}_{interval}") == get_data_version(symbol, interval)
+
+def _read_stored_history(symbol, interval):
+    """Read a history from the on-disk store and record the version it was read at"""
+    # Version first: a write racing the read then only costs a later reload
+    version = get_data_version(symbol, interval)
+    candlestick_df = _ohlcv_store.read(symbol, interval) if _ohlcv_store is not None else None
+    if candlestick_df is not None:
+        _data_versions[f"{symbol}_{interval}"] = version
+    return candlestick_df
+
+def _save_full_history(symbol, interval, candlestick_df):
+    """Persist a full history and record its new data version"""
+    version = _ohlcv_store.write(symbol, interval, candlestick_df) if _ohlcv_store is not None else None
+    if version is None:
+        version = next(_process_versions)
+    _data_versions[f"{symbol}_{interval}"] = version
+
+def _load_full_history(symbol, interval):
+    """Load the full history from the panel or on-disk store, falling back to a network download"""
     cache_key = f"{symbol}_{interval}"
+    # A panel view is only used while the symbol has no newer data than the panel
+    panel = _ohlcv_panels.get(interval)
+    if panel is not None and symbol in panel and panel.version(symbol) == get_data_version(symbol, interval):
+        return panel.frame(symbol)
+    candlestick_df = _read_stored_history(symbol, interval)
+    if candlestick_df is not None:
+        return candlestick_df
+    # Known failing symbols are not sent to the network until their entry expires
+    if _negative_cache.is_blocked(symbol, interval):
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
     try:
-        if cache_key not in _stock_data_cache:
-            # Fetch all available data from the first candle to today
-            all_data = yf.download(f"{symbol}.NS", period="max", interval=interval, auto_adjust=False, multi_level_index=False)
-            candlestick_df = all_data[["Open", "High", "Low", "Close", "Volume"]].copy()
-            candlestick_df = candlestick_df.apply(pd.to_numeric, errors='coerce')
-            candlestick_df = candlestick_df.dropna()
-            _stock_data_cache[cache_key] = candlestick_df
+        candlestick_df = _data_provider.download(symbol, interval)
+    except Exception as e:
+        _negative_cache.add(symbol, interval, f"download failed: {e}", ttl=ERROR_TTL)
+        raise
+    if candlestick_df.empty:
+        _negative_cache.add(symbol, interval, "no data returned")
+    else:
+        _save_full_history(symbol, interval, candlestick_df)
+    return candlestick_df
+
+def merge_ohlcv(existing_df, new_df):
+    """
+    Merge newly fetched candles into an existing history
+
+    Overlapping timestamps take the new values, since the last cached candle may
+    have been a partial bar when it was first downloaded.
+
+    Returns:
+        pandas.DataFrame: Sorted, de-duplicated history
+    """
+    if existing_df is None or existing_df.empty:
+        return new_df
+    if new_df is None or new_df.empty:
+        return existing_df
+    merged = pd.concat([existing_df, new_df])
+    merged = merged[~merged.index.duplicated(keep='last')]
+    return merged.sort_index()
+
+def refresh_stock_data(symbol, interval="1d"):
+    """
+    Incrementally refresh a cached history by fetching only candles after the last cached one
+
+    Symbols without any cached history get a full download instead.
+
+    Args:
+        symbol: Stock symbol
+        interval: Time interval
+
+    Returns:
+        int: Number of new candles added (daily candles for resampled intervals)
+    """
+    interval = base_interval(interval)
+    cache_key = f"{symbol}_{interval}"
+    existing_df = _stock_data_cache.peek(cache_key) if _is_current(symbol, interval) else None
+    if existing_df is None:
+        existing_df = _read_stored_history(symbol, interval)
+
+    if existing_df is None or existing_df.empty:
+        candlestick_df = _load_full_history(symbol, interval)
+        if not candlestick_df.empty:
+            _stock_data_cache.put(cache_key, candlestick_df)
+        return len(candlestick_df)
+
+    # Re-fetch from the last cached candle so a partial last bar gets corrected
+    last_timestamp = existing_df.index[-1]
+    delta_df = _data_provider.download(symbol, interval, start=last_timestamp)
+    merged_df = merge_ohlcv(existing_df, delta_df)
+    added = len(merged_df) - len(existing_df)
+    # Overlapping candles only count as a change if their values moved
+    overlap = delta_df.index.intersection(existing_df.index)
+    changed = added > 0 or not (existing_df.loc[overlap].to_numpy(dtype=float) ==
+                                merged_df.loc[overlap].to_numpy(dtype=float)).all()
+    if changed:
+        _save_full_history(symbol, interval, merged_df)
+    _stock_data_cache.put(cache_key, merged_df)
+    return added
+
+def refresh_all_stock_data(symbols=None, interval="1d", cancel_event=None, progress_callback=None):
+    """
+    Incrementally refresh many symbols, e.g. the whole NSE list after market close
+
+    Args:
+        symbols: Symbols to refresh (defaults to all symbols in EQUITY_L.csv)
+        interval: Time interval
+        cancel_event: Event to signal cancellation
+        progress_callback: Called with each symbol before it is refreshed
+
+    Returns:
+        dict: {'refreshed': int, 'new_rows': int, 'failed': list of symbols}
+    """
+    if symbols is None:
+        symbols = get_all_stock_symbols()
+    summary = {'refreshed': 0, 'new_rows': 0, 'failed': []}
+    for symbol in symbols:
+        if cancel_event and cancel_event.is_set():
+            break
+        if progress_callback:
+            progress_callback(symbol)
+        try:
+            summary['new_rows'] += refresh_stock_data(symbol, interval)
+            summary['refreshed'] += 1
+        except Exception as e:
+            print(f"Error refreshing {symbol}: {e}")
+            summary['failed'].append(symbol)
+    return summary
+
+def prefetch_stock_data(symbols, interval="1d", chunk_size=50, max_retries=3, backoff=1.0,
+                        cancel_event=None, progress_callback=None):
+    """
+    Load full histories for many symbols into the cache in bulk, e.g. before a universe scan
+
+    Symbols already cached in memory are skipped and stored ones are read from disk;
+    the rest are downloaded in chunks through the provider's multi-ticker path. A
+    failed chunk is retried with exponential backoff. Negative-cached symbols are
+    skipped up front, and symbols that still fail are added to the negative cache.
+
+    Args:
+        symbols: Symbols to prefetch
+        interval: Time interval
+        chunk_size: Symbols per multi-ticker download
+        max_retries: Retries per failed chunk
+        backoff: Initial retry delay in seconds, doubled after every failed attempt
+        cancel_event: Event to signal cancellation
+        progress_callback: Called with (done, total) after each chunk
+
+    Returns:
+        dict: {'cached': int, 'loaded': int, 'downloaded': int, 'failed': list of symbols,
+        'skipped': list of negative cache entries}
+    """
+    # Weekly/monthly bars are derived from daily candles on demand
+    interval = base_interval(interval)
+    summary = {'cached': 0, 'loaded': 0, 'downloaded': 0, 'failed': [], 'skipped': []}
+    missing = []
+    for symbol in symbols:
+        cache_key = f"{symbol}_{interval}"
+        if cache_key in _stock_data_cache and _is_current(symbol, interval):
+            summary['cached'] += 1
+            continue
+        candlestick_df = _read_stored_history(symbol, interval)
+        if candlestick_df is not None:
+            _stock_data_cache.put(cache_key, candlestick_df)
+            summary['loaded'] += 1
+            continue
+        entry = _negative_cache.get(symbol, interval)
+        if entry is not None:
+            summary['skipped'].append(entry)
         else:
-            candlestick_df = _stock_data_cache[cache_key]
+            missing.append(symbol)
+
+    for chunk_start in range(0, len(missing), chunk_size):
+        if cancel_event and cancel_event.is_set():
+            break
+        chunk = missing[chunk_start:chunk_start + chunk_size]
+        frames = None
+        error = None
+        for attempt in range(max_retries + 1):
+            try:
+                frames = _data_provider.download_many(chunk, interval)
+                break
+            except Exception as e:
+                error = e
+                print(f"Error downloading chunk starting at {chunk[0]} (attempt {attempt + 1}): {e}")
+                if attempt < max_retries:
+                    time.sleep(backoff * (2 ** attempt))
+        for symbol in chunk:
+            candlestick_df = frames.get(symbol) if frames is not None else None
+            if candlestick_df is None or candlestick_df.empty:
+                if frames is None:
+                    _negative_cache.add(symbol, interval, f"download failed: {error}", ttl=ERROR_TTL)
+                elif candlestick_df is None:
+                    # Bulk downloads come back empty when throttled: only the provider's own
+                    # no-data report (or a single-symbol download) earns the long TTL
+                    _negative_cache.add(symbol, interval, "missing from bulk download", ttl=ERROR_TTL)
+                else:
+                    _negative_cache.add(symbol, interval, "no data returned")
+                summary['failed'].append(symbol)
+                continue
+            _save_full_history(symbol, interval, candlestick_df)
+            _stock_data_cache.put(f"{symbol}_{interval}", candlestick_df)
+            summary['downloaded'] += 1
+        if progress_callback:
+            progress_callback(min(chunk_start + chunk_size, len(missing)), len(missing))
+    return summary
+
+def resample_ohlcv(daily_df, interval):
+    """
+    Aggregate daily candles into weekly or monthly bars
+
+    Bars follow calendar boundaries: NSE weeks run Monday to Friday and are labelled
+    with their Monday, months are labelled with their first day (the same labels
+    yfinance uses). Weeks and months with holidays simply aggregate fewer sessions.
+
+    Args:
+        daily_df: Daily OHLCV DataFrame with a sorted DatetimeIndex
+        interval: '1wk' or '1mo'
+
+    Returns:
+        pandas.DataFrame: Resampled OHLCV bars
+    """
+    index = daily_df.index.normalize()
+    if interval == "1wk":
+        labels = index - pd.to_timedelta(index.dayofweek, unit="D")
+    elif interval == "1mo":
+        labels = index - pd.to_timedelta(index.day - 1, unit="D")
+    else:
+        raise ValueError(f"Unsupported resample interval: {interval}")
+    resampled = daily_df.groupby(labels, sort=True).agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    )
+    resampled.index.name = daily_df.index.name
+    return resampled
+
+def _get_stored_history(symbol, interval):
+    """Get a downloaded/stored history from the cache, loading it once for concurrent callers"""
+    cache_key = f"{symbol}_{interval}"
+    candlestick_df = _stock_data_cache.get(cache_key)
+    if candlestick_df is not None and not _is_current(symbol, interval):
+        # Another process (scan_cli.py, a scan worker) stored a newer history
+        candlestick_df = None
+    if candlestick_df is None:
+        def load():
+            # Another flight may have filled the cache between our miss and this call
+            cached_df = _stock_data_cache.peek(cache_key)
+            if cached_df is not None and _is_current(symbol, interval):
+                return cached_df
+            loaded_df = _load_full_history(symbol, interval)
+            if not loaded_df.empty:
+                _stock_data_cache.put(cache_key, loaded_df)
+            return loaded_df
+        candlestick_df = _history_flight.do(cache_key, load)
+    return candlestick_df
+
+def get_full_history(symbol, interval="1d"):
+    """
+    Get the full cached history for symbol and interval, loading it if needed
+
+    Weekly and monthly histories are resampled from the daily history and cached until
+    the daily series gets new bars, so switching intervals needs no network call.
+
+    Returns:
+        pandas.DataFrame: Full OHLCV history (shared with the cache, do not modify)
+    """
+    if interval not in RESAMPLED_INTERVALS:
+        return _get_stored_history(symbol, interval)
+
+    cache_key = f"{symbol}_{interval}"
+    daily_df = _get_stored_history(symbol, "1d")
+    daily_version = _data_versions.get(f"{symbol}_1d", 0)
+    resampled_df = _stock_data_cache.get(cache_key)
+    if resampled_df is None or _resampled_from_versions.get(cache_key) != daily_version:
+        if daily_df.empty:
+            return daily_df
+        resampled_df = resample_ohlcv(daily_df, interval)
+        _stock_data_cache.put(cache_key, resampled_df)
+        _resampled_from_versions[cache_key] = daily_version
+    return resampled_df
+
+def slice_history(candlestick_df, start_date=None, end_date=None, copy=False):
+    """
+    Select the candles between start_date and end_date (both inclusive) of a date-sorted history
+
+    Bounds are located by binary search on the DatetimeIndex, so no boolean masks are
+    built over the full history. Without copy the result is a view sharing memory with
+    the cached history, which callers must not modify; pass copy=True for a frame
+    that can be changed.
+
+    Args:
+        candlestick_df: OHLCV DataFrame with a sorted DatetimeIndex
+        start_date: First date to include, or None for the start of the history
+        end_date: Last date to include, or None for the end of the history
+        copy: Return an independent mutable copy instead of a view
+
+    Returns:
+        pandas.DataFrame: Candles in the requested range
+    """
+    index = candlestick_df.index
+    start_pos = 0 if start_date is None else index.searchsorted(pd.Timestamp(start_date), side='left')
+    end_pos = len(index) if end_date is None else index.searchsorted(pd.Timestamp(end_date), side='right')
+    window = candlestick_df.iloc[start_pos:end_pos]
+    return window.copy() if copy else window
+
+def fetch_stock_chart_data(symbol, start_date="2024-01-01", end_date="2024-06-01", interval="1d", copy=False):
+    """
+    Fetch all available historical stock data for the given symbol and interval, cache it, and return only the data between start_date and end_date.
+    The full history is kept in the in-memory LRU cache for backend use and persisted to the
+    on-disk store, which is read before going to the network.
+
+    The returned frame is a view of the cached history and must not be modified, unless
+    copy=True is passed (the chart renderers and scanners only read it).
+    """
+    try:
+        candlestick_df = get_full_history(symbol, interval)
+        if candlestick_df.empty:
+            return candlestick_df.copy() if copy else candlestick_df
         # Filter for the requested period
-        filtered_df = candlestick_df.loc[(candlestick_df.index >= pd.to_datetime(start_date)) & (candlestick_df.index <= pd.to_datetime(end_date))].copy()
-        return filtered_df
+        return slice_history(candlestick_df, start_date, end_date, copy=copy)
     except Exception as e:
         print(f"Error fetching chart data: {e}")
         return pd.DataFrame()
@@ -0,0 +1,133 @@
+"""
+Process-wide index of the NSE symbol universe (EQUITY_L.csv).
+
+The CSV is parsed once and kept as column arrays together with the prebuilt
+"SYMBOL - Company" option strings used by the toolbar, a symbol -> row map and
+search keys for prefix and substring lookups. The index is reloaded only when
+the file's modification time changes.
+"""
+import os
+import bisect
+import threading
+import numpy as np
+import pandas as pd
+
+DEFAULT_UNIVERSE_CSV = "EQUITY_L.csv"
+
+class SymbolUniverse:
+    """Columnar symbol universe with lookup and search helpers"""
+
+    def __init__(self, symbols, names, series, listing_dates, mtime=None):
+        """
+        Args:
+            symbols: Array of symbols (unique, in file order)
+            names: Array of company names
+            series: Array of series codes (e.g. 'EQ')
+            listing_dates: datetime64 array of listing dates
+            mtime: Modification time of the source file
+        """
+        self.symbols = symbols
+        self.names = names
+        self.series = series
+        self.listing_dates = listing_dates
+        self.mtime = mtime
+        self.options = [f"{symbol} - {name}" for symbol, name in zip(symbols, names)]
+        self._row_by_symbol = {symbol: i for i, symbol in enumerate(symbols)}
+        # Sorted upper-case symbols for prefix search by bisection
+        self._sorted_keys = sorted((str(symbol).upper(), i) for i, symbol in enumerate(symbols))
+        self._sorted_symbols = [key for key, _ in self._sorted_keys]
+        # Lower-case "symbol - name" keys for vectorized substring search
+        self._search_keys = np.char.lower(np.array(self.options, dtype=str))
+
+    @classmethod
+    def from_csv(cls, csv_path=DEFAULT_UNIVERSE_CSV):
+        """Build the index from an NSE EQUITY_L.csv file"""
+        df = pd.read_csv(csv_path, dtype=str, skipinitialspace=True)
+        df.columns = [column.strip() for column in df.columns]
+        df = df.dropna(subset=['SYMBOL']).drop_duplicates(subset=['SYMBOL'])
+        names = df['NAME OF COMPANY'].fillna('') if 'NAME OF COMPANY' in df.columns else pd.Series('', index=df.index)
+        series = df['SERIES'].fillna('') if 'SERIES' in df.columns else pd.Series('', index=df.index)
+        if 'DATE OF LISTING' in df.columns:
+            listing_dates = pd.to_datetime(df['DATE OF LISTING'], format="%d-%b-%Y", errors='coerce').to_numpy()
+        else:
+            listing_dates = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]')
+        return cls(
+            symbols=df['SYMBOL'].to_numpy(dtype=object),
+            names=names.to_numpy(dtype=object),
+            series=series.to_numpy(dtype=object),
+            listing_dates=listing_dates,
+            mtime=os.path.getmtime(csv_path),
+        )
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._row_by_symbol
+
+    def symbol_list(self):
+        """All symbols as a list, in file order"""
+        return self.symbols.tolist()
+
+    def index_of(self, symbol):
+        """Row of symbol, or None if it is not listed"""
+        return self._row_by_symbol.get(symbol)
+
+    def option_for(self, symbol):
+        """'SYMBOL - Company' option string for symbol, or None"""
+        row = self.index_of(symbol)
+        return None if row is None else self.options[row]
+
+    def row(self, symbol):
+        """
+        Universe record for symbol
+
+        Returns:
+            dict or None: {'symbol', 'name', 'series', 'listing_date'}
+        """
+        row = self.index_of(symbol)
+        if row is None:
+            return None
+        return {
+            'symbol': self.symbols[row],
+            'name': self.names[row],
+            'series': self.series[row],
+            'listing_date': pd.Timestamp(self.listing_dates[row]),
+        }
+
+    def search_prefix(self, prefix, limit=None):
+        """Symbols starting with prefix (case-insensitive), in alphabetical order"""
+        prefix = prefix.upper()
+        start = bisect.bisect_left(self._sorted_symbols, prefix)
+        matches = []
+        for key, row in self._sorted_keys[start:]:
+            if not key.startswith(prefix) or (limit is not None and len(matches) >= limit):
+                break
+            matches.append(self.symbols[row])
+        return matches
+
+    def search(self, text, limit=None):
+        """Symbols whose symbol or company name contains text (case-insensitive), in file order"""
+        rows = np.flatnonzero(np.char.find(self._search_keys, text.lower()) >= 0)
+        if limit is not None:
+            rows = rows[:limit]
+        return self.symbols[rows].tolist()
+
+_universe_lock = threading.Lock()
+_universe_cache = {}  # absolute csv path -> SymbolUniverse
+
+def get_symbol_universe(csv_path=DEFAULT_UNIVERSE_CSV):
+    """
+    Get the shared universe index for csv_path, rebuilding it if the file changed
+
+    Raises:
+        FileNotFoundError: If the CSV does not exist
+    """
+    path = os.path.abspath(csv_path)
+    mtime = os.path.getmtime(path)
+    with _universe_lock:
+        universe = _universe_cache.get(path)
+        if universe is None or universe.mtime != mtime:
+            universe = SymbolUniverse.from_csv(path)
+            _universe_cache[path] = universe
+        return universe
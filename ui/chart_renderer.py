@@ -4,7 +4,7 @@ import plotly.graph_objs as go
 from plotly.subplots import make_subplots
 import mplfinance as mpf
 
-from stock_data import fetch_stock_chart_data, _stock_data_cache
+from stock_data import fetch_stock_chart_data, get_full_history
 from services.technical_indicators import TechnicalIndicators
 from analysis import determine_dow_theory_regions
 
@@ -36,8 +36,7 @@ class PlotlyChartRenderer:
         chart_data = fetch_stock_chart_data(symbol, start_date=start_str, end_date=end_str, interval=interval)
 
         # Get full cached data for indicators
-        cache_key = f"{symbol}_{interval}"
-        full_data = _stock_data_cache.get(cache_key, chart_data)
+        full_data = get_full_history(symbol, interval) if not chart_data.empty else chart_data
 
         # Handle large datasets with windowing
         MAX_CANDLES = 20000
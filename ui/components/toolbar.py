@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
+import time
 from ui.session_state import get_default_dates, DEFAULT_SYMBOL
+from stock_data import pin_symbols, unpin_symbols
+from symbol_universe import get_symbol_universe
+from screener import parse_rule, get_screener
 
 class Toolbar:
     """UI component for date range and symbol selection toolbar"""
@@ -25,19 +29,14 @@ class Toolbar:
         toolbar1_col1, toolbar1_col2 = st.columns([3, 1])
 
         with toolbar1_col1:
-            # Load stock data
+            # Load stock list (parsed once per process, options prebuilt)
             try:
-                stock_df = pd.read_csv("EQUITY_L.csv")
-                stock_options = [f"{row['SYMBOL']} - {row['NAME OF COMPANY']}" for _, row in stock_df.iterrows()]
+                universe = get_symbol_universe()
+                stock_options = universe.options
 
                 # Find current selection index
                 current_symbol = st.session_state.get('selected_symbol', DEFAULT_SYMBOL)
-                default_index = 0
-                try:
-                    current_option = f"{current_symbol} - " + stock_df.loc[stock_df['SYMBOL'] == current_symbol, 'NAME OF COMPANY'].values[0]
-                    default_index = stock_options.index(current_option)
-                except (IndexError, ValueError):
-                    pass
+                default_index = universe.index_of(current_symbol) or 0
 
                 selected_stock = st.selectbox(
                     "Chart Name (Symbol)",
@@ -191,8 +190,8 @@ class TechnicalPanels:
         return show_pivot_highs, show_pivot_lows
 
     @staticmethod
-    def render_custom_strategy_panel():
-        """Render custom strategy input panel"""
+    def render_custom_strategy_panel(interval="1d"):
+        """Render custom strategy screener panel"""
         st.markdown(
             "<div style='background-color:#e3e6ea;padding:10px 0 10px 0;margin-bottom:10px;'>"
             "<b>Technical Analysis: Custom Strategy</b>",
@@ -200,18 +199,67 @@ class TechnicalPanels:
         )
 
         custom_strategy = st.text_area(
-            "Describe your strategy in English (e.g. 'Show a buy signal when the 20 EMA crosses above the 50 EMA and RSI is below 40'):",
+            "Screening rule (e.g. 'RSI(14) < 30 AND close > EMA(50) AND Hammer in last 3 bars', "
+            "'EMA(20) crosses above EMA(50) AND RSI(14) < 40'):",
             value="",
             key="custom_strategy_input"
         )
 
-        analyze_btn = st.button("Analyze Strategy", key="analyze_strategy_btn")
+        analyze_btn = st.button("Run Screener", key="analyze_strategy_btn")
         if analyze_btn and custom_strategy.strip():
-            st.info(f"Strategy submitted: {custom_strategy}")
-            st.warning("Strategy parsing and execution is not yet implemented. This is a placeholder for future AI-powered analysis.")
+            try:
+                rule = parse_rule(custom_strategy)
+            except ValueError as e:
+                st.error(f"Invalid rule: {e}")
+            else:
+                st.session_state['custom_strategy_pending'] = {'rule': rule, 'interval': interval}
+
+        TechnicalPanels._render_custom_strategy_results()
 
         st.markdown("</div>", unsafe_allow_html=True)
 
+    @staticmethod
+    def _render_custom_strategy_results():
+        """
+        Screen the pending rule and show the latest results
+
+        The price panel loads in a background thread the first time an interval is
+        screened (and after its data changed); until it is ready this fragment polls
+        every second instead of blocking the app.
+        """
+        polling = bool(st.session_state.get('custom_strategy_pending'))
+
+        def results_area():
+            pending = st.session_state.get('custom_strategy_pending')
+            if pending:
+                # The panel and its indicators are shared across rules until the data changes
+                screener = get_screener(pending['interval'], wait=False)
+                if screener is None:
+                    st.info(f"Loading the {pending['interval']} price panel for all stocks...")
+                    return
+                start = time.time()
+                matches = screener.screen(pending['rule'])
+                st.session_state['custom_strategy_results'] = {
+                    'rule': str(pending['rule']),
+                    'interval': pending['interval'],
+                    'matches': matches,
+                    'screened': len(screener.symbols),
+                    'elapsed': time.time() - start,
+                }
+                st.session_state['custom_strategy_pending'] = None
+                if polling:
+                    # Stop polling
+                    st.rerun()
+
+            results = st.session_state.get('custom_strategy_results')
+            if results:
+                st.success(f"{len(results['matches'])} of {results['screened']} stocks match {results['rule']} "
+                           f"({results['interval']}, {results['elapsed']:.1f}s)")
+                if not results['matches'].empty:
+                    st.dataframe(results['matches'])
+
+        st.fragment(results_area, run_every=1.0 if polling else None)()
+
 class WatchlistPanel:
     """UI component for watchlist management (app.py)"""
 
@@ -224,6 +272,15 @@ class WatchlistPanel:
         if 'watchlist' not in st.session_state:
             st.session_state['watchlist'] = ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK"]
 
+        # Keep watchlist histories resident in the data cache; pins are counted per symbol,
+        # so removing a symbol here only releases this session's pin
+        watchlist = set(st.session_state['watchlist'])
+        pinned = st.session_state.get('watchlist_pinned', set())
+        if watchlist != pinned:
+            unpin_symbols(pinned - watchlist)
+            pin_symbols(watchlist - pinned)
+            st.session_state['watchlist_pinned'] = watchlist
+
         # Add to watchlist
         new_watch = st.text_input("Add to Watchlist", "")
 
@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import threading
 import queue
-from concurrent.futures import ThreadPoolExecutor
 
 # Default values
 DEFAULT_SYMBOL = "RELIANCE"
@@ -42,6 +41,8 @@ class SessionStateManager:
             st.session_state['scanner_status'] = 'idle'  # idle, running, done
         if 'scanner_results' not in st.session_state:
             st.session_state['scanner_results'] = []
+        if 'scanner_hits' not in st.session_state:
+            st.session_state['scanner_hits'] = {}
         if 'scanner_pattern' not in st.session_state:
             st.session_state['scanner_pattern'] = None
         if 'scanner_toast' not in st.session_state:
@@ -55,7 +56,14 @@ class SessionStateManager:
         if 'scanner_queue' not in st.session_state:
             st.session_state['scanner_queue'] = queue.Queue()
         if 'scanner_progress_queue' not in st.session_state:
-            st.session_state['scanner_progress_queue'] = queue.Queue()
+            # Bounded: holds only the latest progress snapshot
+            st.session_state['scanner_progress_queue'] = queue.Queue(maxsize=1)
+        if 'scanner_progress' not in st.session_state:
+            st.session_state['scanner_progress'] = None
+        if 'scanner_job_id' not in st.session_state:
+            st.session_state['scanner_job_id'] = None
+        if 'scanner_skipped' not in st.session_state:
+            st.session_state['scanner_skipped'] = []
 
         # Chart pattern scanner
         if 'chart_scanner_status' not in st.session_state:
@@ -67,11 +75,15 @@ class SessionStateManager:
         if 'chart_scanner_queue' not in st.session_state:
             st.session_state['chart_scanner_queue'] = queue.Queue()
         if 'chart_scanner_progress_queue' not in st.session_state:
-            st.session_state['chart_scanner_progress_queue'] = queue.Queue()
-
-        # Thread executor
-        if 'scanner_executor' not in st.session_state:
-            st.session_state['scanner_executor'] = ThreadPoolExecutor(max_workers=2)
+            st.session_state['chart_scanner_progress_queue'] = queue.Queue(maxsize=1)
+        if 'chart_scanner_progress' not in st.session_state:
+            st.session_state['chart_scanner_progress'] = None
+        if 'chart_scanner_job_id' not in st.session_state:
+            st.session_state['chart_scanner_job_id'] = None
+        if 'chart_scanner_skipped' not in st.session_state:
+            st.session_state['chart_scanner_skipped'] = []
+        if 'chart_scanner_skipped_patterns' not in st.session_state:
+            st.session_state['chart_scanner_skipped_patterns'] = {}
 
     @staticmethod
     def init_watchlist_state():
@@ -105,7 +117,8 @@ class SessionStateManager:
         return {
             'candlestick': {
                 'pattern': st.session_state.get('scanner_pattern'),
-                'results': st.session_state.get('scanner_results', [])
+                'results': st.session_state.get('scanner_results', []),
+                'hits': st.session_state.get('scanner_hits', {})
             },
             'chart': {
                 'results': st.session_state.get('chart_scanner_results', [])